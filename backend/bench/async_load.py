@@ -0,0 +1,123 @@
+#!/usr/bin/env python3
+"""Compare the sync (threadpool + PyMySQL) and async (aiomysql) database stacks.
+
+Both stacks serve the same paginated teacher list in-process over ASGI and are
+driven with the same concurrency; the report shows requests/second and p50/p99
+latency. By default it runs against the configured MySQL database; --sqlite
+uses a seeded throwaway SQLite file instead (needs aiosqlite):
+    python -m bench.async_load --requests 2000 --concurrency 100
+"""
+
+import argparse
+import asyncio
+import os
+import statistics
+import tempfile
+import time
+from datetime import date
+import httpx
+from fastapi import Depends, FastAPI
+from sqlalchemy import create_engine
+from sqlalchemy.ext.asyncio import create_async_engine, async_sessionmaker
+from sqlalchemy.orm import sessionmaker
+from config.database import Base, User, Teacher, engine as mysql_engine, async_engine as mysql_async_engine
+from routes.teachers import TEACHER_LIST
+from services.list_query import ListParams, paginate, paginate_sync
+
+
+def build_apps(sync_engine, async_engine):
+    SyncSession = sessionmaker(autocommit=False, autoflush=False, bind=sync_engine)
+    AsyncSession = async_sessionmaker(async_engine, autoflush=False, expire_on_commit=False)
+
+    def get_sync_db():
+        db = SyncSession()
+        try:
+            yield db
+        finally:
+            db.close()
+
+    async def get_async_db():
+        async with AsyncSession() as db:
+            yield db
+
+    sync_app = FastAPI()
+    async_app = FastAPI()
+
+    @sync_app.get("/teachers")
+    def sync_teachers(params: ListParams = Depends(), db=Depends(get_sync_db)):
+        return paginate_sync(db, TEACHER_LIST, params)
+
+    @async_app.get("/teachers")
+    async def async_teachers(params: ListParams = Depends(), db=Depends(get_async_db)):
+        return await paginate(db, TEACHER_LIST, params)
+
+    return sync_app, async_app
+
+
+def seed_sqlite(rows):
+    path = os.path.join(tempfile.mkdtemp(), "async_load.db")
+    sync_engine = create_engine(f"sqlite:///{path}", connect_args={"check_same_thread": False})
+    Base.metadata.create_all(sync_engine)
+    with sessionmaker(bind=sync_engine)() as session:
+        for n in range(rows):
+            user = User(name=f"Teacher {n}", email=f"teacher{n}@example.com", password="x", role="moderator")
+            session.add(user)
+            session.flush()
+            session.add(Teacher(user_id=user.id, name=user.name, email=user.email, grade="9",
+                                subjects="MATH", joining_date=date.today()))
+        session.commit()
+    return sync_engine, create_async_engine(f"sqlite+aiosqlite:///{path}")
+
+
+async def drive(app, total, concurrency, path="/teachers?limit=50"):
+    latencies = []
+    remaining = iter(range(total))
+    transport = httpx.ASGITransport(app=app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://bench") as client:
+        async def worker():
+            for _ in remaining:
+                started = time.perf_counter()
+                response = await client.get(path)
+                latencies.append(time.perf_counter() - started)
+                response.raise_for_status()
+
+        started = time.perf_counter()
+        await asyncio.gather(*(worker() for _ in range(concurrency)))
+        elapsed = time.perf_counter() - started
+
+    latencies.sort()
+    return {
+        "rps": total / elapsed,
+        "p50_ms": statistics.median(latencies) * 1000,
+        "p99_ms": latencies[min(len(latencies) - 1, int(len(latencies) * 0.99))] * 1000
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Compare sync and async database stacks")
+    parser.add_argument("--requests", type=int, default=2000)
+    parser.add_argument("--concurrency", type=int, default=100)
+    parser.add_argument("--sqlite", action="store_true", help="use a seeded SQLite stand-in")
+    parser.add_argument("--rows", type=int, default=500, help="teachers to seed with --sqlite")
+    args = parser.parse_args()
+
+    if args.sqlite:
+        sync_engine, async_engine = seed_sqlite(args.rows)
+    else:
+        sync_engine, async_engine = mysql_engine, mysql_async_engine
+    sync_app, async_app = build_apps(sync_engine, async_engine)
+
+    # One event loop for everything: async pool connections are bound to the loop that opened them
+    async def run_all():
+        print(f"{'stack':<6} {'req/s':>9} {'p50 ms':>9} {'p99 ms':>9}")
+        for name, app in [("sync", sync_app), ("async", async_app)]:
+            await drive(app, min(100, args.requests), args.concurrency)  # warm-up
+            result = await drive(app, args.requests, args.concurrency)
+            print(f"{name:<6} {result['rps']:>9.1f} {result['p50_ms']:>9.1f} {result['p99_ms']:>9.1f}")
+        await async_engine.dispose()
+
+    asyncio.run(run_all())
+
+
+if __name__ == "__main__":
+    main()
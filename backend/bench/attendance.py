@@ -0,0 +1,111 @@
+#!/usr/bin/env python3
+"""Attendance benchmark: mark and summarise a synthetic school.
+
+Marks every class for every working day of a term through the same
+service calls the endpoints make, one commit per class as the bulk mark
+endpoint does, then times monthly and term summaries. Runs against a
+throwaway SQLite database:
+    python -m bench.attendance [--students 5000] [--days 120]
+"""
+
+import argparse
+import os
+import random
+import statistics
+import tempfile
+import time
+from datetime import date, timedelta
+from sqlalchemy import create_engine, func, insert, select
+from sqlalchemy.orm import Session
+from config.database import Attendance, Base, Class, Student
+from services import attendance
+
+CLASS_SIZE = 40
+ABSENCE_RATE = 0.06
+WORKING_DAYS = 6  # Monday to Saturday
+
+
+def seed(engine, students):
+    classes = -(-students // CLASS_SIZE)
+    with engine.begin() as connection:
+        connection.execute(insert(Class), [
+            {"id": n, "name": f"{n % 12 + 1}-{n // 12 + 1}", "segment": "primary", "grade": str(n % 12 + 1),
+             "section": str(n // 12 + 1), "max_students": CLASS_SIZE, "current_students": CLASS_SIZE}
+            for n in range(1, classes + 1)
+        ])
+        connection.execute(insert(Student), [
+            {"id": n, "admission_number": f"ADM{n:06d}", "name": f"Student {n}", "class_id": (n - 1) // CLASS_SIZE + 1,
+             "roll_number": (n - 1) % CLASS_SIZE + 1, "status": "active"}
+            for n in range(1, students + 1)
+        ])
+    return classes
+
+
+def school_days(first, count):
+    days, day = [], first
+    while len(days) < count:
+        if day.weekday() < WORKING_DAYS:
+            days.append(day)
+        day += timedelta(days=1)
+    return days
+
+
+def percentile(values, fraction):
+    values = sorted(values)
+    return values[min(len(values) - 1, int(len(values) * fraction))]
+
+
+def timed(function, *args):
+    started = time.perf_counter()
+    result = function(*args)
+    return result, (time.perf_counter() - started) * 1000
+
+
+def run(students, day_count, seed_value=0):
+    rng = random.Random(seed_value)
+    path = os.path.join(tempfile.mkdtemp(), "attendance.db")
+    engine = create_engine(f"sqlite:///{path}")
+    Base.metadata.create_all(engine)
+    classes = seed(engine, students)
+    days = school_days(date(2026, 4, 1), day_count)
+    print(f"{students} students in {classes} classes, {len(days)} school days")
+
+    latencies, day_totals = [], []
+    with Session(engine) as session:
+        for day in days:
+            started = time.perf_counter()
+            for class_id in range(1, classes + 1):
+                absent = [roll for roll in range(1, CLASS_SIZE + 1) if rng.random() < ABSENCE_RATE]
+                _, elapsed = timed(lambda: (attendance.mark(session, class_id, day, absent), session.commit()))
+                latencies.append(elapsed)
+            day_totals.append(time.perf_counter() - started)
+
+        rows, stored = session.execute(
+            select(func.count(), func.sum(func.length(Attendance.marked) + func.length(Attendance.present)))
+        ).one()
+        print(f"mark one class       p50 {statistics.median(latencies):7.2f} ms   p95 {percentile(latencies, 0.95):7.2f} ms")
+        print(f"mark whole school    p50 {statistics.median(day_totals) * 1000:7.1f} ms per day")
+        print(f"storage              {rows} rows, {stored / 1024:.0f} KiB of bitmaps "
+              f"(one row per student per day would be {rows * CLASS_SIZE} rows)")
+
+        month_start, month_end = attendance.month_range(days[-1].strftime("%Y-%m"))
+        for label, start, end in (("month", month_start, month_end), ("term", days[0], days[-1])):
+            class_times = [timed(attendance.class_summary, session, class_id, start, end)[1]
+                           for class_id in range(1, classes + 1)]
+            _, school_time = timed(attendance.school_summary, session, start, end)
+            print(f"{label:<5} class summary  p50 {statistics.median(class_times):7.2f} ms   "
+                  f"p95 {percentile(class_times, 0.95):7.2f} ms   all classes {sum(class_times):8.1f} ms")
+            print(f"{label:<5} school summary     {school_time:7.2f} ms")
+
+        summary = attendance.class_summary(session, 1, days[0], days[-1])
+        expected = sum(1 - ABSENCE_RATE for _ in days) * CLASS_SIZE
+        print(f"check                class 1 present {sum(item['present'] for item in summary['students'])} "
+              f"of {sum(item['marked'] for item in summary['students'])} marks (expected about {expected:.0f})")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Benchmark attendance marking and summaries")
+    parser.add_argument("--students", type=int, default=5000)
+    parser.add_argument("--days", type=int, default=120)
+    args = parser.parse_args()
+    run(args.students, args.days)
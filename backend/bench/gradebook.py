@@ -0,0 +1,111 @@
+#!/usr/bin/env python3
+"""Gradebook benchmark: enter, publish and correct marks for one synthetic grade.
+
+Uploads every class's marks paper by paper through the same service call
+the bulk marks endpoint makes, then times publishing (a full rebuild of
+the result table), single-mark corrections (incremental) and reading
+the results. Runs against a throwaway SQLite database:
+    python -m bench.gradebook [--students 2000] [--papers 6]
+"""
+
+import argparse
+import os
+import random
+import statistics
+import tempfile
+import time
+from sqlalchemy import create_engine, insert, select
+from sqlalchemy.orm import Session
+from config.database import Base, Class, Exam, ExamSubject, Student, Subject
+from services import gradebook
+
+CLASS_SIZE = 40
+MAX_MARKS = 100
+
+
+def seed(engine, students, paper_count):
+    classes = -(-students // CLASS_SIZE)
+    with engine.begin() as connection:
+        connection.execute(insert(Subject), [
+            {"id": n, "name": f"Subject {n}", "code": f"SUB{n}"} for n in range(1, paper_count + 1)
+        ])
+        connection.execute(insert(Class), [
+            {"id": n, "name": f"10-{n}", "segment": "secondary", "grade": "10", "section": str(n),
+             "max_students": CLASS_SIZE, "current_students": CLASS_SIZE}
+            for n in range(1, classes + 1)
+        ])
+        connection.execute(insert(Student), [
+            {"id": n, "admission_number": f"ADM{n:06d}", "name": f"Student {n}", "class_id": (n - 1) // CLASS_SIZE + 1,
+             "roll_number": (n - 1) % CLASS_SIZE + 1, "status": "active"}
+            for n in range(1, students + 1)
+        ])
+        connection.execute(insert(Exam), [{"id": 1, "name": "Final", "grade": "10", "academic_year": "2026-2027"}])
+        connection.execute(insert(ExamSubject), [
+            {"exam_id": 1, "subject_id": n, "max_marks": MAX_MARKS} for n in range(1, paper_count + 1)
+        ])
+    return classes
+
+
+def timed(function):
+    started = time.perf_counter()
+    result = function()
+    return result, (time.perf_counter() - started) * 1000
+
+
+def run(students, paper_count, corrections=50, seed_value=0):
+    rng = random.Random(seed_value)
+    path = os.path.join(tempfile.mkdtemp(), "gradebook.db")
+    engine = create_engine(f"sqlite:///{path}")
+    Base.metadata.create_all(engine)
+    classes = seed(engine, students, paper_count)
+    print(f"{students} students in {classes} classes, {paper_count} papers")
+
+    with Session(engine) as session:
+        exam = session.get(Exam, 1)
+        uploads = []
+        for class_id in range(1, classes + 1):
+            for subject_id in range(1, paper_count + 1):
+                entries = [
+                    {"roll_number": roll, "marks": None, "absent": True} if rng.random() < 0.02
+                    else {"roll_number": roll, "marks": round(rng.gauss(62, 16)) % (MAX_MARKS + 1)}
+                    for roll in range(1, CLASS_SIZE + 1)
+                ]
+                _, elapsed = timed(lambda: (gradebook.save_marks(session, exam, class_id, subject_id, entries),
+                                            session.commit()))
+                uploads.append(elapsed)
+        print(f"upload class marks   p50 {statistics.median(uploads):7.2f} ms   max {max(uploads):7.2f} ms   "
+              f"({len(uploads)} uploads)")
+
+        publish, elapsed = timed(lambda: (gradebook.publish(session, exam), session.commit())[0])
+        print(f"publish grade        {elapsed:7.1f} ms   ({publish['results']} results)")
+
+        changes, latencies = [], []
+        for _ in range(corrections):
+            student_id = rng.randint(1, students)
+            entry = {"student_id": student_id, "marks": rng.randint(0, MAX_MARKS)}
+            class_id = (student_id - 1) // CLASS_SIZE + 1
+            result, elapsed = timed(lambda: (gradebook.save_marks(session, exam, class_id, rng.randint(1, paper_count),
+                                                                  [entry]), session.commit())[0])
+            changes.append(result["results_updated"])
+            latencies.append(elapsed)
+        print(f"correct one mark     p50 {statistics.median(latencies):7.2f} ms   max {max(latencies):7.2f} ms   "
+              f"(median {statistics.median(changes):.0f} result rows rewritten)")
+
+        rows, elapsed = timed(lambda: gradebook.results(session, 1))
+        print(f"read results         {elapsed:7.1f} ms   ({len(rows)} rows)")
+
+        # The incremental path must agree with a full rebuild
+        before = {row["student_id"]: (row["rank"], row["class_rank"], float(row["percentile"])) for row in rows}
+        gradebook.refresh_results(session, 1)
+        after = {row["student_id"]: (row["rank"], row["class_rank"], float(row["percentile"]))
+                 for row in gradebook.results(session, 1)}
+        print(f"check                incremental results {'match' if before == after else 'DIFFER FROM'} a full rebuild")
+        session.rollback()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Benchmark gradebook marks entry and result computation")
+    parser.add_argument("--students", type=int, default=2000)
+    parser.add_argument("--papers", type=int, default=6)
+    args = parser.parse_args()
+    run(args.students, args.papers)
@@ -0,0 +1,252 @@
+#!/usr/bin/env python3
+"""In-process load scenarios with stored baselines.
+
+Drives the real app over ASGI (no network) with concurrent clients and
+reports throughput and p50/p95/p99 per scenario:
+
+    login      bcrypt-bound POST /api/auth/login as random teachers
+    teachers   GET /api/teachers/ pages, mostly served by the response cache
+    timetable  PUT /api/timetable/{id} room changes through the clash index
+    export     streamed CSV of one class from /api/reports/export/students
+    search     GET /api/search autocomplete on name, admission number and phone prefixes
+
+By default it runs against the configured database, which must already be
+seeded with bench.synthetic_school; --sqlite seeds a throwaway SQLite file
+first. --save stores the results as the baseline for this database kind and
+size; --check exits non-zero if any scenario is more than --threshold slower
+(lower req/s or higher p95) than its baseline:
+    python -m bench.load_scenarios --sqlite --check
+"""
+
+import argparse
+import asyncio
+import json
+import os
+import random
+import sys
+import time
+import httpx
+from sqlalchemy import func, select
+from sqlalchemy.ext.asyncio import async_sessionmaker
+from sqlalchemy.orm import sessionmaker
+import config.database as database
+from config.database import get_db, get_async_db, get_async_read_db, Student, Teacher, Timetable
+from main import app
+from middleware.auth import create_access_token
+from middleware.response_cache import ResponseCacheMiddleware
+from services.password_hasher import password_hasher
+from bench.synthetic_school import (
+    ADMIN_EMAIL, BENCH_PASSWORD, FIRST_NAMES, LAST_NAMES, STUDENTS_PER_CLASS, generate, sqlite_standin
+)
+
+BASELINES_PATH = os.path.join(os.path.dirname(__file__), "baselines.json")
+
+
+class Scenario:
+    def __init__(self, name, requests, concurrency, call):
+        self.name = name
+        self.requests = requests
+        self.concurrency = concurrency
+        self.call = call  # async (client, context, rng, n) -> response
+
+
+async def login(client, context, rng, n):
+    email = f"teacher{rng.randint(1, context['teachers'])}@bench.example.com"
+    return await client.post("/api/auth/login", json={"email": email, "password": BENCH_PASSWORD})
+
+
+async def teacher_list(client, context, rng, n):
+    return await client.get(f"/api/teachers/?limit={rng.choice([20, 50, 100])}", headers=context["headers"])
+
+
+async def timetable_edit(client, context, rng, n):
+    # Rooms unique to the entry, so edits never clash with each other
+    entry_id = rng.randint(1, context["timetable"])
+    return await client.put(f"/api/timetable/{entry_id}", json={"room": f"B{entry_id}-{n % 2}"}, headers=context["headers"])
+
+
+async def report_export(client, context, rng, n):
+    class_id = rng.randint(1, context["classes"])
+    return await client.get(f"/api/reports/export/students?class_id={class_id}", headers=context["headers"])
+
+
+async def search(client, context, rng, n):
+    # What an admin types into the header box: a few letters of a name, or the start of a number
+    student = rng.randint(1, context["students"])
+    query = rng.choice([
+        rng.choice(FIRST_NAMES)[:rng.randint(1, 5)],
+        f"{rng.choice(FIRST_NAMES)} {rng.choice(LAST_NAMES)[:2]}",
+        f"S{student:07d}"[:rng.randint(4, 8)],
+        f"9{student - 1:09d}"[:rng.randint(5, 10)]
+    ])
+    return await client.get("/api/search/", params={"q": query}, headers=context["headers"])
+
+
+SCENARIOS = [
+    Scenario("login", 60, 20, login),
+    Scenario("teachers", 2000, 50, teacher_list),
+    Scenario("timetable", 500, 10, timetable_edit),
+    Scenario("export", 200, 10, report_export),
+    Scenario("search", 2000, 20, search)
+]
+
+
+def percentile(ordered, fraction):
+    return ordered[min(len(ordered) - 1, int(len(ordered) * fraction))]
+
+
+async def drive(client, scenario, context, total, seed=0):
+    rng = random.Random(seed)
+    latencies = []
+    errors = 0
+    remaining = iter(range(total))
+
+    async def worker():
+        nonlocal errors
+        for n in remaining:
+            started = time.perf_counter()
+            response = await scenario.call(client, context, rng, n)
+            latencies.append(time.perf_counter() - started)
+            errors += response.status_code >= 400
+
+    started = time.perf_counter()
+    await asyncio.gather(*(worker() for _ in range(scenario.concurrency)))
+    elapsed = time.perf_counter() - started
+
+    latencies.sort()
+    return {
+        "rps": round(total / elapsed, 1),
+        "p50_ms": round(percentile(latencies, 0.50) * 1000, 2),
+        "p95_ms": round(percentile(latencies, 0.95) * 1000, 2),
+        "p99_ms": round(percentile(latencies, 0.99) * 1000, 2),
+        "errors": errors
+    }
+
+
+def use_engines(sync_engine, async_engine):
+    """Point the app's sessions, read routing and cache version reads at a stand-in database"""
+    SyncSession = sessionmaker(autocommit=False, autoflush=False, bind=sync_engine)
+    AsyncSession = async_sessionmaker(async_engine, autoflush=False, expire_on_commit=False)
+
+    def get_bench_db():
+        db = SyncSession()
+        try:
+            yield db
+        finally:
+            db.close()
+
+    async def get_bench_async_db():
+        async with AsyncSession() as db:
+            yield db
+
+    app.dependency_overrides[get_db] = get_bench_db
+    app.dependency_overrides[get_async_db] = get_bench_async_db
+    app.dependency_overrides[get_async_read_db] = get_bench_async_db
+    ResponseCacheMiddleware.version_sessions = AsyncSession
+    database.engine = sync_engine  # streaming exports read through read_engine()
+
+
+def describe(sync_engine):
+    """Sizes the scenarios draw ids from, and an admin token"""
+    with sync_engine.connect() as connection:
+        counts = {
+            "students": connection.execute(select(func.count()).select_from(Student)).scalar(),
+            "teachers": connection.execute(select(func.count()).select_from(Teacher)).scalar(),
+            "timetable": connection.execute(select(func.count()).select_from(Timetable)).scalar()
+        }
+        admin_id = connection.execute(select(database.User.id).where(database.User.email == ADMIN_EMAIL)).scalar()
+    if admin_id is None or not counts["timetable"]:
+        raise RuntimeError("Database is not seeded; run python -m bench.synthetic_school first")
+    counts["classes"] = -(-counts["students"] // STUDENTS_PER_CLASS)
+    token = create_access_token({"userId": admin_id, "email": ADMIN_EMAIL, "role": "school_admin"})
+    return {**counts, "headers": {"Authorization": f"Bearer {token}"}}
+
+
+def compare(results, baseline, threshold):
+    """Lines describing each regression beyond `threshold` (0.2 = 20%)"""
+    regressions = []
+    for name, result in results.items():
+        base = baseline.get(name)
+        if base is None:
+            continue
+        if result["rps"] < base["rps"] * (1 - threshold):
+            regressions.append(f"{name}: {result['rps']} req/s vs baseline {base['rps']}")
+        if result["p95_ms"] > base["p95_ms"] * (1 + threshold):
+            regressions.append(f"{name}: p95 {result['p95_ms']} ms vs baseline {base['p95_ms']}")
+        if result["errors"] > base.get("errors", 0):
+            regressions.append(f"{name}: {result['errors']} errors vs baseline {base.get('errors', 0)}")
+    return regressions
+
+
+def load_baselines():
+    if not os.path.exists(BASELINES_PATH):
+        return {}
+    with open(BASELINES_PATH) as f:
+        return json.load(f)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Run load scenarios against the app in-process")
+    parser.add_argument("--scenarios", nargs="+", choices=[s.name for s in SCENARIOS], default=[s.name for s in SCENARIOS])
+    parser.add_argument("--scale", type=float, default=1.0, help="multiply every scenario's request count")
+    parser.add_argument("--sqlite", action="store_true", help="seed and use a SQLite stand-in")
+    parser.add_argument("--students", type=int, default=10000, help="students to seed with --sqlite")
+    parser.add_argument("--save", action="store_true", help="store the results as the baseline")
+    parser.add_argument("--check", action="store_true", help="fail on regressions against the baseline")
+    parser.add_argument("--threshold", type=float, default=0.2)
+    args = parser.parse_args()
+
+    if args.sqlite:
+        sync_engine, async_engine = sqlite_standin()
+        print(f"🏫 Seeding {args.students} students...")
+        generate(sync_engine, args.students)
+        use_engines(sync_engine, async_engine)
+    else:
+        sync_engine, async_engine = database.engine, database.async_engine
+    context = describe(sync_engine)
+    key = f"{sync_engine.dialect.name}:{context['students']}"
+
+    async def run_all():
+        results = {}
+        transport = httpx.ASGITransport(app=app)
+        async with httpx.AsyncClient(transport=transport, base_url="http://bench", timeout=None) as client:
+            print(f"{'scenario':<10} {'req/s':>9} {'p50 ms':>9} {'p95 ms':>9} {'p99 ms':>9} {'errors':>7}")
+            for scenario in SCENARIOS:
+                if scenario.name not in args.scenarios:
+                    continue
+                total = max(1, int(scenario.requests * args.scale))
+                await drive(client, scenario, context, min(total, scenario.concurrency * 2), seed=1)  # warm-up
+                result = results[scenario.name] = await drive(client, scenario, context, total)
+                print(f"{scenario.name:<10} {result['rps']:>9.1f} {result['p50_ms']:>9.1f} {result['p95_ms']:>9.1f} "
+                      f"{result['p99_ms']:>9.1f} {result['errors']:>7}")
+        await async_engine.dispose()
+        return results
+
+    try:
+        results = asyncio.run(run_all())
+    finally:
+        password_hasher.shutdown()
+
+    baselines = load_baselines()
+    failed = False
+    if args.check:
+        if key not in baselines:
+            print(f"⚠️  No baseline for {key}; run with --save first")
+        else:
+            regressions = compare(results, baselines[key], args.threshold)
+            for line in regressions:
+                print(f"❌ {line}")
+            failed = bool(regressions)
+            if not failed:
+                print(f"✅ Within {args.threshold:.0%} of the {key} baseline")
+    if args.save:
+        baselines[key] = {**baselines.get(key, {}), **results}
+        with open(BASELINES_PATH, "w") as f:
+            json.dump(baselines, f, indent=2, sort_keys=True)
+            f.write("\n")
+        print(f"💾 Baseline for {key} saved to {BASELINES_PATH}")
+    sys.exit(1 if failed else 0)
+
+
+if __name__ == "__main__":
+    main()
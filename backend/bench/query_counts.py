@@ -0,0 +1,132 @@
+#!/usr/bin/env python3
+"""Report how many SQL statements each endpoint issues against its budget.
+
+Runs the app in-process against a throwaway SQLite database (needs
+aiosqlite):
+    python -m bench.query_counts
+
+tests/test_query_counts.py enforces the same budgets under pytest.
+"""
+
+import os
+import tempfile
+from datetime import date, timedelta
+from fastapi.testclient import TestClient
+from sqlalchemy import create_engine, event
+from sqlalchemy.ext.asyncio import create_async_engine, async_sessionmaker
+from sqlalchemy.orm import sessionmaker
+from config.database import Base, get_db, get_async_db, get_async_read_db, User, Teacher, Class, Student, Announcement, Event
+from middleware.auth import create_access_token
+from main import app
+from middleware.response_cache import ResponseCacheMiddleware, cached_route
+
+# Budgets hold for any number of rows; the principal cache is warm beforehand
+# Cached routes pay one extra query for the table versions on a miss
+QUERY_BUDGETS = {
+    "/api/teachers/": 2,
+    "/api/teachers/?include_total=true": 3,
+    "/api/teachers/{teacher_id}": 2,
+    "/api/students/": 1,
+    "/api/classes/": 2,
+    "/api/announcements/": 1,
+    "/api/announcements/feed": 2,
+    "/api/calendar/": 2,
+    "/api/calendar/feed.ics": 2,
+    "/api/settings/": 0  # the in-memory snapshot
+}
+
+
+def seed(session, rows=50):
+    admin = User(name="Admin", email="admin@example.com", password="x", role="school_admin")
+    session.add(admin)
+    session.flush()
+    for n in range(rows):
+        user = User(name=f"Teacher {n}", email=f"teacher{n}@example.com", password="x", role="moderator")
+        session.add(user)
+        session.flush()
+        session.add(Teacher(user_id=user.id, name=user.name, email=user.email, grade="9",
+                            subjects="MATH", joining_date=date.today()))
+        class_ = Class(name=f"9-{n}", segment="secondary", grade="9")
+        session.add(class_)
+        session.flush()
+        session.add(Student(admission_number=f"A{n}", name=f"Student {n}", class_id=class_.id))
+        session.add(Announcement(title=f"Notice {n}", content="...", created_by=admin.id))
+        session.add(Event(title=f"Event {n}", type="activity", start_date=date.today() + timedelta(days=n - 25),
+                          recurrence_rule="FREQ=WEEKLY" if n % 10 == 0 else None, created_by=admin.id))
+    session.commit()
+    return admin, user.id
+
+
+def measure():
+    """Query counts per endpoint: ({path: (count, status)}, {cached path: (count, x-cache)})"""
+    path = os.path.join(tempfile.mkdtemp(), "query_counts.db")
+    engine = create_engine(f"sqlite:///{path}", connect_args={"check_same_thread": False})
+    async_engine = create_async_engine(f"sqlite+aiosqlite:///{path}")
+    Base.metadata.create_all(engine)
+    TestingSession = sessionmaker(autocommit=False, autoflush=False, bind=engine)
+    AsyncTestingSession = async_sessionmaker(async_engine, autoflush=False, expire_on_commit=False)
+
+    def get_test_db():
+        db = TestingSession()
+        try:
+            yield db
+        finally:
+            db.close()
+
+    async def get_test_async_db():
+        async with AsyncTestingSession() as db:
+            yield db
+
+    app.dependency_overrides[get_db] = get_test_db
+    app.dependency_overrides[get_async_db] = get_test_async_db
+    app.dependency_overrides[get_async_read_db] = get_test_async_db
+    ResponseCacheMiddleware.version_sessions = AsyncTestingSession
+    try:
+        session = TestingSession()
+        admin, teacher_id = seed(session)
+        token = create_access_token({"userId": admin.id, "email": admin.email, "role": admin.role})
+        session.close()
+
+        statements = []
+        for counted in (engine, async_engine.sync_engine):
+            event.listen(counted, "before_cursor_execute", lambda *args: statements.append(args[2]))
+
+        client = TestClient(app)
+        headers = {"Authorization": f"Bearer {token}"}
+        client.get("/api/auth/me", headers=headers)  # warm the principal cache
+
+        cold = {}
+        for path in QUERY_BUDGETS:
+            statements.clear()
+            response = client.get(path.format(teacher_id=teacher_id), headers=headers)
+            cold[path] = (len(statements), response.status_code)
+
+        # Repeat requests to cached routes should cost only the version lookup
+        cached = {}
+        for path in QUERY_BUDGETS:
+            if cached_route(client.build_request("GET", path)) is None:
+                continue
+            statements.clear()
+            response = client.get(path.format(teacher_id=teacher_id), headers=headers)
+            cached[path] = (len(statements), response.headers.get("x-cache"))
+        return cold, cached
+    finally:
+        app.dependency_overrides.clear()
+        ResponseCacheMiddleware.version_sessions = None
+        async_engine.sync_engine.dispose()
+        engine.dispose()
+
+
+def main():
+    cold, cached = measure()
+    for path, (count, status) in cold.items():
+        budget = QUERY_BUDGETS[path]
+        ok = status == 200 and count <= budget
+        print(f"{'ok  ' if ok else 'over'} {path:<40} {count:>3} queries (budget {budget}, status {status})")
+    for path, (count, hit) in cached.items():
+        ok = hit == "HIT" and count <= 1
+        print(f"{'ok  ' if ok else 'over'} {path + ' (cached)':<40} {count:>3} queries (budget 1, {hit})")
+
+
+if __name__ == "__main__":
+    main()
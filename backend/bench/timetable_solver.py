@@ -0,0 +1,70 @@
+#!/usr/bin/env python3
+"""Timetable solver benchmark on synthetic schools.
+
+Run from the backend directory:
+    python -m bench.timetable_solver [--sizes 20 100 300] [--budget 10] [--workers 4]
+"""
+
+import argparse
+import random
+import time
+from services.timetable_solver import solve
+
+DAYS = ['monday', 'tuesday', 'wednesday', 'thursday', 'friday', 'saturday']
+SUBJECTS_PER_GRADE = [(1, 7), (2, 6), (3, 6), (4, 5), (5, 5), (6, 4), (7, 4), (8, 3), (9, 2), (10, 2)]
+TEACHER_MAX_LOAD = 30
+
+
+def synthetic_school(class_count, periods_per_day=8, seed=0):
+    """Build a solver problem for a school with `class_count` classes over 12 grades"""
+    rng = random.Random(seed)
+    lessons = []
+    demand = {}
+    for class_id in range(1, class_count + 1):
+        grade = (class_id - 1) % 12
+        for subject_offset, periods in SUBJECTS_PER_GRADE:
+            subject_id = grade * 100 + subject_offset
+            lessons.append({"class_id": class_id, "subject_id": subject_id, "periods": periods, "teachers": []})
+            demand[subject_id] = demand.get(subject_id, 0) + periods
+
+    # Enough teachers for ~80% utilisation, some of them qualified in two subjects
+    qualified = {}
+    teacher_id = 0
+    for subject_id, periods in sorted(demand.items()):
+        for _ in range(max(1, -(-periods * 5 // (TEACHER_MAX_LOAD * 4)))):
+            teacher_id += 1
+            qualified.setdefault(subject_id, []).append(teacher_id)
+            if rng.random() < 0.2:
+                other = rng.choice(list(demand))
+                if teacher_id not in qualified.setdefault(other, []):
+                    qualified[other].append(teacher_id)
+    for lesson in lessons:
+        lesson["teachers"] = qualified[lesson["subject_id"]]
+
+    return {
+        "days": DAYS,
+        "periods_per_day": periods_per_day,
+        "rooms": [f"R{n}" for n in range(1, class_count + 1)],
+        "lessons": lessons
+    }
+
+
+def run(sizes, budget, restarts, workers):
+    print(f"{'classes':>8} {'periods':>8} {'placed':>8} {'unplaced':>9} {'repeats':>8} {'restarts':>9} {'seconds':>8}")
+    for size in sizes:
+        problem = synthetic_school(size)
+        started = time.perf_counter()
+        result = solve(problem, time_budget=budget, restarts=restarts, workers=workers, seed=1)
+        elapsed = time.perf_counter() - started
+        print(f"{size:>8} {result['total_periods']:>8} {result['placed']:>8} {result['unplaced']:>9} "
+              f"{result['same_day_repeats']:>8} {result['restarts']:>9} {elapsed:>8.2f}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Benchmark the timetable solver")
+    parser.add_argument("--sizes", type=int, nargs="+", default=[20, 100, 300])
+    parser.add_argument("--budget", type=float, default=10.0)
+    parser.add_argument("--restarts", type=int, default=4)
+    parser.add_argument("--workers", type=int, default=1)
+    args = parser.parse_args()
+    run(args.sizes, args.budget, args.restarts, args.workers)
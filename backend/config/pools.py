@@ -0,0 +1,120 @@
+import threading
+import time
+from sqlalchemy import create_engine
+from sqlalchemy.exc import TimeoutError as PoolTimeoutError
+from sqlalchemy.ext.asyncio import create_async_engine
+from sqlalchemy.pool import QueuePool, AsyncAdaptedQueuePool
+
+_registry = {}
+
+
+class PoolMetrics:
+    """Checkout counters for one connection pool"""
+
+    def __init__(self, name):
+        self.name = name
+        self.lock = threading.Lock()
+        self.checkouts = 0
+        self.timeouts = 0
+        self.wait_seconds_total = 0.0
+        self.wait_seconds_max = 0.0
+
+    def record(self, waited, timed_out=False):
+        with self.lock:
+            if timed_out:
+                self.timeouts += 1
+            else:
+                self.checkouts += 1
+            self.wait_seconds_total += waited
+            self.wait_seconds_max = max(self.wait_seconds_max, waited)
+
+
+class _TimedPoolMixin:
+    """Times every checkout, including waits for an overflow slot, and counts timeouts"""
+
+    metrics = None
+
+    def _do_get(self):
+        started = time.perf_counter()
+        try:
+            connection = super()._do_get()
+        except PoolTimeoutError:
+            if self.metrics is not None:
+                self.metrics.record(time.perf_counter() - started, timed_out=True)
+            raise
+        if self.metrics is not None:
+            self.metrics.record(time.perf_counter() - started)
+        return connection
+
+    def recreate(self):
+        # engine.dispose() swaps in a fresh pool; keep the same counters
+        pool = super().recreate()
+        pool.metrics = self.metrics
+        return pool
+
+
+class TimedQueuePool(_TimedPoolMixin, QueuePool):
+    pass
+
+
+class TimedAsyncQueuePool(_TimedPoolMixin, AsyncAdaptedQueuePool):
+    pass
+
+
+def to_async_url(url):
+    """Map a sync driver URL onto its asyncio driver"""
+    if url.startswith("mysql+pymysql://"):
+        return "mysql+aiomysql://" + url[len("mysql+pymysql://"):]
+    if url.startswith("sqlite://"):
+        return "sqlite+aiosqlite://" + url[len("sqlite://"):]
+    return url
+
+
+def _pool_kwargs(url, pool_size, max_overflow, pool_timeout):
+    kwargs = {
+        "pool_size": pool_size,
+        "max_overflow": max_overflow,
+        "pool_timeout": pool_timeout,
+        "pool_recycle": 3600,
+        "pool_pre_ping": True
+    }
+    if url.startswith("sqlite"):
+        kwargs["connect_args"] = {"check_same_thread": False}
+    return kwargs
+
+
+def make_engines(name, url, pool_size=10, max_overflow=20, pool_timeout=30):
+    """Create the sync and async engines for one database role with instrumented pools"""
+    kwargs = _pool_kwargs(url, pool_size, max_overflow, pool_timeout)
+    sync_engine = create_engine(url, poolclass=TimedQueuePool, **kwargs)
+    async_engine = create_async_engine(to_async_url(url), poolclass=TimedAsyncQueuePool, **kwargs)
+
+    for engine_name, engine in [(name, sync_engine), (f"{name}_async", async_engine.sync_engine)]:
+        engine.pool.metrics = PoolMetrics(engine_name)
+        _registry[engine_name] = engine
+    return sync_engine, async_engine
+
+
+def forget_engines(name):
+    """Stop reporting a disposed database role's pools"""
+    _registry.pop(name, None)
+    _registry.pop(f"{name}_async", None)
+
+
+def pool_stats():
+    """Point-in-time gauges and cumulative checkout counters for every pool"""
+    stats = {}
+    for name, engine in _registry.items():
+        pool = engine.pool
+        metrics = pool.metrics
+        stats[name] = {
+            "size": pool.size(),
+            "checked_out": pool.checkedout(),
+            "overflow": max(pool.overflow(), 0),
+            "max_overflow": pool._max_overflow,
+            "checkouts": metrics.checkouts,
+            "timeouts": metrics.timeouts,
+            "wait_seconds_total": round(metrics.wait_seconds_total, 6),
+            "wait_seconds_max": round(metrics.wait_seconds_max, 6)
+        }
+    return stats
@@ -1,7 +1,11 @@
+import time
+IMPORT_STARTED = time.perf_counter()
+
 from fastapi import FastAPI, Request
 from fastapi.middleware.cors import CORSMiddleware
-from fastapi.responses import JSONResponse
+from fastapi.responses import JSONResponse, Response
 import os
+import traceback
 from dotenv import load_dotenv
 
 # Import routes
@@ -15,13 +19,39 @@ from routes.calendar import router as calendar_router
 from routes.announcements import router as announcements_router
 from routes.reports import router as reports_router
 from routes.settings import router as settings_router
+from routes.search import router as search_router
+from routes.attendance import router as attendance_router
+from routes.grades import router as grades_router
 
 # Import database
-from config.database import create_database, test_connection
+from config.database import async_engine, AsyncSessionLocal, mark_primary_reads, tenant_router
+from config.tenancy import MULTI_TENANT
+from config.pools import pool_stats
+from services.password_hasher import password_hasher, HashingBusyError
+from services.enrollment import ClassFull
+from services.responses import FastJSONResponse
+from services.scheduler import scheduler, SCHEDULER_ENABLED
+from services.settings_store import settings_store
+from services.search_index import search_stats
+from services.metrics import registry, slow_queries, http_exceptions
+from services.migrations import check_schema
+from middleware.response_cache import ResponseCacheMiddleware, response_cache
+from middleware.metrics import MetricsMiddleware, route_template
+from middleware.tenant import TenantMiddleware
+# Importing these registers the write hooks that keep rollup, enrollment, association, feed, calendar and version tables in sync
+import services.rollups
+import services.enrollment
+import services.associations
+import services.feed
+import services.event_calendar
+import services.table_versions
 
 load_dotenv()
 
-app = FastAPI(title="Learnroot API", version="1.0.0")
+app = FastAPI(title="Learnroot API", version="1.0.0", default_response_class=FastJSONResponse)
+
+# Seconds per startup phase of this worker, from the first import to serving
+startup_timings = {"import": time.perf_counter() - IMPORT_STARTED}
 
 # CORS middleware
 app.add_middleware(
@@ -32,6 +62,23 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
+# Teachers, subjects, classes and settings GETs are served from a version-keyed cache
+app.add_middleware(ResponseCacheMiddleware)
+
+# Writes pin the client's reads to the primary for a short window
+@app.middleware("http")
+async def read_your_writes(request: Request, call_next):
+    response = await call_next(request)
+    if request.method in ("POST", "PUT", "PATCH", "DELETE") and response.status_code < 400:
+        mark_primary_reads(response)
+    return response
+
+# Picks the school (token claim or X-School-ID) before any cache or session is touched
+app.add_middleware(TenantMiddleware)
+
+# Outermost, so latency covers the cache and every other middleware
+app.add_middleware(MetricsMiddleware)
+
 # Include routers
 app.include_router(auth_router, prefix="/api/auth", tags=["auth"])
 app.include_router(classes_router, prefix="/api/classes", tags=["classes"])
@@ -43,15 +90,72 @@ app.include_router(calendar_router, prefix="/api/calendar", tags=["calendar"])
 app.include_router(announcements_router, prefix="/api/announcements", tags=["announcements"])
 app.include_router(reports_router, prefix="/api/reports", tags=["reports"])
 app.include_router(settings_router, prefix="/api/settings", tags=["settings"])
+app.include_router(search_router, prefix="/api/search", tags=["search"])
+app.include_router(attendance_router, prefix="/api/attendance", tags=["attendance"])
+app.include_router(grades_router, prefix="/api/grades", tags=["grades"])
 
 # Health check
 @app.get("/api/health")
 def health_check():
     return {"status": "OK", "message": "Learnroot API is running"}
 
+@app.get("/api/health/pools")
+def pool_health():
+    return {"status": "OK", "pools": pool_stats()}
+
+@app.get("/api/health/cache")
+def cache_health():
+    return {"status": "OK", "cache": response_cache.stats()}
+
+@app.get("/api/health/search")
+def search_health():
+    return {"status": "OK", "indexes": search_stats()}
+
+@app.get("/api/health/tenants")
+def tenant_health():
+    return {"status": "OK", "tenants": tenant_router.stats()}
+
+@app.get("/api/health/scheduler")
+def scheduler_health():
+    return {"status": "OK", "scheduler": scheduler.status()}
+
+@app.get("/api/health/startup")
+def startup_health():
+    return {"status": "OK", "seconds": {phase: round(seconds, 4) for phase, seconds in startup_timings.items()}}
+
+@registry.collector
+def _startup_gauges():
+    lines = ["# HELP learnroot_startup_seconds Worker startup time by phase", "# TYPE learnroot_startup_seconds gauge"]
+    return lines + [f'learnroot_startup_seconds{{phase="{phase}"}} {seconds:.6f}' for phase, seconds in startup_timings.items()]
+
+@app.get("/api/health/slow-queries")
+def slow_query_health():
+    return {"status": "OK", "queries": slow_queries.snapshot()}
+
+# Prometheus scrape target; counters are per worker, so scrape each one
+@app.get("/api/metrics", include_in_schema=False)
+def metrics():
+    return Response(registry.render(), media_type="text/plain; version=0.0.4")
+
 # Error handling
+@app.exception_handler(HashingBusyError)
+async def hashing_busy_handler(request: Request, exc: HashingBusyError):
+    return JSONResponse(
+        status_code=503,
+        content={"success": False, "message": "Server is busy, please retry shortly"},
+        headers={"Retry-After": "2"}
+    )
+
+@app.exception_handler(ClassFull)
+async def class_full_handler(request: Request, exc: ClassFull):
+    return JSONResponse(status_code=409, content={"success": False, "message": str(exc)})
+
 @app.exception_handler(Exception)
 async def global_exception_handler(request: Request, exc: Exception):
+    # Callers get a generic message, so the log is the only place the cause shows up
+    http_exceptions.inc(route_template(request.scope), type(exc).__name__)
+    print(f"❌ Unhandled {type(exc).__name__} on {request.method} {request.url.path}")
+    traceback.print_exception(type(exc), exc, exc.__traceback__)
     return JSONResponse(
         status_code=500,
         content={"success": False, "message": "Something went wrong!"}
@@ -60,20 +164,45 @@ async def global_exception_handler(request: Request, exc: Exception):
 @app.on_event("startup")
 async def startup_event():
     print("🚀 Starting Learnroot API server...")
-    
-    # Test database connection
-    try:
-        test_connection()
-    except Exception as e:
-        print(f"❌ Database connection failed: {e}")
-        raise
-    
-    # Initialize database tables
-    try:
-        create_database()
-    except Exception as e:
-        print(f"❌ Database initialization failed: {e}")
-        raise
+    started = time.perf_counter()
+
+    # One query checks the connection and the schema version; DDL only runs via scripts.migrate
+    async with AsyncSessionLocal() as db:
+        try:
+            schema = await check_schema(db)
+        except Exception as e:
+            print(f"❌ Database check failed: {e}")
+            await db.close()
+            # Pooled connections (and aiosqlite's threads) would otherwise keep the failed worker alive
+            await async_engine.dispose()
+            raise
+        startup_timings["schema_check"] = time.perf_counter() - started
+
+        # Each worker keeps its own settings snapshot and polls for changes made elsewhere;
+        # with several schools each one's is loaded by its first request instead
+        if not MULTI_TENANT:
+            phase_started = time.perf_counter()
+            await settings_store.refresh(db, force=True)
+            startup_timings["settings"] = time.perf_counter() - phase_started
+    await settings_store.start()
+
+    # Status transitions and expiry run in whichever worker wins the scheduler lock
+    if SCHEDULER_ENABLED:
+        await scheduler.start()
+
+    startup_timings["startup"] = time.perf_counter() - started
+    startup_timings["total"] = time.perf_counter() - IMPORT_STARTED
+    print(f"✅ Worker ready in {startup_timings['total'] * 1000:.0f} ms "
+          f"(imports {startup_timings['import'] * 1000:.0f} ms, schema v{schema['version']} "
+          f"checked in {startup_timings['schema_check'] * 1000:.0f} ms)")
+
+@app.on_event("shutdown")
+async def shutdown_event():
+    await scheduler.stop()
+    await settings_store.stop()
+    password_hasher.shutdown()
+    await tenant_router.dispose()
+    await async_engine.dispose()
 
 if __name__ == "__main__":
     import uvicorn
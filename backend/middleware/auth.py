@@ -1,11 +1,17 @@
 from fastapi import Depends, HTTPException, status
 from fastapi.security import HTTPBearer, HTTPAuthorizationCredentials
 from jose import JWTError, jwt
-from sqlalchemy.orm import Session
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
 from datetime import datetime, timedelta
-from typing import Optional
+from typing import Optional, NamedTuple
+from collections import OrderedDict
+import threading
+import time
 import os
-from config.database import get_db, User
+from config.database import get_async_db, User
+from config.tenancy import MULTI_TENANT, current_school_id
+from services.table_versions import track, read_versions
 
 security = HTTPBearer()
 
@@ -13,8 +19,98 @@ SECRET_KEY = os.getenv("JWT_SECRET", "fallback-secret-key")
 ALGORITHM = "HS256"
 ACCESS_TOKEN_EXPIRE_MINUTES = int(os.getenv("JWT_EXPIRES_IN", "10080"))  # 7 days in minutes
 
+PRINCIPAL_CACHE_TTL = float(os.getenv("AUTH_CACHE_TTL", "300"))  # seconds
+PRINCIPAL_CACHE_SIZE = int(os.getenv("AUTH_CACHE_SIZE", "10000"))
+# How often a worker re-reads the shared users version; bounds how long another worker's user change goes unseen
+PRINCIPAL_EPOCH_INTERVAL = float(os.getenv("AUTH_EPOCH_INTERVAL", "2"))  # seconds
+CLAIMS_ONLY = os.getenv("AUTH_CLAIMS_ONLY", "false").lower() == "true"
+
+class UserPrincipal(NamedTuple):
+    """Immutable snapshot of the authenticated user, safe to share across requests"""
+    id: int
+    name: Optional[str]
+    email: Optional[str]
+    role: str
+    created_at: Optional[datetime] = None
+
+track("users")
+
+class PrincipalCache:
+    """Bounded LRU of principals keyed by (user id, token), each entry expiring after a TTL.
+
+    Entries are stamped with the school's users table version (its epoch)
+    when they are filled. Any write to users in any worker bumps that
+    version, and an entry stamped with an older epoch than the one last
+    observed is a miss, so invalidation reaches every worker within
+    PRINCIPAL_EPOCH_INTERVAL rather than the TTL.
+    """
+
+    def __init__(self, maxsize=PRINCIPAL_CACHE_SIZE, ttl=PRINCIPAL_CACHE_TTL, epoch_interval=PRINCIPAL_EPOCH_INTERVAL):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self.epoch_interval = epoch_interval
+        self.entries = OrderedDict()
+        self.epochs = {}  # school id -> (users version, monotonic time it was read)
+        self.lock = threading.Lock()
+
+    def epoch_due(self, school_id):
+        epoch = self.epochs.get(school_id)
+        return epoch is None or epoch[1] + self.epoch_interval < time.monotonic()
+
+    def observe_epoch(self, school_id, version):
+        with self.lock:
+            self.epochs[school_id] = (version, time.monotonic())
+
+    def get(self, user_id, token):
+        key = (user_id, token)
+        with self.lock:
+            entry = self.entries.get(key)
+            if entry is None:
+                return None
+            principal, expires_at, epoch = entry
+            if expires_at < time.monotonic() or epoch != self.epochs.get(current_school_id(), (None,))[0]:
+                del self.entries[key]
+                return None
+            self.entries.move_to_end(key)
+            return principal
+
+    def set(self, user_id, token, principal):
+        epoch = self.epochs.get(current_school_id(), (None,))[0]
+        with self.lock:
+            self.entries[(user_id, token)] = (principal, time.monotonic() + self.ttl, epoch)
+            self.entries.move_to_end((user_id, token))
+            while len(self.entries) > self.maxsize:
+                self.entries.popitem(last=False)
+
+    def invalidate_user(self, user_id):
+        with self.lock:
+            for key in [key for key in self.entries if key[0] == user_id]:
+                del self.entries[key]
+
+    def clear(self):
+        with self.lock:
+            self.entries.clear()
+            self.epochs.clear()
+
+principal_cache = PrincipalCache()
+
+def invalidate_principal(user_id: int):
+    """Drop this worker's cached principals for a user at once; other workers see the users version move"""
+    principal_cache.invalidate_user(int(user_id))
+
+async def refresh_principal_epoch(db, versions=None):
+    """Re-read the shared users version if this worker's copy is due; `versions` may already hold it"""
+    school_id = current_school_id()
+    if versions is not None and "users" in versions:
+        principal_cache.observe_epoch(school_id, versions["users"])
+    elif principal_cache.epoch_due(school_id):
+        principal_cache.observe_epoch(school_id, (await read_versions(db, ["users"]))["users"])
+
 def create_access_token(data: dict, expires_delta: Optional[timedelta] = None):
     to_encode = data.copy()
+    if MULTI_TENANT:
+        # Later requests are routed to this school by the claim alone
+        to_encode.setdefault("school_id", current_school_id())
     if expires_delta:
         expire = datetime.utcnow() + expires_delta
     else:
@@ -29,29 +125,63 @@ def verify_token(token: str, credentials_exception):
         user_id: str = payload.get("userId")
         if user_id is None:
             raise credentials_exception
-        return {"userId": user_id, "email": payload.get("email"), "role": payload.get("role")}
     except JWTError:
         raise credentials_exception
+    # A token is only good at the school it was issued by
+    if MULTI_TENANT and payload.get("school_id") != current_school_id():
+        raise credentials_exception
+    return {"userId": user_id, "email": payload.get("email"), "role": payload.get("role"), "school_id": payload.get("school_id")}
 
-def get_current_user(credentials: HTTPAuthorizationCredentials = Depends(security), db: Session = Depends(get_db)):
-    credentials_exception = HTTPException(
+def _credentials_exception():
+    return HTTPException(
         status_code=status.HTTP_401_UNAUTHORIZED,
         detail="Could not validate credentials",
         headers={"WWW-Authenticate": "Bearer"},
     )
-    token_data = verify_token(credentials.credentials, credentials_exception)
-    
-    user = db.query(User).filter(User.id == token_data["userId"]).first()
+
+async def get_current_user(credentials: HTTPAuthorizationCredentials = Depends(security), db: AsyncSession = Depends(get_async_db)):
+    credentials_exception = _credentials_exception()
+    token = credentials.credentials
+    token_data = verify_token(token, credentials_exception)
+    user_id = int(token_data["userId"])
+
+    await refresh_principal_epoch(db)
+    principal = principal_cache.get(user_id, token)
+    if principal is not None:
+        return principal
+
+    # The session only checks out a connection here, on a cache miss
+    result = await db.execute(
+        select(User.id, User.name, User.email, User.role, User.created_at).where(User.id == user_id)
+    )
+    user = result.first()
     if user is None:
         raise credentials_exception
-    
-    return user
 
-def get_current_active_user(current_user: User = Depends(get_current_user)):
+    principal = UserPrincipal(id=user.id, name=user.name, email=user.email, role=user.role, created_at=user.created_at)
+    principal_cache.set(user_id, token, principal)
+    return principal
+
+async def get_token_principal(credentials: HTTPAuthorizationCredentials = Depends(security)):
+    """Build the principal from JWT claims alone, without touching the database"""
+    token_data = verify_token(credentials.credentials, _credentials_exception())
+    if not token_data["role"]:
+        raise _credentials_exception()
+    return UserPrincipal(
+        id=int(token_data["userId"]),
+        name=None,
+        email=token_data["email"],
+        role=token_data["role"]
+    )
+
+async def get_current_active_user(current_user: UserPrincipal = Depends(get_current_user)):
     return current_user
 
-def check_role(required_roles: list):
-    def role_checker(current_user: User = Depends(get_current_user)):
+def check_role(required_roles: list, claims_only: bool = CLAIMS_ONLY):
+    # Claims-only checks trust the role in the token until it expires
+    dependency = get_token_principal if claims_only else get_current_user
+
+    async def role_checker(current_user: UserPrincipal = Depends(dependency)):
         if current_user.role not in required_roles:
             raise HTTPException(
                 status_code=status.HTTP_403_FORBIDDEN,
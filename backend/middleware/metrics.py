@@ -0,0 +1,66 @@
+import os
+import time
+from starlette.routing import Match
+from services.metrics import (
+    METRICS_ENABLED, RequestStats, current_request, http_requests, http_latency, http_db_time, http_db_queries
+)
+
+# Adds a Server-Timing header (total, db) that browser devtools show per request
+SERVER_TIMING = os.getenv("SERVER_TIMING", "false").lower() == "true"
+
+
+def route_template(scope):
+    """'/api/teachers/{teacher_id}' rather than the concrete path, so label sets stay bounded"""
+    route = scope.get("route")
+    if route is None:
+        # Responses that never reached the router, such as response cache hits
+        for candidate in scope["app"].router.routes:
+            if candidate.matches(scope)[0] == Match.FULL:
+                route = candidate
+                break
+    return getattr(route, "path", None) or "unmatched"
+
+
+class MetricsMiddleware:
+    """Records latency, status and database work for every HTTP request.
+
+    A plain ASGI middleware rather than BaseHTTPMiddleware, so it adds no
+    extra task or body buffering and can set Server-Timing on the way out.
+    """
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or not METRICS_ENABLED:
+            await self.app(scope, receive, send)
+            return
+
+        started = time.perf_counter()
+        stats = RequestStats(scope)
+        token = current_request.set(stats)
+        status = 500
+        route = None
+
+        async def send_with_timing(message):
+            nonlocal status, route
+            if message["type"] == "http.response.start":
+                status = message["status"]
+                route = route_template(scope)
+                if SERVER_TIMING:
+                    total_ms = (time.perf_counter() - started) * 1000
+                    timing = f'app;dur={total_ms:.1f}, db;dur={stats.db_seconds * 1000:.1f};desc="{stats.queries} queries"'
+                    message["headers"] = list(message.get("headers", [])) + [(b"server-timing", timing.encode())]
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_with_timing)
+        finally:
+            current_request.reset(token)
+            route = route or route_template(scope)
+            method = scope["method"]
+            elapsed = time.perf_counter() - started
+            http_requests.inc(method, route, str(status))
+            http_latency.observe(elapsed, method, route)
+            http_db_time.observe(stats.db_seconds, method, route)
+            http_db_queries.observe(stats.queries, method, route)
@@ -0,0 +1,265 @@
+from collections import OrderedDict
+import hashlib
+import os
+import pickle
+import threading
+import time
+from jose import JWTError, jwt
+from starlette.middleware.base import BaseHTTPMiddleware
+from starlette.responses import Response
+from config.database import read_sessionmaker
+from config.tenancy import current_school_id
+from middleware.auth import SECRET_KEY, ALGORITHM, principal_cache, refresh_principal_epoch
+from services.feed import etag_matches
+from services.metrics import registry
+from services.table_versions import track, read_versions
+
+RESPONSE_CACHE_ENABLED = os.getenv("RESPONSE_CACHE_ENABLED", "true").lower() == "true"
+RESPONSE_CACHE_SIZE = int(os.getenv("RESPONSE_CACHE_SIZE", "2000"))  # entries per worker
+# "local" keeps entries per worker; a SHARED_BACKENDS name ("memory", "redis") adds a store all workers read
+RESPONSE_CACHE_BACKEND = os.getenv("RESPONSE_CACHE_BACKEND", "local")
+RESPONSE_CACHE_TTL = int(os.getenv("RESPONSE_CACHE_TTL", "3600"))  # seconds in the shared store
+
+# Route prefix -> tables its GET responses are built from
+CACHED_ROUTES = {
+    "/api/teachers": ("users", "teachers", "teacher_subjects"),
+    "/api/subjects": ("subjects", "grades", "grade_subjects", "teachers", "teacher_subjects"),
+    "/api/classes": ("classes", "teachers")
+}
+for _tables in CACHED_ROUTES.values():
+    track(*_tables)
+
+# Headers that describe the body rather than this particular response
+STORED_HEADERS = ("content-type",)
+
+
+class LocalBackend:
+    """Per-worker LRU of cached responses"""
+
+    def __init__(self, maxsize=RESPONSE_CACHE_SIZE):
+        self.maxsize = maxsize
+        self.entries = OrderedDict()
+        self.lock = threading.Lock()
+
+    def get(self, key):
+        with self.lock:
+            entry = self.entries.get(key)
+            if entry is not None:
+                self.entries.move_to_end(key)
+            return entry
+
+    def set(self, key, entry):
+        with self.lock:
+            self.entries[key] = entry
+            self.entries.move_to_end(key)
+            while len(self.entries) > self.maxsize:
+                self.entries.popitem(last=False)
+
+    def clear(self):
+        with self.lock:
+            self.entries.clear()
+
+
+class SharedBackend:
+    """A cache every worker reads, such as Redis; values are opaque bytes.
+
+    Keys embed the table versions, so entries never need deleting; the TTL
+    only bounds how long superseded versions take up space.
+    """
+
+    async def get(self, key):
+        raise NotImplementedError
+
+    async def set(self, key, value, ttl):
+        raise NotImplementedError
+
+
+class MemorySharedBackend(SharedBackend):
+    """Stand-in shared store for tests and single-host setups; stores serialized bytes like a real one"""
+
+    def __init__(self):
+        self.entries = {}
+        self.lock = threading.Lock()
+
+    async def get(self, key):
+        with self.lock:
+            entry = self.entries.get(key)
+            if entry is None or entry[1] < time.monotonic():
+                self.entries.pop(key, None)
+                return None
+            return entry[0]
+
+    async def set(self, key, value, ttl):
+        with self.lock:
+            self.entries[key] = (value, time.monotonic() + ttl)
+
+
+class RedisBackend(SharedBackend):
+    def __init__(self, url):
+        try:
+            import redis.asyncio as redis
+        except ImportError:
+            raise RuntimeError("RESPONSE_CACHE_BACKEND=redis needs the redis package installed")
+        self.client = redis.Redis.from_url(url)
+
+    async def get(self, key):
+        return await self.client.get(f"response:{key}")
+
+    async def set(self, key, value, ttl):
+        await self.client.set(f"response:{key}", value, ex=ttl)
+
+
+SHARED_BACKENDS = {
+    "memory": MemorySharedBackend,
+    "redis": lambda: RedisBackend(os.getenv("RESPONSE_CACHE_REDIS_URL", "redis://localhost:6379/0"))
+}
+
+
+class ResponseCache:
+    """Local LRU in front of an optional shared backend, with hit/miss counts per cached route"""
+
+    def __init__(self, local, shared=None, ttl=RESPONSE_CACHE_TTL):
+        self.local = local
+        self.shared = shared
+        self.ttl = ttl
+        self.counts = {route: dict.fromkeys(("hits", "misses", "not_modified", "bypassed"), 0) for route in CACHED_ROUTES}
+        self.lock = threading.Lock()
+
+    async def get(self, key):
+        entry = self.local.get(key)
+        if entry is None and self.shared is not None:
+            stored = await self.shared.get(key)
+            if stored is not None:
+                entry = pickle.loads(stored)
+                self.local.set(key, entry)
+        return entry
+
+    async def set(self, key, entry):
+        self.local.set(key, entry)
+        if self.shared is not None:
+            await self.shared.set(key, pickle.dumps(entry), self.ttl)
+
+    def record(self, route, outcome):
+        with self.lock:
+            self.counts[route][outcome] += 1
+
+    def stats(self):
+        with self.lock:
+            routes = {route: dict(counts) for route, counts in self.counts.items()}
+        for counts in routes.values():
+            served = counts["hits"] + counts["not_modified"] + counts["misses"]
+            counts["hit_ratio"] = round((counts["hits"] + counts["not_modified"]) / served, 4) if served else None
+        return {"backend": type(self.shared).__name__ if self.shared else "local", "entries": len(self.local.entries), "routes": routes}
+
+
+def _build_cache():
+    if RESPONSE_CACHE_BACKEND == "local":
+        return ResponseCache(LocalBackend())
+    if RESPONSE_CACHE_BACKEND not in SHARED_BACKENDS:
+        raise RuntimeError(f"Unknown RESPONSE_CACHE_BACKEND '{RESPONSE_CACHE_BACKEND}'")
+    return ResponseCache(LocalBackend(), SHARED_BACKENDS[RESPONSE_CACHE_BACKEND]())
+
+
+response_cache = _build_cache()
+
+
+@registry.collector
+def _cache_counts():
+    name = "learnroot_response_cache_requests_total"
+    lines = [f"# HELP {name} Cached-route GETs by outcome", f"# TYPE {name} counter"]
+    with response_cache.lock:
+        counts = {route: dict(outcomes) for route, outcomes in response_cache.counts.items()}
+    for route, outcomes in sorted(counts.items()):
+        lines += [f'{name}{{route="{route}",outcome="{outcome}"}} {count}' for outcome, count in outcomes.items()]
+    return lines
+
+
+def cached_route(request):
+    if request.method != "GET":
+        return None
+    path = request.url.path
+    for route in CACHED_ROUTES:
+        if path == route or path.startswith(route + "/"):
+            return route
+    return None
+
+
+def cached_principal(request):
+    """The caller's principal if the auth dependency validated this token recently, else None.
+
+    Cache hits never reach the route, so they are only served to tokens the
+    principal cache already vouches for; anything else goes through the
+    normal auth path (and fills the cache for next time).
+    """
+    scheme, _, token = request.headers.get("authorization", "").partition(" ")
+    if scheme.lower() != "bearer" or not token:
+        return None
+    try:
+        user_id = jwt.decode(token, SECRET_KEY, algorithms=[ALGORITHM]).get("userId")
+    except JWTError:
+        return None
+    if user_id is None:
+        return None
+    return principal_cache.get(int(user_id), token)
+
+
+def cache_key(request, role, versions):
+    query = sorted(request.query_params.multi_items())
+    material = repr((current_school_id(), request.url.path, query, role, sorted(versions.items())))
+    return hashlib.sha1(material.encode()).hexdigest()
+
+
+class ResponseCacheMiddleware(BaseHTTPMiddleware):
+    """Serve GETs on CACHED_ROUTES from a cache keyed by route, query, role and table versions.
+
+    Any flush touching a dependency table bumps its version, which changes
+    the key, so stale entries are simply never looked up again. The key
+    doubles as a strong ETag, letting unchanged polls get a 304 after one
+    version lookup. Versions are read before the handler runs, so a write
+    landing in between can only make an entry newer than its key.
+    """
+
+    # Async session factory for version reads; None follows the read routing of get_async_read_db
+    version_sessions = None
+
+    async def dispatch(self, request, call_next):
+        route = cached_route(request) if RESPONSE_CACHE_ENABLED else None
+        if route is None:
+            return await call_next(request)
+        factory = self.version_sessions or read_sessionmaker(request)
+        async with factory() as db:
+            # The users version rides along so cached principals see other workers' user changes
+            versions = await read_versions(db, {*CACHED_ROUTES[route], "users"})
+        await refresh_principal_epoch(None, versions)
+        principal = cached_principal(request)
+        if principal is None:
+            response_cache.record(route, "bypassed")
+            return await call_next(request)
+
+        key = cache_key(request, principal.role, {table: versions[table] for table in CACHED_ROUTES[route]})
+        headers = {"ETag": f'"{key}"', "Cache-Control": "private, no-cache"}
+
+        if etag_matches(request.headers.get("if-none-match"), headers["ETag"]):
+            response_cache.record(route, "not_modified")
+            return Response(status_code=304, headers=headers)
+
+        entry = await response_cache.get(key)
+        if entry is not None:
+            response_cache.record(route, "hits")
+            status_code, stored_headers, body = entry
+            return Response(content=body, status_code=status_code, headers={**stored_headers, **headers, "X-Cache": "HIT"})
+
+        response = await call_next(request)
+        if response.status_code != 200:
+            return response
+        body = b"".join([chunk async for chunk in response.body_iterator])
+        stored_headers = {name: value for name, value in response.headers.items() if name in STORED_HEADERS}
+        await response_cache.set(key, (response.status_code, stored_headers, body))
+        response_cache.record(route, "misses")
+        passed_headers = {name: value for name, value in response.headers.items() if name != "content-length"}
+        return Response(
+            content=body,
+            status_code=response.status_code,
+            headers={**passed_headers, **headers, "X-Cache": "MISS"},
+            background=response.background
+        )
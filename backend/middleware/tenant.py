@@ -0,0 +1,59 @@
+from jose import JWTError, jwt
+from starlette.responses import JSONResponse
+from config.tenancy import MULTI_TENANT, tenant_scope
+from middleware.auth import SECRET_KEY, ALGORITHM
+from services.schools import school_directory
+from services.settings_store import settings_store
+
+SCHOOL_HEADER = b"x-school-id"
+# Served the same for every school, or before one is known
+EXEMPT_PREFIXES = ("/api/health", "/api/metrics", "/docs", "/redoc", "/openapi.json")
+
+
+def requested_school(scope):
+    """School id from the bearer token's school_id claim, else the X-School-ID header (login, register)"""
+    headers = dict(scope["headers"])
+    scheme, _, token = headers.get(b"authorization", b"").decode("latin-1").partition(" ")
+    if scheme.lower() == "bearer" and token:
+        try:
+            school_id = jwt.decode(token, SECRET_KEY, algorithms=[ALGORITHM]).get("school_id")
+        except JWTError:
+            school_id = None  # the auth dependency rejects the token itself
+        if school_id is not None:
+            return int(school_id)
+    value = headers.get(SCHOOL_HEADER, b"").decode("latin-1").strip()
+    return int(value) if value.isdigit() else None
+
+
+def _error(status_code, message):
+    return JSONResponse(status_code=status_code, content={"success": False, "message": message})
+
+
+class TenantMiddleware:
+    """Selects the school each request works on.
+
+    Everything below runs inside tenant_scope(), so sessions route to the
+    school's database (or filter the shared schema), caches key by school
+    and inserts are stamped with it. A no-op for single-school deployments.
+    """
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or not MULTI_TENANT or scope["method"] == "OPTIONS" \
+                or scope["path"].startswith(EXEMPT_PREFIXES):
+            await self.app(scope, receive, send)
+            return
+
+        school_id = requested_school(scope)
+        if school_id is None:
+            await _error(400, "School not specified; send an X-School-ID header")(scope, receive, send)
+            return
+        if not await school_directory.is_active(school_id):
+            await _error(404, "School not found")(scope, receive, send)
+            return
+
+        with tenant_scope(school_id):
+            await settings_store.ensure()
+            await self.app(scope, receive, send)
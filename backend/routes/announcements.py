@@ -1,7 +1,213 @@
-from fastapi import APIRouter
+from fastapi import APIRouter, Depends, HTTPException, Header, Response
+from sqlalchemy import and_, or_, select
+from sqlalchemy.ext.asyncio import AsyncSession
+from pydantic import BaseModel
+from typing import Optional
+from datetime import date
+from config.database import get_async_db, get_async_read_db, User, Announcement, AnnouncementFeed
+from middleware.auth import get_current_user, check_role
+from services.list_query import ListParams, ListResource, paginate, decode_cursor, encode_cursor
+from services.projection import Projection
+from services.responses import FastJSONResponse
+from services.associations import announcements_for
+from services.feed import viewer_audiences, feed_etag, etag_matches
 
 router = APIRouter()
 
-@router.get("/")
-def get_announcements():
-    return {"success": True, "message": "Announcements endpoint - coming soon", "data": []}
\ No newline at end of file
+ANNOUNCEMENT_TYPES = {'general', 'urgent', 'academic', 'event'}
+
+class AnnouncementCreate(BaseModel):
+    title: str
+    content: str
+    type: str = 'general'
+    target_audience: Optional[str] = None
+    attachments: Optional[str] = None
+    expiry_date: Optional[date] = None
+
+class AnnouncementUpdate(BaseModel):
+    title: str = None
+    content: str = None
+    type: str = None
+    target_audience: Optional[str] = None
+    attachments: Optional[str] = None
+    expiry_date: Optional[date] = None
+    status: str = None
+
+ANNOUNCEMENT_PROJECTION = Projection(
+    fields={
+        "id": Announcement.id,
+        "title": Announcement.title,
+        "content": Announcement.content,
+        "type": Announcement.type,
+        "target_audience": Announcement.target_audience,
+        "attachments": Announcement.attachments,
+        "expiry_date": Announcement.expiry_date,
+        "status": Announcement.status,
+        "created_by": Announcement.created_by,
+        "created_at": Announcement.created_at
+    }
+)
+
+ANNOUNCEMENT_LIST = ListResource(
+    ANNOUNCEMENT_PROJECTION,
+    filters={
+        "status": (Announcement.status, str),
+        "type": (Announcement.type, str),
+        # Explicit targeting only, via the announcement_audiences indexes
+        "class_id": (lambda class_id: Announcement.id.in_(announcements_for('class', class_id=class_id)), int),
+        "grade": (lambda grade: Announcement.id.in_(announcements_for('grade', grade)), str),
+        "role": (lambda role: Announcement.id.in_(announcements_for('role', role)), str)
+    },
+    id_column=Announcement.id,
+    created_at_column=Announcement.created_at
+)
+
+@router.get("/", response_model=dict)
+async def get_announcements(
+    params: ListParams = Depends(),
+    status: Optional[str] = None,
+    type: Optional[str] = None,
+    class_id: Optional[int] = None,
+    grade: Optional[str] = None,
+    role: Optional[str] = None,
+    db: AsyncSession = Depends(get_async_read_db),
+    current_user: User = Depends(get_current_user)
+):
+    filters = {"status": status, "type": type, "class_id": class_id, "grade": grade, "role": role}
+    return FastJSONResponse(await paginate(db, ANNOUNCEMENT_LIST, params, filters))
+
+@router.get("/feed")
+async def get_feed(
+    params: ListParams = Depends(),
+    type: Optional[str] = None,
+    status: str = 'active',
+    include_expired: bool = False,
+    since: Optional[str] = None,
+    if_none_match: Optional[str] = Header(None),
+    db: AsyncSession = Depends(get_async_read_db),
+    current_user: User = Depends(get_current_user)
+):
+    """Announcements targeted at the current user, newest first"""
+    audiences = await viewer_audiences(db, current_user)
+    today = date.today()
+
+    # Versions change on every write to these audiences, so an unchanged poll stops here
+    etag = await feed_etag(db, audiences, type, status, include_expired, since, params.cursor,
+                           params.limit, params.fields, today.isoformat())
+    headers = {"ETag": etag, "Cache-Control": "private, no-cache"}
+    if etag_matches(if_none_match, etag):
+        return Response(status_code=304, headers=headers)
+
+    feed = AnnouncementFeed
+    entries = select(feed.announcement_id, feed.published_at).where(
+        feed.audience.in_(audiences), feed.status == status
+    ).distinct()
+    if type:
+        entries = entries.where(feed.type == type)
+    if not include_expired:
+        entries = entries.where(or_(feed.expiry_date.is_(None), feed.expiry_date >= today))
+    if since:
+        published_at, announcement_id = decode_cursor(since)
+        entries = entries.where(or_(
+            feed.published_at > published_at,
+            and_(feed.published_at == published_at, feed.announcement_id > announcement_id)
+        ))
+    if params.cursor:
+        published_at, announcement_id = decode_cursor(params.cursor)
+        entries = entries.where(or_(
+            feed.published_at < published_at,
+            and_(feed.published_at == published_at, feed.announcement_id < announcement_id)
+        ))
+    entries = entries.order_by(feed.published_at.desc(), feed.announcement_id.desc()).limit(params.limit + 1).subquery()
+
+    columns = ANNOUNCEMENT_PROJECTION.columns(params.fields)
+    statement = select(*columns, entries.c.published_at, entries.c.announcement_id).join(
+        entries, entries.c.announcement_id == Announcement.id
+    ).order_by(entries.c.published_at.desc(), entries.c.announcement_id.desc())
+    rows = (await db.execute(statement)).all()
+
+    has_more = len(rows) > params.limit
+    rows = rows[:params.limit]
+    names = [column.key for column in columns]
+    newest = encode_cursor(rows[0][-2], rows[0][-1]) if rows else since
+    return FastJSONResponse({
+        "success": True,
+        "data": [dict(zip(names, row)) for row in rows],
+        "pagination": {
+            "limit": params.limit,
+            "next_cursor": encode_cursor(rows[-1][-2], rows[-1][-1]) if has_more else None,
+            "has_more": has_more
+        },
+        "since": newest
+    }, headers=headers)
+
+@router.get("/{announcement_id}", response_model=dict)
+async def get_announcement(
+    announcement_id: int,
+    db: AsyncSession = Depends(get_async_read_db),
+    current_user: User = Depends(get_current_user)
+):
+    announcement = await ANNOUNCEMENT_PROJECTION.fetch_one(db, Announcement.id == announcement_id)
+    if not announcement:
+        raise HTTPException(status_code=404, detail="Announcement not found")
+    return FastJSONResponse({"success": True, "data": announcement})
+
+# Feed entries and versions are rewritten by services/feed.py when these commits flush
+@router.post("/", response_model=dict)
+async def create_announcement(
+    announcement: AnnouncementCreate,
+    db: AsyncSession = Depends(get_async_db),
+    current_user: User = Depends(check_role(['super_admin', 'school_admin']))
+):
+    if not announcement.title or not announcement.content:
+        raise HTTPException(status_code=400, detail="Title and content are required")
+    if announcement.type not in ANNOUNCEMENT_TYPES:
+        raise HTTPException(status_code=400, detail="Invalid announcement type")
+
+    db_announcement = Announcement(**announcement.dict(), created_by=current_user.id)
+    db.add(db_announcement)
+    await db.commit()
+
+    return {
+        "success": True,
+        "message": "Announcement created successfully",
+        "data": await ANNOUNCEMENT_PROJECTION.fetch_one(db, Announcement.id == db_announcement.id)
+    }
+
+@router.put("/{announcement_id}", response_model=dict)
+async def update_announcement(
+    announcement_id: int,
+    announcement_update: AnnouncementUpdate,
+    db: AsyncSession = Depends(get_async_db),
+    current_user: User = Depends(check_role(['super_admin', 'school_admin']))
+):
+    db_announcement = await db.get(Announcement, announcement_id)
+    if not db_announcement:
+        raise HTTPException(status_code=404, detail="Announcement not found")
+
+    update_data = announcement_update.dict(exclude_unset=True)
+    if update_data.get('type', db_announcement.type) not in ANNOUNCEMENT_TYPES:
+        raise HTTPException(status_code=400, detail="Invalid announcement type")
+    if update_data.get('status', db_announcement.status) not in ('active', 'expired'):
+        raise HTTPException(status_code=400, detail="Status must be active or expired")
+
+    for key, value in update_data.items():
+        setattr(db_announcement, key, value)
+    await db.commit()
+
+    return {"success": True, "message": "Announcement updated successfully"}
+
+@router.delete("/{announcement_id}", response_model=dict)
+async def delete_announcement(
+    announcement_id: int,
+    db: AsyncSession = Depends(get_async_db),
+    current_user: User = Depends(check_role(['super_admin', 'school_admin']))
+):
+    db_announcement = await db.get(Announcement, announcement_id)
+    if not db_announcement:
+        raise HTTPException(status_code=404, detail="Announcement not found")
+
+    await db.delete(db_announcement)
+    await db.commit()
+
+    return {"success": True, "message": "Announcement deleted successfully"}
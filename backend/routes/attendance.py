@@ -0,0 +1,120 @@
+from fastapi import APIRouter, Depends, HTTPException
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+from pydantic import BaseModel
+from typing import List, Optional
+from datetime import date
+from config.database import get_async_db, get_async_read_db, User, Class
+from middleware.auth import get_current_user, check_role
+from services import attendance
+from services.responses import FastJSONResponse
+from services.settings_store import get_settings
+
+router = APIRouter()
+
+class AttendanceMark(BaseModel):
+    date: date
+    absent: List[int] = []
+    present: Optional[List[int]] = None  # defaults to everyone on the roll not listed as absent
+    merge: bool = False  # only change the listed roll numbers, keeping the day's other marks
+
+def summary_range(month, term, start, end):
+    """(start, end) of a month ('2026-07'), a term from settings, or explicit dates; the current month by default"""
+    if sum(value is not None for value in (month, term, start or end)) > 1:
+        raise HTTPException(status_code=400, detail="Give only one of month, term or start/end")
+    if term is not None:
+        for academic_term in get_settings().academic_terms():
+            if academic_term.name.lower() == term.lower():
+                return academic_term.start_date, academic_term.end_date
+        raise HTTPException(status_code=400, detail=f"Unknown term: {term}")
+    if start is not None or end is not None:
+        if start is None or end is None or end < start:
+            raise HTTPException(status_code=400, detail="start and end are both needed, with end on or after start")
+        return start, end
+    try:
+        return attendance.month_range(month or date.today().strftime("%Y-%m"))
+    except ValueError:
+        raise HTTPException(status_code=400, detail="month must look like 2026-07")
+
+async def require_class(db, class_id):
+    if (await db.execute(select(Class.id).where(Class.id == class_id))).scalar() is None:
+        raise HTTPException(status_code=404, detail="Class not found")
+
+@router.put("/classes/{class_id}", response_model=dict)
+async def mark_class(
+    class_id: int,
+    payload: AttendanceMark,
+    db: AsyncSession = Depends(get_async_db),
+    current_user: User = Depends(check_role(['super_admin', 'school_admin', 'moderator']))
+):
+    """Mark a whole class for one day in one request; stored as a single bitmap row"""
+    if payload.date > date.today():
+        raise HTTPException(status_code=400, detail="Attendance cannot be marked for a future date")
+    if payload.date.strftime("%A").lower() not in get_settings().working_days:
+        raise HTTPException(status_code=400, detail=f"{payload.date} is not a working day")
+    await require_class(db, class_id)
+
+    try:
+        result = await db.run_sync(
+            attendance.mark, class_id, payload.date, payload.absent, payload.present, payload.merge, current_user.id
+        )
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    await db.commit()
+
+    return FastJSONResponse({"success": True, "message": "Attendance marked successfully", "data": result})
+
+@router.get("/classes/{class_id}", response_model=dict)
+async def get_class_register(
+    class_id: int,
+    day: Optional[date] = None,
+    db: AsyncSession = Depends(get_async_read_db),
+    current_user: User = Depends(get_current_user)
+):
+    """One day's marks for a class (today by default); status is null for students not yet marked"""
+    await require_class(db, class_id)
+    return FastJSONResponse({"success": True, "data": await db.run_sync(attendance.register, class_id, day or date.today())})
+
+@router.get("/classes/{class_id}/summary", response_model=dict)
+async def get_class_summary(
+    class_id: int,
+    month: Optional[str] = None,
+    term: Optional[str] = None,
+    start: Optional[date] = None,
+    end: Optional[date] = None,
+    db: AsyncSession = Depends(get_async_read_db),
+    current_user: User = Depends(get_current_user)
+):
+    """Per-student days present and absent over a month, a term or a date range"""
+    start, end = summary_range(month, term, start, end)
+    await require_class(db, class_id)
+    return FastJSONResponse({"success": True, "data": await db.run_sync(attendance.class_summary, class_id, start, end)})
+
+@router.get("/students/{student_id}", response_model=dict)
+async def get_student_attendance(
+    student_id: int,
+    month: Optional[str] = None,
+    term: Optional[str] = None,
+    start: Optional[date] = None,
+    end: Optional[date] = None,
+    db: AsyncSession = Depends(get_async_read_db),
+    current_user: User = Depends(get_current_user)
+):
+    start, end = summary_range(month, term, start, end)
+    result = await db.run_sync(attendance.student_summary, student_id, start, end)
+    if result is None:
+        raise HTTPException(status_code=404, detail="Student not found")
+    return FastJSONResponse({"success": True, "data": result})
+
+@router.get("/summary", response_model=dict)
+async def get_school_summary(
+    month: Optional[str] = None,
+    term: Optional[str] = None,
+    start: Optional[date] = None,
+    end: Optional[date] = None,
+    db: AsyncSession = Depends(get_async_read_db),
+    current_user: User = Depends(get_current_user)
+):
+    """Attendance percentage of every class over a month, a term or a date range"""
+    start, end = summary_range(month, term, start, end)
+    return FastJSONResponse({"success": True, "data": await db.run_sync(attendance.school_summary, start, end)})
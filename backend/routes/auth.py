@@ -1,15 +1,14 @@
 from fastapi import APIRouter, Depends, HTTPException, status
-from sqlalchemy.orm import Session
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
 from pydantic import BaseModel, EmailStr
-from passlib.context import CryptContext
-from config.database import get_db, User
+from config.database import get_async_db, User
 from middleware.auth import create_access_token, get_current_user
+from services.password_hasher import get_password_hash_async, verify_password_async
 import re
 
 router = APIRouter()
 
-pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
-
 class UserCreate(BaseModel):
     name: str
     email: EmailStr
@@ -27,19 +26,13 @@ class Token(BaseModel):
 class TokenData(BaseModel):
     user: dict
 
-def verify_password(plain_password, hashed_password):
-    return pwd_context.verify(plain_password, hashed_password)
-
-def get_password_hash(password):
-    return pwd_context.hash(password)
-
 def validate_role(role: str):
     allowed_roles = ['super_admin', 'school_admin', 'moderator']
     if role not in allowed_roles:
         raise HTTPException(status_code=400, detail="Invalid role")
 
 @router.post("/register", response_model=dict)
-def register(user: UserCreate, db: Session = Depends(get_db)):
+async def register(user: UserCreate, db: AsyncSession = Depends(get_async_db)):
     # Validate input
     if len(user.name) < 3:
         raise HTTPException(status_code=400, detail="Name must be at least 3 characters")
@@ -49,16 +42,15 @@ def register(user: UserCreate, db: Session = Depends(get_db)):
     validate_role(user.role)
     
     # Check if user exists
-    db_user = db.query(User).filter(User.email == user.email).first()
-    if db_user:
+    result = await db.execute(select(User.id).where(User.email == user.email))
+    if result.first():
         raise HTTPException(status_code=400, detail="User with this email already exists")
     
     # Create user
-    hashed_password = get_password_hash(user.password)
+    hashed_password = await get_password_hash_async(user.password)
     db_user = User(name=user.name, email=user.email, password=hashed_password, role=user.role)
     db.add(db_user)
-    db.commit()
-    db.refresh(db_user)
+    await db.commit()
     
     return {
         "success": True,
@@ -72,13 +64,16 @@ def register(user: UserCreate, db: Session = Depends(get_db)):
     }
 
 @router.post("/login", response_model=dict)
-def login(user: UserLogin, db: Session = Depends(get_db)):
+async def login(user: UserLogin, db: AsyncSession = Depends(get_async_db)):
     # Find user
-    db_user = db.query(User).filter(User.email == user.email).first()
+    result = await db.execute(
+        select(User.id, User.name, User.email, User.role, User.password).where(User.email == user.email)
+    )
+    db_user = result.first()
     if not db_user:
         raise HTTPException(status_code=401, detail="Invalid email or password")
     
-    if not verify_password(user.password, db_user.password):
+    if not await verify_password_async(user.password, db_user.password):
         raise HTTPException(status_code=401, detail="Invalid email or password")
     
     # Create token
@@ -101,7 +96,7 @@ def login(user: UserLogin, db: Session = Depends(get_db)):
     }
 
 @router.get("/me", response_model=dict)
-def read_users_me(current_user: User = Depends(get_current_user)):
+async def read_users_me(current_user: User = Depends(get_current_user)):
     return {
         "success": True,
         "data": {
@@ -116,13 +111,13 @@ def read_users_me(current_user: User = Depends(get_current_user)):
     }
 
 @router.post("/logout", response_model=dict)
-def logout():
+async def logout():
     return {"success": True, "message": "Logout successful"}
 
 @router.post("/forgot-password", response_model=dict)
-def forgot_password(email: EmailStr, db: Session = Depends(get_db)):
+async def forgot_password(email: EmailStr, db: AsyncSession = Depends(get_async_db)):
     # Check if user exists
-    db_user = db.query(User).filter(User.email == email).first()
+    db_user = (await db.execute(select(User.id).where(User.email == email))).first()
     
     # Always return success for security
     return {
@@ -131,7 +126,7 @@ def forgot_password(email: EmailStr, db: Session = Depends(get_db)):
     }
 
 @router.post("/reset-password", response_model=dict)
-def reset_password(token: str, password: str):
+async def reset_password(token: str, password: str):
     if len(password) < 6:
         raise HTTPException(status_code=400, detail="Password must be at least 6 characters")
     
@@ -1,7 +1,198 @@
-from fastapi import APIRouter
+from fastapi import APIRouter, Depends, HTTPException, Header, Response
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+from pydantic import BaseModel
+from typing import Optional
+from datetime import date, time, timedelta
+from config.database import get_async_db, get_async_read_db, User, Event
+from middleware.auth import get_current_user, check_role
+from services.responses import FastJSONResponse
+from services.feed import ADMIN_ROLES, EVERYONE, EVERYTHING, viewer_audiences, etag_matches
+from services.event_calendar import (
+    EVENT_COLUMNS, MAX_WINDOW_DAYS, normalize_rule, calendar_version, calendar_etag,
+    events_in_range, ics_feed
+)
 
 router = APIRouter()
 
-@router.get("/")
-def get_calendar():
-    return {"success": True, "message": "Calendar endpoint - coming soon", "data": []}
\ No newline at end of file
+EVENT_TYPES = {'holiday', 'exam', 'ptm', 'activity', 'other'}
+EVENT_STATUSES = {'upcoming', 'ongoing', 'completed', 'cancelled'}
+
+class EventCreate(BaseModel):
+    title: str
+    description: Optional[str] = None
+    type: str = 'other'
+    start_date: date
+    end_date: Optional[date] = None
+    start_time: Optional[time] = None
+    end_time: Optional[time] = None
+    location: Optional[str] = None
+    target_audience: Optional[str] = None
+    recurrence_rule: Optional[str] = None
+
+class EventUpdate(BaseModel):
+    title: str = None
+    description: Optional[str] = None
+    type: str = None
+    start_date: date = None
+    end_date: Optional[date] = None
+    start_time: Optional[time] = None
+    end_time: Optional[time] = None
+    location: Optional[str] = None
+    target_audience: Optional[str] = None
+    recurrence_rule: Optional[str] = None
+    status: str = None
+
+def month_window(today):
+    start = today.replace(day=1)
+    end = (start + timedelta(days=32)).replace(day=1) - timedelta(days=1)
+    return start, end
+
+async def resolve_audiences(db, current_user, audience):
+    """The viewer's own audience keys, or one audience's view when an admin asks for it"""
+    if audience is None:
+        return await viewer_audiences(db, current_user)
+    if current_user.role not in ADMIN_ROLES:
+        raise HTTPException(status_code=403, detail="Only administrators can view other audiences")
+    kind, _, value = audience.partition(':')
+    if audience in (EVERYONE, EVERYTHING):
+        return (audience,)
+    if kind not in ('role', 'segment', 'grade', 'class') or not value or (kind == 'class' and not value.isdigit()):
+        raise HTTPException(status_code=400, detail="Audience must look like role:teacher, segment:primary, grade:9 or class:12")
+    return tuple(sorted({EVERYONE, audience}))
+
+def validate_event(data):
+    if data.get('type') is not None and data['type'] not in EVENT_TYPES:
+        raise HTTPException(status_code=400, detail="Invalid event type")
+    if data.get('status') is not None and data['status'] not in EVENT_STATUSES:
+        raise HTTPException(status_code=400, detail="Invalid event status")
+    if data.get('end_date') and data.get('start_date') and data['end_date'] < data['start_date']:
+        raise HTTPException(status_code=400, detail="End date cannot be before start date")
+    if 'recurrence_rule' in data:
+        try:
+            data['recurrence_rule'] = normalize_rule(data['recurrence_rule'])
+        except ValueError as e:
+            raise HTTPException(status_code=400, detail=str(e))
+
+@router.get("/", response_model=dict)
+async def get_calendar(
+    start: Optional[date] = None,
+    end: Optional[date] = None,
+    type: Optional[str] = None,
+    audience: Optional[str] = None,
+    if_none_match: Optional[str] = Header(None),
+    db: AsyncSession = Depends(get_async_read_db),
+    current_user: User = Depends(get_current_user)
+):
+    """Event occurrences overlapping [start, end], defaulting to the current month"""
+    if start is None or end is None:
+        default_start, default_end = month_window(date.today())
+        start, end = start or default_start, end or default_end
+    if end < start:
+        raise HTTPException(status_code=400, detail="End date cannot be before start date")
+    if (end - start).days > MAX_WINDOW_DAYS:
+        raise HTTPException(status_code=400, detail=f"Date range cannot exceed {MAX_WINDOW_DAYS} days")
+
+    audiences = await resolve_audiences(db, current_user, audience)
+    version = await calendar_version(db)
+    etag = calendar_etag(version, audiences, start, end, type)
+    headers = {"ETag": etag, "Cache-Control": "private, no-cache"}
+    if etag_matches(if_none_match, etag):
+        return Response(status_code=304, headers=headers)
+
+    events = await events_in_range(db, start, end, audiences, version, type)
+    return FastJSONResponse({
+        "success": True,
+        "data": events,
+        "range": {"start": start, "end": end}
+    }, headers=headers)
+
+@router.get("/feed.ics")
+async def get_ics_feed(
+    audience: Optional[str] = None,
+    if_none_match: Optional[str] = Header(None),
+    db: AsyncSession = Depends(get_async_read_db),
+    current_user: User = Depends(get_current_user)
+):
+    """iCalendar feed for the current user's audiences, or one audience for admins"""
+    audiences = await resolve_audiences(db, current_user, audience)
+    version = await calendar_version(db)
+    etag = calendar_etag(version, 'ics', audiences, date.today())
+    headers = {"ETag": etag, "Cache-Control": "private, no-cache"}
+    if etag_matches(if_none_match, etag):
+        return Response(status_code=304, headers=headers)
+
+    body = await ics_feed(db, audiences, version, name=f"Learnroot ({audience})" if audience else "Learnroot")
+    return Response(content=body, media_type="text/calendar", headers=headers)
+
+@router.get("/events/{event_id}", response_model=dict)
+async def get_event(
+    event_id: int,
+    db: AsyncSession = Depends(get_async_read_db),
+    current_user: User = Depends(get_current_user)
+):
+    row = (await db.execute(select(*EVENT_COLUMNS).where(Event.id == event_id))).first()
+    if not row:
+        raise HTTPException(status_code=404, detail="Event not found")
+    return FastJSONResponse({"success": True, "data": dict(row._mapping)})
+
+# span_days, last_date and the calendar version are maintained by services/event_calendar.py on flush
+@router.post("/events", response_model=dict)
+async def create_event(
+    event: EventCreate,
+    db: AsyncSession = Depends(get_async_db),
+    current_user: User = Depends(check_role(['super_admin', 'school_admin']))
+):
+    data = event.dict()
+    if not data['title']:
+        raise HTTPException(status_code=400, detail="Title is required")
+    validate_event(data)
+
+    db_event = Event(**data, created_by=current_user.id)
+    db.add(db_event)
+    await db.commit()
+
+    row = (await db.execute(select(*EVENT_COLUMNS).where(Event.id == db_event.id))).first()
+    return FastJSONResponse({
+        "success": True,
+        "message": "Event created successfully",
+        "data": dict(row._mapping)
+    })
+
+@router.put("/events/{event_id}", response_model=dict)
+async def update_event(
+    event_id: int,
+    event_update: EventUpdate,
+    db: AsyncSession = Depends(get_async_db),
+    current_user: User = Depends(check_role(['super_admin', 'school_admin']))
+):
+    db_event = await db.get(Event, event_id)
+    if not db_event:
+        raise HTTPException(status_code=404, detail="Event not found")
+
+    update_data = event_update.dict(exclude_unset=True)
+    checked = {'start_date': db_event.start_date, 'end_date': db_event.end_date, **update_data}
+    validate_event(checked)
+    if 'recurrence_rule' in update_data:
+        update_data['recurrence_rule'] = checked['recurrence_rule']
+
+    for key, value in update_data.items():
+        setattr(db_event, key, value)
+    await db.commit()
+
+    return {"success": True, "message": "Event updated successfully"}
+
+@router.delete("/events/{event_id}", response_model=dict)
+async def delete_event(
+    event_id: int,
+    db: AsyncSession = Depends(get_async_db),
+    current_user: User = Depends(check_role(['super_admin', 'school_admin']))
+):
+    db_event = await db.get(Event, event_id)
+    if not db_event:
+        raise HTTPException(status_code=404, detail="Event not found")
+
+    await db.delete(db_event)
+    await db.commit()
+
+    return {"success": True, "message": "Event deleted successfully"}
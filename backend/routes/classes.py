@@ -1,7 +1,43 @@
-from fastapi import APIRouter
+from fastapi import APIRouter, Depends
+from sqlalchemy.ext.asyncio import AsyncSession
+from typing import Optional
+from config.database import get_async_read_db, User, Class, Teacher
+from middleware.auth import get_current_user
+from services.list_query import ListParams, ListResource, paginate
+from services.projection import Projection
+from services.responses import FastJSONResponse
 
 router = APIRouter()
 
-@router.get("/")
-def get_classes():
-    return {"success": True, "message": "Classes endpoint - coming soon", "data": []}
\ No newline at end of file
+CLASS_PROJECTION = Projection(
+    fields={
+        "id": Class.id,
+        "name": Class.name,
+        "segment": Class.segment,
+        "grade": Class.grade,
+        "section": Class.section,
+        "class_teacher_id": Class.class_teacher_id,
+        "class_teacher_name": Teacher.name,
+        "max_students": Class.max_students,
+        "current_students": Class.current_students,
+        "created_at": Class.created_at
+    },
+    from_clause=Class.__table__.outerjoin(Teacher.__table__, Class.class_teacher_id == Teacher.id)
+)
+
+CLASS_LIST = ListResource(
+    CLASS_PROJECTION,
+    filters={"grade": (Class.grade, str), "segment": (Class.segment, str)},
+    id_column=Class.id,
+    created_at_column=Class.created_at
+)
+
+@router.get("/", response_model=dict)
+async def get_classes(
+    params: ListParams = Depends(),
+    grade: Optional[str] = None,
+    segment: Optional[str] = None,
+    db: AsyncSession = Depends(get_async_read_db),
+    current_user: User = Depends(get_current_user)
+):
+    return FastJSONResponse(await paginate(db, CLASS_LIST, params, {"grade": grade, "segment": segment}))
@@ -1,7 +1,210 @@
-from fastapi import APIRouter
+from fastapi import APIRouter, Depends, HTTPException
+from sqlalchemy import insert, select
+from sqlalchemy.ext.asyncio import AsyncSession
+from pydantic import BaseModel, Field
+from typing import List, Optional
+from config.database import get_async_db, get_async_read_db, User, Class, Exam, ExamSubject, Student, Subject
+from middleware.auth import get_current_user, check_role
+from services import gradebook
+from services.responses import FastJSONResponse
+from services.settings_store import get_settings
 
 router = APIRouter()
 
-@router.get("/")
-def get_grades():
-    return {"success": True, "message": "Grades endpoint - coming soon", "data": []}
\ No newline at end of file
+class ExamPaper(BaseModel):
+    subject_id: int
+    max_marks: float = Field(gt=0, le=1000)
+
+class ExamCreate(BaseModel):
+    name: str
+    grade: str
+    academic_year: Optional[str] = None  # the current academic year by default
+    term: Optional[str] = None
+    papers: List[ExamPaper]
+
+class MarkEntry(BaseModel):
+    student_id: Optional[int] = None
+    roll_number: Optional[int] = None
+    marks: Optional[float] = None
+    absent: bool = False
+
+class MarksUpload(BaseModel):
+    class_id: int
+    subject_id: int
+    marks: List[MarkEntry]
+
+class MarkUpdate(BaseModel):
+    marks: Optional[float] = None
+    absent: bool = False
+
+class PublishRequest(BaseModel):
+    force: bool = False  # publish even though some marks are missing; they count as zero
+
+def serialize_exam(exam):
+    return {
+        "id": exam.id, "name": exam.name, "grade": exam.grade, "academic_year": exam.academic_year,
+        "term": exam.term, "status": exam.status, "published_at": exam.published_at, "created_at": exam.created_at
+    }
+
+async def load_exam(db, exam_id, lock=False):
+    """The exam, or 404.
+
+    Writers pass lock, so mark uploads and publishing of one exam run one
+    at a time, each ranking from the results the last one committed.
+    """
+    statement = select(Exam).where(Exam.id == exam_id)
+    if lock:
+        statement = statement.with_for_update()
+    exam = (await db.execute(statement)).scalar_one_or_none()
+    if not exam:
+        raise HTTPException(status_code=404, detail="Exam not found")
+    return exam
+
+@router.get("/", response_model=dict)
+async def get_exams(
+    grade: Optional[str] = None,
+    academic_year: Optional[str] = None,
+    db: AsyncSession = Depends(get_async_read_db),
+    current_user: User = Depends(get_current_user)
+):
+    statement = select(Exam).order_by(Exam.created_at.desc(), Exam.id.desc())
+    if grade:
+        statement = statement.where(Exam.grade == grade)
+    if academic_year:
+        statement = statement.where(Exam.academic_year == academic_year)
+    exams = (await db.execute(statement)).scalars().all()
+    return FastJSONResponse({"success": True, "data": [serialize_exam(exam) for exam in exams]})
+
+@router.post("/", response_model=dict)
+async def create_exam(
+    payload: ExamCreate,
+    db: AsyncSession = Depends(get_async_db),
+    current_user: User = Depends(check_role(['super_admin', 'school_admin']))
+):
+    subject_ids = [paper.subject_id for paper in payload.papers]
+    if not subject_ids or len(set(subject_ids)) != len(subject_ids):
+        raise HTTPException(status_code=400, detail="An exam needs at least one paper, each subject once")
+    known = set((await db.execute(select(Subject.id).where(Subject.id.in_(subject_ids)))).scalars())
+    if known != set(subject_ids):
+        raise HTTPException(status_code=400, detail=f"Unknown subjects: {', '.join(map(str, sorted(set(subject_ids) - known)))}")
+    if (await db.execute(select(Class.id).where(Class.grade == payload.grade).limit(1))).scalar() is None:
+        raise HTTPException(status_code=400, detail=f"No class is in grade {payload.grade}")
+
+    exam = Exam(
+        name=payload.name, grade=payload.grade, term=payload.term, created_by=current_user.id,
+        academic_year=payload.academic_year or get_settings().academic_year
+    )
+    db.add(exam)
+    await db.flush()
+    await db.execute(insert(ExamSubject), [
+        {"exam_id": exam.id, "subject_id": paper.subject_id, "max_marks": paper.max_marks} for paper in payload.papers
+    ])
+    await db.commit()
+
+    return FastJSONResponse({"success": True, "message": "Exam created successfully", "data": serialize_exam(exam)})
+
+@router.get("/{exam_id}", response_model=dict)
+async def get_exam(
+    exam_id: int,
+    db: AsyncSession = Depends(get_async_read_db),
+    current_user: User = Depends(get_current_user)
+):
+    """The exam, its papers and which classes still have marks to enter"""
+    exam = await load_exam(db, exam_id)
+    papers = await db.execute(
+        select(ExamSubject.subject_id, Subject.name, Subject.code, ExamSubject.max_marks)
+        .join(Subject, Subject.id == ExamSubject.subject_id)
+        .where(ExamSubject.exam_id == exam_id)
+        .order_by(Subject.name)
+    )
+    return FastJSONResponse({"success": True, "data": {
+        **serialize_exam(exam),
+        "papers": [dict(row._mapping) for row in papers],
+        "missing": await db.run_sync(gradebook.missing_marks, exam)
+    }})
+
+@router.put("/{exam_id}/marks", response_model=dict)
+async def upload_marks(
+    exam_id: int,
+    payload: MarksUpload,
+    db: AsyncSession = Depends(get_async_db),
+    current_user: User = Depends(check_role(['super_admin', 'school_admin', 'moderator']))
+):
+    """Marks of one class in one paper, saved in one batched insert; results update incrementally"""
+    exam = await load_exam(db, exam_id, lock=True)
+    try:
+        result = await db.run_sync(
+            gradebook.save_marks, exam, payload.class_id, payload.subject_id,
+            [entry.model_dump() for entry in payload.marks], current_user.id
+        )
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    await db.commit()
+
+    return FastJSONResponse({"success": True, "message": f"Saved marks for {result['saved']} students", "data": result})
+
+@router.put("/{exam_id}/marks/{student_id}/{subject_id}", response_model=dict)
+async def update_mark(
+    exam_id: int,
+    student_id: int,
+    subject_id: int,
+    payload: MarkUpdate,
+    db: AsyncSession = Depends(get_async_db),
+    current_user: User = Depends(check_role(['super_admin', 'school_admin', 'moderator']))
+):
+    """Correct one student's mark; only the results whose standing moves are rewritten"""
+    exam = await load_exam(db, exam_id, lock=True)
+    class_id = (await db.execute(select(Student.class_id).where(Student.id == student_id))).scalar()
+    if class_id is None:
+        raise HTTPException(status_code=404, detail="Student not found")
+    entry = {"student_id": student_id, **payload.model_dump()}
+    try:
+        result = await db.run_sync(gradebook.save_marks, exam, class_id, subject_id, [entry], current_user.id)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    await db.commit()
+
+    return FastJSONResponse({"success": True, "message": "Mark updated successfully", "data": result})
+
+@router.post("/{exam_id}/publish", response_model=dict)
+async def publish_exam(
+    exam_id: int,
+    payload: PublishRequest = PublishRequest(),
+    db: AsyncSession = Depends(get_async_db),
+    current_user: User = Depends(check_role(['super_admin', 'school_admin']))
+):
+    """Recompute the whole result table and publish it; 409 while marks are missing unless forced"""
+    exam = await load_exam(db, exam_id, lock=True)
+    result = await db.run_sync(gradebook.publish, exam, payload.force)
+    if not result["published"]:
+        return FastJSONResponse(
+            {"success": False, "message": "Some marks are still missing", "data": result}, status_code=409
+        )
+    await db.commit()
+
+    return FastJSONResponse({"success": True, "message": "Results published", "data": result})
+
+@router.get("/{exam_id}/results", response_model=dict)
+async def get_results(
+    exam_id: int,
+    class_id: Optional[int] = None,
+    db: AsyncSession = Depends(get_async_read_db),
+    current_user: User = Depends(get_current_user)
+):
+    """The cached result table, best first; nothing is recomputed on read"""
+    exam = await load_exam(db, exam_id)
+    rows = await db.run_sync(gradebook.results, exam_id, class_id)
+    return FastJSONResponse({"success": True, "data": {"exam": serialize_exam(exam), "results": rows}})
+
+@router.get("/{exam_id}/results/{student_id}", response_model=dict)
+async def get_report_card(
+    exam_id: int,
+    student_id: int,
+    db: AsyncSession = Depends(get_async_read_db),
+    current_user: User = Depends(get_current_user)
+):
+    exam = await load_exam(db, exam_id)
+    card = await db.run_sync(gradebook.report_card, exam_id, student_id)
+    if card["result"] is None and all(subject["marks"] is None for subject in card["subjects"]):
+        raise HTTPException(status_code=404, detail="No marks for this student in this exam")
+    return FastJSONResponse({"success": True, "data": {"exam": serialize_exam(exam), **card}})
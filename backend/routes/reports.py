@@ -1,7 +1,214 @@
-from fastapi import APIRouter
+from fastapi import APIRouter, Depends, HTTPException, Request
+from fastapi.responses import StreamingResponse
+from sqlalchemy import select, func
+from sqlalchemy.ext.asyncio import AsyncSession
+from typing import Optional
+from datetime import date
+from config.database import (
+    get_async_read_db, read_engine, User, Student, Class, Subject, Teacher, Timetable, Announcement,
+    EnrollmentRollup, TeacherLoadRollup, StaffRollup
+)
+from middleware.auth import get_current_user, check_role
+from services.exporter import export_stream, FORMATS
+from services.responses import FastJSONResponse
 
 router = APIRouter()
 
+def students_export(class_id: Optional[int] = None, status: Optional[str] = None, **_):
+    statement = select(
+        Student.id, Student.admission_number, Student.name, Student.gender, Student.date_of_birth,
+        Class.name.label('class_name'), Student.section, Student.roll_number, Student.parent_name,
+        Student.parent_phone, Student.parent_email, Student.admission_date, Student.status
+    ).outerjoin(Class, Student.class_id == Class.id).order_by(Student.id)
+    if class_id:
+        statement = statement.where(Student.class_id == class_id)
+    if status:
+        statement = statement.where(Student.status == status)
+    return statement
+
+def timetable_export(academic_year: Optional[str] = None, class_id: Optional[int] = None, **_):
+    statement = select(
+        Timetable.id, Timetable.academic_year, Class.name.label('class_name'), Timetable.day_of_week,
+        Timetable.period_number, Timetable.start_time, Timetable.end_time, Subject.code.label('subject_code'),
+        Subject.name.label('subject_name'), Teacher.name.label('teacher_name'), Timetable.room
+    ).join(Class, Timetable.class_id == Class.id).join(
+        Subject, Timetable.subject_id == Subject.id
+    ).join(Teacher, Timetable.teacher_id == Teacher.id).order_by(Timetable.id)
+    if academic_year:
+        statement = statement.where(Timetable.academic_year == academic_year)
+    if class_id:
+        statement = statement.where(Timetable.class_id == class_id)
+    return statement
+
+def announcements_export(status: Optional[str] = None, **_):
+    statement = select(
+        Announcement.id, Announcement.title, Announcement.content, Announcement.type,
+        Announcement.target_audience, Announcement.expiry_date, Announcement.status,
+        User.name.label('created_by'), Announcement.created_at
+    ).outerjoin(User, Announcement.created_by == User.id).order_by(Announcement.id)
+    if status:
+        statement = statement.where(Announcement.status == status)
+    return statement
+
+EXPORTS = {
+    'students': students_export,
+    'timetable': timetable_export,
+    'announcements': announcements_export
+}
+
+SUMMARIES = ['capacity', 'enrollment', 'overview', 'teacher-load']
+
+# Summaries read the rollup tables, so their cost grows with the number of groups, not rows
+ENROLLMENT_GROUPS = {
+    'class': [EnrollmentRollup.class_id, Class.name.label('class_name')],
+    'segment': [Class.segment],
+    'grade': [Class.grade],
+    'gender': [EnrollmentRollup.gender],
+    'status': [EnrollmentRollup.status]
+}
+
+def ratio(numerator, denominator, digits=1):
+    return round(numerator / denominator, digits) if denominator else None
+
 @router.get("/")
-def get_reports():
-    return {"success": True, "message": "Reports endpoint - coming soon", "data": []}
\ No newline at end of file
+def get_reports(current_user: User = Depends(get_current_user)):
+    return {"success": True, "data": {"summaries": SUMMARIES, "exports": sorted(EXPORTS), "formats": sorted(FORMATS)}}
+
+@router.get("/overview")
+async def get_overview(
+    db: AsyncSession = Depends(get_async_read_db),
+    current_user: User = Depends(get_current_user)
+):
+    students = (await db.execute(
+        select(func.coalesce(func.sum(EnrollmentRollup.student_count), 0)).where(EnrollmentRollup.status == 'active')
+    )).scalar()
+    teachers = (await db.execute(
+        select(func.coalesce(func.sum(StaffRollup.teacher_count), 0)).where(StaffRollup.status == 'active')
+    )).scalar()
+    capacity = (await db.execute(select(
+        func.count(Class.id).label('classes'),
+        func.coalesce(func.sum(Class.current_students), 0).label('enrolled'),
+        func.coalesce(func.sum(Class.max_students), 0).label('capacity')
+    ))).one()
+
+    return FastJSONResponse({"success": True, "data": {
+        "active_students": int(students),
+        "active_teachers": int(teachers),
+        "students_per_teacher": ratio(int(students), int(teachers)),
+        "classes": capacity.classes,
+        "enrolled": int(capacity.enrolled),
+        "capacity": int(capacity.capacity),
+        "capacity_used_percent": ratio(100 * int(capacity.enrolled), int(capacity.capacity))
+    }})
+
+@router.get("/enrollment")
+async def get_enrollment(
+    group_by: str = 'class',
+    status: Optional[str] = 'active',
+    db: AsyncSession = Depends(get_async_read_db),
+    current_user: User = Depends(get_current_user)
+):
+    names = [name.strip() for name in group_by.split(',') if name.strip()]
+    unknown = [name for name in names if name not in ENROLLMENT_GROUPS]
+    if not names or unknown:
+        raise HTTPException(status_code=400, detail=f"group_by must be a comma-separated list of: {', '.join(ENROLLMENT_GROUPS)}")
+
+    columns = [column for name in names for column in ENROLLMENT_GROUPS[name]]
+    statement = select(*columns, func.sum(EnrollmentRollup.student_count).label('students')).select_from(
+        EnrollmentRollup.__table__.outerjoin(Class.__table__, EnrollmentRollup.class_id == Class.id)
+    ).where(EnrollmentRollup.student_count > 0).group_by(*columns).order_by(*columns)
+    if status and status != 'all':
+        statement = statement.where(EnrollmentRollup.status == status)
+
+    rows = [dict(row._mapping) for row in await db.execute(statement)]
+    for row in rows:
+        row['students'] = int(row['students'])
+        if row.get('class_id') == 0:
+            row['class_id'] = None
+    return FastJSONResponse({"success": True, "data": rows})
+
+@router.get("/capacity")
+async def get_capacity(
+    segment: Optional[str] = None,
+    db: AsyncSession = Depends(get_async_read_db),
+    current_user: User = Depends(get_current_user)
+):
+    statement = select(
+        Class.id, Class.name, Class.segment, Class.grade, Class.section,
+        Class.current_students, Class.max_students
+    ).order_by(Class.segment, Class.grade, Class.name)
+    if segment:
+        statement = statement.where(Class.segment == segment)
+
+    classes = []
+    for row in await db.execute(statement):
+        item = dict(row._mapping)
+        item['current_students'] = item['current_students'] or 0
+        item['max_students'] = item['max_students'] or 0
+        item['available'] = max(item['max_students'] - item['current_students'], 0)
+        item['used_percent'] = ratio(100 * item['current_students'], item['max_students'])
+        classes.append(item)
+
+    enrolled = sum(item['current_students'] for item in classes)
+    capacity = sum(item['max_students'] for item in classes)
+    return FastJSONResponse({"success": True, "data": {
+        "classes": classes,
+        "totals": {"enrolled": enrolled, "capacity": capacity, "used_percent": ratio(100 * enrolled, capacity)}
+    }})
+
+@router.get("/teacher-load")
+async def get_teacher_load(
+    academic_year: Optional[str] = None,
+    db: AsyncSession = Depends(get_async_read_db),
+    current_user: User = Depends(get_current_user)
+):
+    periods = func.sum(TeacherLoadRollup.period_count).label('periods')
+    statement = select(TeacherLoadRollup.teacher_id, Teacher.name, periods).select_from(
+        TeacherLoadRollup.__table__.outerjoin(Teacher.__table__, TeacherLoadRollup.teacher_id == Teacher.id)
+    ).where(TeacherLoadRollup.period_count > 0).group_by(
+        TeacherLoadRollup.teacher_id, Teacher.name
+    ).order_by(periods.desc(), TeacherLoadRollup.teacher_id)
+    if academic_year:
+        statement = statement.where(TeacherLoadRollup.academic_year == academic_year)
+
+    teachers = [
+        {"teacher_id": row.teacher_id, "name": row.name, "periods": int(row.periods)}
+        for row in await db.execute(statement)
+    ]
+    loads = [teacher['periods'] for teacher in teachers]
+    return FastJSONResponse({"success": True, "data": {
+        "teachers": teachers,
+        "totals": {
+            "teachers": len(loads),
+            "periods": sum(loads),
+            "average": ratio(sum(loads), len(loads)),
+            "max": max(loads, default=0)
+        }
+    }})
+
+@router.get("/export/{dataset}")
+def export_report(
+    dataset: str,
+    request: Request,
+    format: str = 'csv',
+    gzip: bool = False,
+    class_id: Optional[int] = None,
+    status: Optional[str] = None,
+    academic_year: Optional[str] = None,
+    current_user: User = Depends(check_role(['super_admin', 'school_admin']))
+):
+    if dataset not in EXPORTS:
+        raise HTTPException(status_code=404, detail="Unknown export")
+    if format not in FORMATS:
+        raise HTTPException(status_code=400, detail="Format must be csv or ndjson")
+
+    statement = EXPORTS[dataset](class_id=class_id, status=status, academic_year=academic_year)
+    # Exports are pure reads, so they go to a replica unless the client just wrote
+    chunks, media_type = export_stream(statement, fmt=format, compress=gzip, bind=read_engine(request))
+
+    filename = f"{dataset}-{date.today().isoformat()}.{format}" + (".gz" if gzip else "")
+    return StreamingResponse(
+        chunks,
+        media_type=media_type,
+        headers={"Content-Disposition": f'attachment; filename="{filename}"'}
+    )
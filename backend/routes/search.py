@@ -0,0 +1,27 @@
+from fastapi import APIRouter, Depends, HTTPException, Query, Request
+from typing import Optional
+from config.database import User
+from middleware.auth import get_current_user
+from services.responses import FastJSONResponse
+from services.search_index import SOURCES, get_search_index
+
+router = APIRouter()
+
+@router.get("/", response_model=dict)
+async def search(
+    request: Request,
+    q: str = Query(..., min_length=1, max_length=100),
+    types: Optional[str] = None,
+    limit: int = Query(10, ge=1, le=50),
+    current_user: User = Depends(get_current_user)
+):
+    """Ranked prefix search over student, teacher and subject names, admission numbers, emails, phones and codes"""
+    kinds = None
+    if types:
+        kinds = {kind.strip() for kind in types.split(',') if kind.strip()}
+        unknown = kinds - set(SOURCES)
+        if unknown:
+            raise HTTPException(status_code=400, detail=f"Unknown types: {', '.join(sorted(unknown))}")
+
+    index = await get_search_index(request)
+    return FastJSONResponse({"success": True, "data": index.search(q, kinds, limit)})
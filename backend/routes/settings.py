@@ -1,7 +1,57 @@
-from fastapi import APIRouter
+from fastapi import APIRouter, Depends, Header, HTTPException, Response
+from sqlalchemy.ext.asyncio import AsyncSession
+from pydantic import ValidationError
+from typing import Optional
+from config.database import get_async_db, User, Setting
+from config.tenancy import current_school_id, tenant_identity
+from middleware.auth import get_current_user, check_role
+from services.feed import etag_matches
+from services.responses import FastJSONResponse
+from services.settings_store import SchoolSettings, settings_store
 
 router = APIRouter()
 
-@router.get("/")
-def get_settings():
-    return {"success": True, "message": "Settings endpoint - coming soon", "data": []}
\ No newline at end of file
+@router.get("/", response_model=dict)
+async def get_settings(if_none_match: Optional[str] = Header(None), current_user: User = Depends(get_current_user)):
+    """Served from the in-memory snapshot; no database access.
+
+    The ETag is the snapshot's own version, so it can never vouch for
+    settings this worker has not loaded yet.
+    """
+    version = settings_store.version
+    headers = {"ETag": f'"settings-{current_school_id()}-{version}"', "Cache-Control": "private, no-cache"}
+    if etag_matches(if_none_match, headers["ETag"]):
+        return Response(status_code=304, headers=headers)
+    return FastJSONResponse({
+        "success": True,
+        "data": settings_store.settings.model_dump(mode="json"),
+        "version": version
+    }, headers=headers)
+
+@router.put("/", response_model=dict)
+async def update_settings(
+    changes: dict,
+    db: AsyncSession = Depends(get_async_db),
+    current_user: User = Depends(check_role(['super_admin', 'school_admin']))
+):
+    unknown = set(changes) - set(SchoolSettings.model_fields)
+    if unknown:
+        raise HTTPException(status_code=400, detail=f"Unknown settings: {', '.join(sorted(unknown))}")
+    try:
+        updated = settings_store.validate(changes)
+    except ValidationError as e:
+        raise HTTPException(status_code=400, detail="; ".join(error["msg"] for error in e.errors()))
+
+    values = updated.model_dump(mode="json")
+    for key in sorted(changes):
+        await db.merge(Setting(**tenant_identity(), key=key, value=values[key], updated_by=current_user.id))
+    # The flush bumps the settings version, which every worker's poll picks up
+    await db.commit()
+    await settings_store.refresh(db)
+
+    return FastJSONResponse({
+        "success": True,
+        "message": "Settings updated successfully",
+        "data": settings_store.settings.model_dump(mode="json"),
+        "version": settings_store.version
+    })
@@ -1,7 +1,357 @@
-from fastapi import APIRouter
+from fastapi import APIRouter, Depends, HTTPException, UploadFile, File, Form
+from sqlalchemy import insert
+from sqlalchemy.orm import Session
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.exc import IntegrityError
+from pydantic import BaseModel, ValidationError
+from typing import Dict, List, Optional
+from datetime import datetime
+import codecs
+import csv
+import zipfile
+from config.database import get_db, get_async_db, get_async_read_db, User, Student, Class, Setting
+from config.tenancy import tenant_identity
+from middleware.auth import get_current_user, check_role
+from services.enrollment import ClassFull, adjust_enrollment, seat
+from services.invalidation import publish
+from services.list_query import ListParams, ListResource, paginate
+from services.projection import Projection
+from services.promotion import apply_plan, build_plan, next_academic_year
+from services.responses import FastJSONResponse
+from services.rollups import record_rows
+from services.settings_store import settings_store
+from services.timetable_index import invalidate_timetable_index
 
 router = APIRouter()
 
-@router.get("/")
-def get_students():
-    return {"success": True, "message": "Students endpoint - coming soon", "data": []}
\ No newline at end of file
+IMPORT_BATCH_SIZE = 1000
+MAX_REPORTED_ERRORS = 1000
+
+STUDENT_COLUMNS = [
+    'admission_number', 'name', 'email', 'phone', 'gender', 'date_of_birth', 'class_id',
+    'section', 'roll_number', 'parent_name', 'parent_phone', 'parent_email', 'address',
+    'admission_date', 'status'
+]
+GENDERS = {'male', 'female', 'other'}
+STATUSES = {'active', 'inactive', 'transferred'}
+DATE_FORMATS = ['%Y-%m-%d', '%d/%m/%Y', '%d-%m-%Y']
+
+def parse_date(value):
+    if isinstance(value, datetime):
+        return value.date()
+    if hasattr(value, 'year'):
+        return value
+    for fmt in DATE_FORMATS:
+        try:
+            return datetime.strptime(value, fmt).date()
+        except ValueError:
+            continue
+    raise ValueError(f"Invalid date: {value}")
+
+def iter_csv_rows(upload):
+    reader = csv.reader(codecs.iterdecode(upload.file, 'utf-8-sig'))
+    header = next(reader, None)
+    if header is None:
+        return
+    yield [column.strip().lower() for column in header]
+    yield from reader
+
+def iter_xlsx_rows(upload):
+    try:
+        from openpyxl import load_workbook
+        from openpyxl.utils.exceptions import InvalidFileException
+    except ImportError:
+        raise HTTPException(status_code=400, detail="XLSX import requires openpyxl to be installed")
+    # read_only mode streams rows from the sheet XML instead of building the whole workbook
+    try:
+        workbook = load_workbook(upload.file, read_only=True, data_only=True)
+    except (zipfile.BadZipFile, InvalidFileException, KeyError):
+        # KeyError: a zip archive without the workbook parts
+        raise HTTPException(status_code=400, detail="Not a valid .xlsx file")
+    try:
+        rows = workbook.active.iter_rows(values_only=True)
+        header = next(rows, None)
+        if header is None:
+            return
+        yield [str(column or '').strip().lower() for column in header]
+        yield from rows
+    finally:
+        workbook.close()
+
+def clean_row(values, header, classes_by_key):
+    """Map one spreadsheet row onto Student columns, raising ValueError on bad data"""
+    raw = {}
+    for column, value in zip(header, values):
+        if isinstance(value, str):
+            value = value.strip()
+        if value not in (None, ''):
+            raw[column] = value
+
+    errors = []
+    # Every row carries every column so batches share one executemany statement
+    row = dict.fromkeys(STUDENT_COLUMNS)
+    for column in ['admission_number', 'name']:
+        if column in raw:
+            row[column] = str(raw[column])
+        else:
+            errors.append(f"{column} is required")
+    for column in ['email', 'phone', 'section', 'parent_name', 'parent_phone', 'parent_email', 'address']:
+        if column in raw:
+            row[column] = str(raw[column])
+
+    if 'gender' in raw:
+        gender = str(raw['gender']).lower()
+        if gender in GENDERS:
+            row['gender'] = gender
+        else:
+            errors.append("gender must be male, female or other")
+
+    row['status'] = str(raw.get('status', 'active')).lower()
+    if row['status'] not in STATUSES:
+        errors.append("status must be active, inactive or transferred")
+
+    for column in ['date_of_birth', 'admission_date']:
+        if column in raw:
+            try:
+                row[column] = parse_date(raw[column])
+            except ValueError as e:
+                errors.append(str(e))
+
+    if 'roll_number' in raw:
+        try:
+            row['roll_number'] = int(raw['roll_number'])
+        except (TypeError, ValueError):
+            errors.append("roll_number must be a number")
+
+    class_key = raw.get('class_id') or raw.get('class')
+    if class_key is not None:
+        class_id = classes_by_key.get(str(class_key).strip().lower())
+        if class_id is None:
+            errors.append(f"Unknown class: {class_key}")
+        else:
+            row['class_id'] = class_id
+
+    if errors:
+        raise ValueError("; ".join(errors))
+    return row
+
+class StudentImporter:
+    """Validates rows against preloaded keys and writes them in batches"""
+
+    def __init__(self, db: Session, dry_run=False, batch_size=IMPORT_BATCH_SIZE):
+        self.db = db
+        self.dry_run = dry_run
+        self.batch_size = batch_size
+        self.admission_numbers = {row.admission_number for row in db.query(Student.admission_number)}
+        self.classes_by_key = {}
+        self.capacity = {}
+        for class_ in db.query(Class.id, Class.name, Class.max_students, Class.current_students):
+            self.classes_by_key[str(class_.id)] = class_.id
+            self.classes_by_key[class_.name.strip().lower()] = class_.id
+            if class_.max_students is None:
+                self.capacity[class_.id] = float('inf')
+            else:
+                self.capacity[class_.id] = class_.max_students - (class_.current_students or 0)
+        self.batch = []
+        self.imported = 0
+        self.failed = 0
+        self.errors = []
+
+    def add_error(self, row_number, admission_number, message):
+        self.failed += 1
+        if len(self.errors) < MAX_REPORTED_ERRORS:
+            self.errors.append({"row": row_number, "admission_number": admission_number, "message": message})
+
+    def add(self, row_number, values, header):
+        try:
+            row = clean_row(values, header, self.classes_by_key)
+        except ValueError as e:
+            position = header.index('admission_number')
+            admission_number = values[position] if position < len(values) else None
+            self.add_error(row_number, admission_number, str(e))
+            return
+
+        if row['admission_number'] in self.admission_numbers:
+            self.add_error(row_number, row['admission_number'], "Admission number already exists")
+            return
+        class_id = seat(row)
+        if class_id is not None:
+            if self.capacity[class_id] <= 0:
+                self.add_error(row_number, row['admission_number'], "Class is full")
+                return
+            self.capacity[class_id] -= 1
+
+        self.admission_numbers.add(row['admission_number'])
+        self.batch.append((row_number, row))
+        if len(self.batch) >= self.batch_size:
+            self.flush()
+
+    def _write(self, rows):
+        self.db.execute(insert(Student), rows)
+        record_rows(self.db, Student, rows)
+        counts = {}
+        for row in rows:
+            class_id = seat(row)
+            if class_id is not None:
+                counts[class_id] = counts.get(class_id, 0) + 1
+        # One guarded counter update per class per batch rather than per row
+        adjust_enrollment(self.db.connection(), counts)
+
+    def flush(self):
+        if not self.batch:
+            return
+        batch, self.batch = self.batch, []
+        if self.dry_run:
+            self.imported += len(batch)
+            return
+        try:
+            self._write([row for _, row in batch])
+            self.db.commit()
+            self.imported += len(batch)
+        except (IntegrityError, ClassFull):
+            # A concurrent writer beat us to some key or seat; fall back to row-by-row for this batch
+            self.db.rollback()
+            for row_number, row in batch:
+                try:
+                    self._write([row])
+                    self.db.commit()
+                    self.imported += 1
+                except IntegrityError:
+                    self.db.rollback()
+                    self.add_error(row_number, row['admission_number'], "Admission number already exists")
+                except ClassFull:
+                    self.db.rollback()
+                    self.add_error(row_number, row['admission_number'], "Class is full")
+
+STUDENT_PROJECTION = Projection(
+    fields={
+        **{column: getattr(Student, column) for column in ['id'] + STUDENT_COLUMNS},
+        "class_name": Class.name,
+        "grade": Class.grade,
+        "segment": Class.segment,
+        "created_at": Student.created_at
+    },
+    from_clause=Student.__table__.outerjoin(Class.__table__, Student.class_id == Class.id)
+)
+
+STUDENT_LIST = ListResource(
+    STUDENT_PROJECTION,
+    filters={
+        "status": (Student.status, str),
+        "class_id": (Student.class_id, int),
+        "grade": (Class.grade, str),
+        "segment": (Class.segment, str)
+    },
+    id_column=Student.id,
+    created_at_column=Student.created_at
+)
+
+@router.get("/", response_model=dict)
+async def get_students(
+    params: ListParams = Depends(),
+    status: Optional[str] = None,
+    class_id: Optional[int] = None,
+    grade: Optional[str] = None,
+    segment: Optional[str] = None,
+    db: AsyncSession = Depends(get_async_read_db),
+    current_user: User = Depends(get_current_user)
+):
+    filters = {"status": status, "class_id": class_id, "grade": grade, "segment": segment}
+    return FastJSONResponse(await paginate(db, STUDENT_LIST, params, filters))
+
+# Imports stay sync: parsing is CPU-bound and runs in the threadpool with the sync engine
+@router.post("/import", response_model=dict)
+def import_students(
+    file: UploadFile = File(...),
+    dry_run: bool = Form(False),
+    db: Session = Depends(get_db),
+    current_user: User = Depends(check_role(['super_admin', 'school_admin']))
+):
+    filename = (file.filename or '').lower()
+    if filename.endswith('.xlsx'):
+        rows = iter_xlsx_rows(file)
+    elif filename.endswith('.csv'):
+        rows = iter_csv_rows(file)
+    else:
+        raise HTTPException(status_code=400, detail="Only .csv and .xlsx files are supported")
+
+    try:
+        header = next(rows, None)
+        if not header:
+            raise HTTPException(status_code=400, detail="File is empty")
+        for column in ['admission_number', 'name']:
+            if column not in header:
+                raise HTTPException(status_code=400, detail=f"Missing required column: {column}")
+
+        importer = StudentImporter(db, dry_run=dry_run)
+        for row_number, values in enumerate(rows, start=2):
+            if not any(value not in (None, '') for value in values):
+                continue
+            importer.add(row_number, list(values), header)
+        importer.flush()
+    except UnicodeDecodeError:
+        db.rollback()
+        raise HTTPException(status_code=400, detail="File must be UTF-8 encoded")
+
+    return {
+        "success": importer.failed == 0,
+        "message": f"Imported {importer.imported} students, {importer.failed} rows failed",
+        "data": {
+            "imported": importer.imported,
+            "failed": importer.failed,
+            "dry_run": dry_run,
+            "errors": importer.errors
+        }
+    }
+
+class PromotionRequest(BaseModel):
+    from_year: Optional[str] = None  # defaults to the current academic year setting
+    to_year: Optional[str] = None    # defaults to the year after from_year
+    class_map: Dict[int, Optional[int]] = {}
+    hold_back: List[int] = []
+    roll_timetable: bool = True
+    dry_run: bool = True
+
+@router.post("/promotion", response_model=dict)
+async def promote_students(
+    payload: PromotionRequest,
+    db: AsyncSession = Depends(get_async_db),
+    current_user: User = Depends(check_role(['super_admin', 'school_admin']))
+):
+    """Year-end rollover: move every class up a grade, roll the timetable and the academic year.
+
+    Dry runs (the default) return the plan without writing. Applying
+    refuses with 409 while a class with students has no target or a class
+    would end up over max_students; the plan says which.
+    """
+    from_year = payload.from_year or settings_store.settings.academic_year
+    try:
+        to_year = settings_store.validate({"academic_year": payload.to_year or next_academic_year(from_year)}).academic_year
+    except (ValidationError, ValueError):
+        raise HTTPException(status_code=400, detail="Academic years must look like 2026-2027")
+
+    plan = await db.run_sync(build_plan, from_year, to_year, payload.class_map, payload.hold_back, not payload.dry_run)
+    if payload.dry_run:
+        return FastJSONResponse({"success": True, "data": plan})
+    if not plan["ready"]:
+        await db.rollback()
+        return FastJSONResponse(status_code=409, content={
+            "success": False,
+            "message": "Promotion blocked: map every class listed in unmapped and resolve over_capacity",
+            "data": plan
+        })
+
+    summary = await db.run_sync(apply_plan, plan, payload.hold_back, payload.roll_timetable)
+    await db.merge(Setting(**tenant_identity(), key='academic_year', value=to_year, updated_by=current_user.id))
+    await db.commit()
+    invalidate_timetable_index(from_year)
+    invalidate_timetable_index(to_year)
+    # Core UPDATEs skip the flush hooks the in-process indexes listen to
+    publish({"students", "classes", "timetable"})
+    await settings_store.refresh(db)
+
+    return FastJSONResponse({
+        "success": True,
+        "message": f"Promoted {summary['students_moved']} students to {to_year}",
+        "data": {**plan, **summary}
+    })
@@ -1,7 +1,75 @@
-from fastapi import APIRouter
+from fastapi import APIRouter, Depends, HTTPException
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+from typing import Optional
+from config.database import get_async_read_db, User, Teacher, Subject, Grade, GradeSubject, TeacherSubject
+from middleware.auth import get_current_user
+from services.associations import subjects_for_grade
+from services.list_query import ListParams, ListResource, paginate
+from services.projection import Projection
+from services.responses import FastJSONResponse
 
 router = APIRouter()
 
-@router.get("/")
-def get_subjects():
-    return {"success": True, "message": "Subjects endpoint - coming soon", "data": []}
\ No newline at end of file
+SUBJECT_PROJECTION = Projection(
+    fields={
+        "id": Subject.id,
+        "name": Subject.name,
+        "code": Subject.code,
+        "type": Subject.type,
+        "stream": Subject.stream,
+        "grades": Subject.grades,
+        "description": Subject.description,
+        "created_at": Subject.created_at
+    }
+)
+
+SUBJECT_LIST = ListResource(
+    SUBJECT_PROJECTION,
+    filters={
+        "type": (Subject.type, str),
+        "stream": (Subject.stream, str),
+        "grade_id": (lambda grade_id: Subject.id.in_(subjects_for_grade(grade_id)), int)
+    },
+    id_column=Subject.id,
+    created_at_column=Subject.created_at
+)
+
+@router.get("/", response_model=dict)
+async def get_subjects(
+    params: ListParams = Depends(),
+    type: Optional[str] = None,
+    stream: Optional[str] = None,
+    grade_id: Optional[int] = None,
+    db: AsyncSession = Depends(get_async_read_db),
+    current_user: User = Depends(get_current_user)
+):
+    filters = {"type": type, "stream": stream, "grade_id": grade_id}
+    return FastJSONResponse(await paginate(db, SUBJECT_LIST, params, filters))
+
+@router.get("/{subject_id}", response_model=dict)
+async def get_subject(
+    subject_id: int,
+    db: AsyncSession = Depends(get_async_read_db),
+    current_user: User = Depends(get_current_user)
+):
+    subject = await SUBJECT_PROJECTION.fetch_one(db, Subject.id == subject_id)
+    if not subject:
+        raise HTTPException(status_code=404, detail="Subject not found")
+
+    # Grades and qualified teachers come from the association tables' subject-leading indexes
+    grades = await db.execute(
+        select(Grade.id, Grade.name, Grade.segment, GradeSubject.periods_per_week)
+        .join(GradeSubject, GradeSubject.grade_id == Grade.id)
+        .where(GradeSubject.subject_id == subject_id)
+        .order_by(Grade.name)
+    )
+    teachers = await db.execute(
+        select(Teacher.id, Teacher.user_id, Teacher.name, Teacher.email, Teacher.status)
+        .join(TeacherSubject, TeacherSubject.teacher_id == Teacher.id)
+        .where(TeacherSubject.subject_id == subject_id)
+        .order_by(Teacher.name)
+    )
+    subject["grade_list"] = [dict(row._mapping) for row in grades]
+    subject["teachers"] = [dict(row._mapping) for row in teachers]
+    return FastJSONResponse({"success": True, "data": subject})
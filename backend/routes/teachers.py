@@ -1,17 +1,20 @@
 from fastapi import APIRouter, Depends, HTTPException, status
-from sqlalchemy.orm import Session
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
 from pydantic import BaseModel, EmailStr
-from config.database import get_db, User, Teacher
-from middleware.auth import get_current_user, check_role
-from passlib.context import CryptContext
+from config.database import get_async_db, get_async_read_db, User, Teacher
+from middleware.auth import get_current_user, check_role, invalidate_principal
+from services.password_hasher import get_password_hash_async, password_hasher
+from services.list_query import ListParams, ListResource, paginate
+from services.projection import Projection
+from services.responses import FastJSONResponse
+from services.associations import teachers_for_subject
 from datetime import date
+from typing import List, Optional
 
 router = APIRouter()
 
-pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
-
-def get_password_hash(password):
-    return pwd_context.hash(password)
+MAX_BULK_TEACHERS = 500
 
 class TeacherCreate(BaseModel):
     name: str
@@ -20,44 +23,63 @@ class TeacherCreate(BaseModel):
     grade: str
     subjects: str
 
+class TeacherBulkCreate(BaseModel):
+    teachers: List[TeacherCreate]
+
 class TeacherUpdate(BaseModel):
     name: str = None
     email: EmailStr = None
     grade: str = None
     subjects: str = None
 
+TEACHER_PROJECTION = Projection(
+    fields={
+        "id": User.id,
+        "name": User.name,
+        "email": User.email,
+        "created_at": User.created_at,
+        "phone": Teacher.phone,
+        "gender": Teacher.gender,
+        "qualification": Teacher.qualification,
+        "experience_years": Teacher.experience_years,
+        "grade": Teacher.grade,
+        "subjects": Teacher.subjects,
+        "joining_date": Teacher.joining_date,
+        "salary": Teacher.salary,
+        "address": Teacher.address,
+        "status": Teacher.status
+    },
+    from_clause=User.__table__.join(Teacher.__table__, User.id == Teacher.user_id),
+    where=[User.role.in_(['moderator', 'teacher'])]
+)
+
+TEACHER_LIST = ListResource(
+    TEACHER_PROJECTION,
+    filters={
+        "status": (Teacher.status, str),
+        "grade": (Teacher.grade, str),
+        "subject_id": (lambda subject_id: Teacher.id.in_(teachers_for_subject(subject_id)), int)
+    },
+    id_column=User.id,
+    created_at_column=User.created_at
+)
+
 @router.get("/", response_model=dict)
-def get_teachers(db: Session = Depends(get_db), current_user: User = Depends(get_current_user)):
-    teachers = db.query(User).join(Teacher, User.id == Teacher.user_id).filter(
-        User.role.in_(['moderator', 'teacher'])
-    ).all()
-    
-    result = []
-    for user in teachers:
-        teacher_data = {
-            "id": user.id,
-            "name": user.name,
-            "email": user.email,
-            "created_at": user.created_at,
-            "phone": user.teacher.phone if user.teacher else None,
-            "gender": user.teacher.gender if user.teacher else None,
-            "qualification": user.teacher.qualification if user.teacher else None,
-            "experience_years": user.teacher.experience_years if user.teacher else None,
-            "grade": user.teacher.grade if user.teacher else None,
-            "subjects": user.teacher.subjects if user.teacher else None,
-            "joining_date": user.teacher.joining_date if user.teacher else None,
-            "salary": user.teacher.salary if user.teacher else None,
-            "address": user.teacher.address if user.teacher else None,
-            "status": user.teacher.status if user.teacher else None
-        }
-        result.append(teacher_data)
-    
-    return {"success": True, "data": result}
+async def get_teachers(
+    params: ListParams = Depends(),
+    status: Optional[str] = None,
+    grade: Optional[str] = None,
+    subject_id: Optional[int] = None,
+    db: AsyncSession = Depends(get_async_read_db),
+    current_user: User = Depends(get_current_user)
+):
+    filters = {"status": status, "grade": grade, "subject_id": subject_id}
+    return FastJSONResponse(await paginate(db, TEACHER_LIST, params, filters))
 
 @router.post("/", response_model=dict)
-def create_teacher(
+async def create_teacher(
     teacher: TeacherCreate,
-    db: Session = Depends(get_db),
+    db: AsyncSession = Depends(get_async_db),
     current_user: User = Depends(check_role(['school_admin']))
 ):
     # Validate input
@@ -71,19 +93,19 @@ def create_teacher(
         raise HTTPException(status_code=400, detail="Subject is required")
     
     # Check if email exists
-    existing_user = db.query(User).filter(User.email == teacher.email).first()
+    existing_user = (await db.execute(select(User.id).where(User.email == teacher.email))).first()
     if existing_user:
         raise HTTPException(status_code=400, detail="Email already exists")
     
     # Create user and teacher
-    hashed_password = get_password_hash(teacher.password)
+    hashed_password = await get_password_hash_async(teacher.password)
     
     # Start transaction
     try:
         # Create user
         db_user = User(name=teacher.name, email=teacher.email, password=hashed_password, role='moderator')
         db.add(db_user)
-        db.flush()  # Get user ID
+        await db.flush()  # Get user ID
         
         # Create teacher profile
         db_teacher = Teacher(
@@ -97,8 +119,7 @@ def create_teacher(
         )
         db.add(db_teacher)
         
-        db.commit()
-        db.refresh(db_user)
+        await db.commit()
         
         return {
             "success": True,
@@ -112,31 +133,112 @@ def create_teacher(
             }
         }
     except Exception as e:
-        db.rollback()
+        await db.rollback()
         raise HTTPException(status_code=500, detail="Server error")
 
+@router.post("/bulk", response_model=dict)
+async def create_teachers_bulk(
+    payload: TeacherBulkCreate,
+    db: AsyncSession = Depends(get_async_db),
+    current_user: User = Depends(check_role(['school_admin']))
+):
+    if not payload.teachers:
+        raise HTTPException(status_code=400, detail="No teachers provided")
+    if len(payload.teachers) > MAX_BULK_TEACHERS:
+        raise HTTPException(status_code=400, detail=f"At most {MAX_BULK_TEACHERS} teachers per request")
+
+    # Validate every row before doing any work
+    errors = []
+    seen_emails = set()
+    for index, teacher in enumerate(payload.teachers):
+        if not teacher.name:
+            errors.append({"index": index, "message": "Name is required"})
+        elif len(teacher.password) < 6:
+            errors.append({"index": index, "message": "Password must be at least 6 characters"})
+        elif not teacher.grade:
+            errors.append({"index": index, "message": "Grade is required"})
+        elif not teacher.subjects:
+            errors.append({"index": index, "message": "Subject is required"})
+        elif teacher.email.lower() in seen_emails:
+            errors.append({"index": index, "message": "Duplicate email in request"})
+        seen_emails.add(teacher.email.lower())
+
+    emails = [teacher.email for teacher in payload.teachers]
+    existing = {row.email.lower() for row in await db.execute(select(User.email).where(User.email.in_(emails)))}
+    existing |= {row.email.lower() for row in await db.execute(select(Teacher.email).where(Teacher.email.in_(emails)))}
+    for index, teacher in enumerate(payload.teachers):
+        if teacher.email.lower() in existing:
+            errors.append({"index": index, "message": "Email already exists"})
+
+    if errors:
+        errors.sort(key=lambda error: error["index"])
+        raise HTTPException(status_code=400, detail={"message": "Validation failed", "errors": errors})
+
+    # All bcrypt work runs in parallel on the hashing pool
+    hashed_passwords = await password_hasher.hash_many_async([teacher.password for teacher in payload.teachers])
+
+    try:
+        db_users = [
+            User(name=teacher.name, email=teacher.email, password=hashed, role='moderator')
+            for teacher, hashed in zip(payload.teachers, hashed_passwords)
+        ]
+        db.add_all(db_users)
+        await db.flush()  # Get user IDs
+
+        db.add_all([
+            Teacher(
+                user_id=db_user.id,
+                name=teacher.name,
+                email=teacher.email,
+                grade=teacher.grade,
+                subjects=teacher.subjects,
+                joining_date=date.today(),
+                role='teacher'
+            )
+            for teacher, db_user in zip(payload.teachers, db_users)
+        ])
+        await db.commit()
+    except Exception:
+        await db.rollback()
+        raise HTTPException(status_code=500, detail="Server error")
+
+    return {
+        "success": True,
+        "message": f"{len(db_users)} teachers added successfully",
+        "data": [
+            {
+                "id": db_user.id,
+                "name": teacher.name,
+                "email": teacher.email,
+                "grade": teacher.grade,
+                "subjects": teacher.subjects
+            }
+            for teacher, db_user in zip(payload.teachers, db_users)
+        ]
+    }
+
 @router.put("/{teacher_id}", response_model=dict)
-def update_teacher(
+async def update_teacher(
     teacher_id: int,
     teacher_update: TeacherUpdate,
-    db: Session = Depends(get_db),
+    db: AsyncSession = Depends(get_async_db),
     current_user: User = Depends(check_role(['school_admin']))
 ):
     # Check if teacher exists
-    db_user = db.query(User).filter(
+    db_user = (await db.execute(select(User).where(
         User.id == teacher_id,
         User.role.in_(['moderator', 'teacher'])
-    ).first()
+    ))).scalar_one_or_none()
     
     if not db_user:
         raise HTTPException(status_code=404, detail="Teacher not found")
     
     # Check email uniqueness if updating email
     if teacher_update.email:
-        existing = db.query(User).filter(
+        existing = (await db.execute(select(User.id).where(
             User.email == teacher_update.email,
             User.id != teacher_id
-        ).first()
+        ))).first()
         if existing:
             raise HTTPException(status_code=400, detail="Email already exists")
     
@@ -153,65 +255,46 @@ def update_teacher(
             setattr(db_user, key, value)
     
     if teacher_updates:
-        db_teacher = db.query(Teacher).filter(Teacher.user_id == teacher_id).first()
+        db_teacher = (await db.execute(select(Teacher).where(Teacher.user_id == teacher_id))).scalar_one_or_none()
         if db_teacher:
             for key, value in teacher_updates.items():
                 setattr(db_teacher, key, value)
     
-    db.commit()
+    await db.commit()
+    invalidate_principal(teacher_id)
     
     return {"success": True, "message": "Teacher updated successfully"}
 
 @router.delete("/{teacher_id}", response_model=dict)
-def delete_teacher(
+async def delete_teacher(
     teacher_id: int,
-    db: Session = Depends(get_db),
+    db: AsyncSession = Depends(get_async_db),
     current_user: User = Depends(check_role(['school_admin']))
 ):
     # Check if teacher exists
-    db_user = db.query(User).filter(
+    db_user = (await db.execute(select(User).where(
         User.id == teacher_id,
         User.role.in_(['moderator', 'teacher'])
-    ).first()
+    ))).scalar_one_or_none()
     
     if not db_user:
         raise HTTPException(status_code=404, detail="Teacher not found")
     
     # Delete user (cascade will handle teacher)
-    db.delete(db_user)
-    db.commit()
+    await db.delete(db_user)
+    await db.commit()
+    invalidate_principal(teacher_id)
     
     return {"success": True, "message": "Teacher deleted successfully"}
 
 @router.get("/{teacher_id}", response_model=dict)
-def get_teacher(
+async def get_teacher(
     teacher_id: int,
-    db: Session = Depends(get_db),
+    db: AsyncSession = Depends(get_async_read_db),
     current_user: User = Depends(get_current_user)
 ):
-    db_user = db.query(User).join(Teacher, User.id == Teacher.user_id).filter(
-        User.id == teacher_id,
-        User.role.in_(['moderator', 'teacher'])
-    ).first()
-    
-    if not db_user:
+    teacher_data = await TEACHER_PROJECTION.fetch_one(db, User.id == teacher_id)
+    if not teacher_data:
         raise HTTPException(status_code=404, detail="Teacher not found")
     
-    teacher_data = {
-        "id": db_user.id,
-        "name": db_user.name,
-        "email": db_user.email,
-        "created_at": db_user.created_at,
-        "phone": db_user.teacher.phone if db_user.teacher else None,
-        "gender": db_user.teacher.gender if db_user.teacher else None,
-        "qualification": db_user.teacher.qualification if db_user.teacher else None,
-        "experience_years": db_user.teacher.experience_years if db_user.teacher else None,
-        "grade": db_user.teacher.grade if db_user.teacher else None,
-        "subjects": db_user.teacher.subjects if db_user.teacher else None,
-        "joining_date": db_user.teacher.joining_date if db_user.teacher else None,
-        "salary": db_user.teacher.salary if db_user.teacher else None,
-        "address": db_user.teacher.address if db_user.teacher else None,
-        "status": db_user.teacher.status if db_user.teacher else None
-    }
-    
-    return {"success": True, "data": teacher_data}
\ No newline at end of file
+    return FastJSONResponse({"success": True, "data": teacher_data})
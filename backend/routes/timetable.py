@@ -1,7 +1,299 @@
-from fastapi import APIRouter
+from fastapi import APIRouter, Depends, HTTPException
+from sqlalchemy import insert, select, delete
+from sqlalchemy.ext.asyncio import AsyncSession
+from starlette.concurrency import run_in_threadpool
+from sqlalchemy.exc import IntegrityError
+from pydantic import BaseModel
+from typing import List, Optional
+from datetime import time, datetime, timedelta
+from config.database import get_async_db, get_async_read_db, User, Timetable
+from middleware.auth import get_current_user, check_role
+from services.timetable_index import get_timetable_index_async, invalidate_timetable_index, lock_timetable, DAYS
+from services.timetable_solver import build_problem, solve
+from services.rollups import record_rows, reset_teacher_load
+from services.table_versions import bump
+from services.settings_store import get_settings
 
 router = APIRouter()
 
-@router.get("/")
-def get_timetable():
-    return {"success": True, "message": "Timetable endpoint - coming soon", "data": []}
\ No newline at end of file
+class TimetableSlot(BaseModel):
+    id: Optional[int] = None
+    class_id: int
+    day_of_week: str
+    period_number: int
+    subject_id: Optional[int] = None
+    teacher_id: int
+    room: Optional[str] = None
+
+class TimetableCreate(BaseModel):
+    class_id: int
+    day_of_week: str
+    period_number: int
+    subject_id: int
+    teacher_id: int
+    room: Optional[str] = None
+    start_time: time
+    end_time: time
+    academic_year: str
+
+class TimetableUpdate(BaseModel):
+    class_id: Optional[int] = None
+    day_of_week: Optional[str] = None
+    period_number: Optional[int] = None
+    subject_id: Optional[int] = None
+    teacher_id: Optional[int] = None
+    room: Optional[str] = None
+    start_time: Optional[time] = None
+    end_time: Optional[time] = None
+
+class TimetableValidate(BaseModel):
+    academic_year: str
+    slots: List[TimetableSlot]
+
+# Omitted fields come from the school settings: year, working days and period timings
+class TimetableGenerate(BaseModel):
+    academic_year: Optional[str] = None
+    days: Optional[List[str]] = None
+    periods_per_day: Optional[int] = None
+    first_period_start: Optional[time] = None
+    period_minutes: Optional[int] = None
+    rooms: List[str] = []
+    time_budget_seconds: float = 10.0
+    restarts: int = 4
+    workers: int = 1
+    dry_run: bool = False
+    force: bool = False  # replace the year's timetable even though some lessons could not be placed
+
+def serialize_entry(entry: Timetable):
+    return {
+        "id": entry.id,
+        "class_id": entry.class_id,
+        "day_of_week": entry.day_of_week,
+        "period_number": entry.period_number,
+        "subject_id": entry.subject_id,
+        "teacher_id": entry.teacher_id,
+        "room": entry.room,
+        "start_time": entry.start_time,
+        "end_time": entry.end_time,
+        "academic_year": entry.academic_year
+    }
+
+def check_slot(index, entry_id, class_id, teacher_id, room, day_of_week, period_number):
+    try:
+        conflicts = index.conflicts(class_id, teacher_id, room, day_of_week, period_number, ignore_id=entry_id)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    if conflicts:
+        raise HTTPException(
+            status_code=409,
+            detail={"message": "Timetable slot conflicts with an existing entry", "conflicts": conflicts}
+        )
+
+@router.get("/", response_model=dict)
+async def get_timetable(
+    academic_year: Optional[str] = None,
+    class_id: Optional[int] = None,
+    teacher_id: Optional[int] = None,
+    db: AsyncSession = Depends(get_async_read_db),
+    current_user: User = Depends(get_current_user)
+):
+    query = select(Timetable)
+    if academic_year:
+        query = query.where(Timetable.academic_year == academic_year)
+    if class_id:
+        query = query.where(Timetable.class_id == class_id)
+    if teacher_id:
+        query = query.where(Timetable.teacher_id == teacher_id)
+    result = await db.execute(query.order_by(Timetable.class_id, Timetable.day_of_week, Timetable.period_number))
+    entries = result.scalars().all()
+
+    return {"success": True, "data": [serialize_entry(entry) for entry in entries]}
+
+@router.get("/free-slots", response_model=dict)
+async def get_free_slots(
+    academic_year: str,
+    class_id: Optional[int] = None,
+    teacher_id: Optional[int] = None,
+    room: Optional[str] = None,
+    periods_per_day: int = 8,
+    db: AsyncSession = Depends(get_async_db),
+    current_user: User = Depends(get_current_user)
+):
+    index = await get_timetable_index_async(db, academic_year)
+    return {"success": True, "data": index.free_slots(class_id, teacher_id, room, periods_per_day)}
+
+@router.post("/validate", response_model=dict)
+async def validate_timetable(
+    payload: TimetableValidate,
+    db: AsyncSession = Depends(get_async_db),
+    current_user: User = Depends(get_current_user)
+):
+    index = await get_timetable_index_async(db, payload.academic_year)
+    results = index.validate([slot.dict() for slot in payload.slots])
+
+    return {
+        "success": True,
+        "data": {
+            "valid": all(result["valid"] for result in results),
+            "results": results
+        }
+    }
+
+@router.post("/generate", response_model=dict)
+async def generate_timetable(
+    payload: TimetableGenerate,
+    db: AsyncSession = Depends(get_async_db),
+    current_user: User = Depends(check_role(['super_admin', 'school_admin']))
+):
+    settings = get_settings()
+    academic_year = payload.academic_year or settings.academic_year
+    days = payload.days or [day for day in settings.working_days if day in DAYS]
+    periods_per_day = payload.periods_per_day or len(settings.periods)
+    if any(day not in DAYS for day in days):
+        raise HTTPException(status_code=400, detail="Invalid day in days")
+    if not 1 <= periods_per_day <= 16:
+        raise HTTPException(status_code=400, detail="periods_per_day must be between 1 and 16")
+    if not 0 < payload.time_budget_seconds <= 120:
+        raise HTTPException(status_code=400, detail="time_budget_seconds must be between 0 and 120")
+
+    problem = await db.run_sync(build_problem, days, periods_per_day, payload.rooms)
+    if not problem["lessons"]:
+        raise HTTPException(status_code=400, detail="No subject requirements found for any class")
+
+    # The solver is CPU-bound, so it runs off the event loop
+    result = await run_in_threadpool(
+        solve,
+        problem,
+        time_budget=payload.time_budget_seconds,
+        restarts=max(1, payload.restarts),
+        workers=max(1, min(payload.workers, 8))
+    )
+    summary = {key: value for key, value in result.items() if key != "assignments"}
+
+    if payload.dry_run:
+        return {"success": True, "data": {**summary, "assignments": result["assignments"]}}
+    # A partial result never replaces the existing timetable unless asked to
+    if result["unplaced"] and not payload.force:
+        raise HTTPException(
+            status_code=409,
+            detail={
+                "message": f"{result['unplaced']} lessons could not be placed; the existing timetable was kept",
+                "unplaced_lessons": result["unplaced_lessons"]
+            }
+        )
+
+    if payload.first_period_start is None and payload.period_minutes is None and periods_per_day <= len(settings.periods):
+        timings = {period.number: (period.start_time, period.end_time) for period in settings.periods}
+    else:
+        start = datetime.combine(datetime.min, payload.first_period_start or settings.periods[0].start_time)
+        period_length = timedelta(minutes=payload.period_minutes or 40)
+        timings = {
+            number: ((start + period_length * (number - 1)).time(), (start + period_length * number).time())
+            for number in range(1, periods_per_day + 1)
+        }
+    rows = []
+    for assignment in result["assignments"]:
+        start_time, end_time = timings[assignment["period_number"]]
+        rows.append({
+            **assignment,
+            "start_time": start_time,
+            "end_time": end_time,
+            "academic_year": academic_year
+        })
+
+    try:
+        await lock_timetable(db)
+        await db.execute(delete(Timetable).where(Timetable.academic_year == academic_year))
+        await db.run_sync(reset_teacher_load, academic_year)
+        if rows:
+            await db.execute(insert(Timetable), rows)
+            await db.run_sync(record_rows, Timetable, rows)
+        # Core writes skip the flush hook that bumps the version other workers' indexes check
+        await db.run_sync(lambda session: bump(session.connection(), {"timetable"}))
+        await db.commit()
+    except IntegrityError:
+        await db.rollback()
+        raise HTTPException(status_code=409, detail="Generated timetable clashes with another academic year's entries")
+    finally:
+        invalidate_timetable_index(academic_year)
+
+    message = "Timetable generated successfully"
+    if result["unplaced"]:
+        message = f"Timetable generated with {result['unplaced']} lessons unplaced"
+    return {"success": True, "message": message, "data": summary}
+
+@router.post("/", response_model=dict)
+async def create_timetable_entry(
+    entry: TimetableCreate,
+    db: AsyncSession = Depends(get_async_db),
+    current_user: User = Depends(check_role(['super_admin', 'school_admin']))
+):
+    if entry.end_time <= entry.start_time:
+        raise HTTPException(status_code=400, detail="End time must be after start time")
+
+    # Held until commit, so the clash check and the write see every other worker's writes
+    await lock_timetable(db)
+    index = await get_timetable_index_async(db, entry.academic_year)
+    check_slot(index, None, entry.class_id, entry.teacher_id, entry.room,
+               entry.day_of_week, entry.period_number)
+
+    db_entry = Timetable(**entry.dict())
+    db.add(db_entry)
+    try:
+        await db.commit()
+    except IntegrityError:
+        await db.rollback()
+        raise HTTPException(status_code=409, detail="Timetable slot is already taken")
+    index.committed(db_entry.id, db_entry)
+
+    return {"success": True, "message": "Timetable entry created successfully", "data": serialize_entry(db_entry)}
+
+@router.put("/{entry_id}", response_model=dict)
+async def update_timetable_entry(
+    entry_id: int,
+    entry_update: TimetableUpdate,
+    db: AsyncSession = Depends(get_async_db),
+    current_user: User = Depends(check_role(['super_admin', 'school_admin']))
+):
+    await lock_timetable(db)
+    db_entry = await db.get(Timetable, entry_id)
+    if not db_entry:
+        raise HTTPException(status_code=404, detail="Timetable entry not found")
+
+    update_data = entry_update.dict(exclude_unset=True)
+    merged = {**serialize_entry(db_entry), **update_data}
+    if merged["end_time"] <= merged["start_time"]:
+        raise HTTPException(status_code=400, detail="End time must be after start time")
+
+    index = await get_timetable_index_async(db, db_entry.academic_year)
+    check_slot(index, entry_id, merged["class_id"], merged["teacher_id"], merged["room"],
+               merged["day_of_week"], merged["period_number"])
+
+    for key, value in update_data.items():
+        setattr(db_entry, key, value)
+    try:
+        await db.commit()
+    except IntegrityError:
+        await db.rollback()
+        raise HTTPException(status_code=409, detail="Timetable slot is already taken")
+    index.committed(db_entry.id, db_entry)
+
+    return {"success": True, "message": "Timetable entry updated successfully", "data": serialize_entry(db_entry)}
+
+@router.delete("/{entry_id}", response_model=dict)
+async def delete_timetable_entry(
+    entry_id: int,
+    db: AsyncSession = Depends(get_async_db),
+    current_user: User = Depends(check_role(['super_admin', 'school_admin']))
+):
+    await lock_timetable(db)
+    db_entry = await db.get(Timetable, entry_id)
+    if not db_entry:
+        raise HTTPException(status_code=404, detail="Timetable entry not found")
+
+    index = await get_timetable_index_async(db, db_entry.academic_year)
+    await db.delete(db_entry)
+    await db.commit()
+    index.committed(entry_id)
+
+    return {"success": True, "message": "Timetable entry deleted successfully"}
@@ -0,0 +1,29 @@
+#!/usr/bin/env python3
+
+from config.database import Event, engine, tenant_engines, test_connection
+from config.tenancy import tenant_scope
+from services.event_calendar import backfill
+from services.migrations import add_missing_columns, create_missing_indexes
+from services.schools import active_school_ids
+
+print("🔍 Testing database connection...")
+test_connection()
+
+# Databases created before recurring events existed lack the calendar columns and indexes
+with engine.begin() as connection:
+    for name in add_missing_columns(connection, Event, ("recurrence_rule", "span_days", "last_date")):
+        print(f"➕ Added events.{name}")
+    for name in create_missing_indexes(connection, [Event.__table__]):
+        print(f"➕ Created index {name}")
+
+print("📅 Computing event spans and last dates...")
+total = 0
+for school_id in active_school_ids():
+    with tenant_scope(school_id):
+        db = tenant_engines()[2]()
+        try:
+            total += backfill(db)
+        finally:
+            db.close()
+
+print(f"✅ {total} events backfilled!")
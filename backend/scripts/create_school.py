@@ -0,0 +1,53 @@
+#!/usr/bin/env python3
+"""Register a school and its first admin, in a TENANCY_MODE=shared or =database deployment.
+
+    python -m scripts.create_school "Green Valley High" green-valley admin@greenvalley.edu PASSWORD
+
+With a database per school, its database is created and migrated first.
+Clients then log in with an X-School-ID header carrying the printed id.
+"""
+
+import sys
+from sqlalchemy import select
+from config.database import SessionLocal, School, User, create_database, tenant_engines
+from config.tenancy import MULTI_TENANT, TENANCY_MODE, tenant_scope
+from services.migrations import migrate
+from services.password_hasher import get_password_hash, password_hasher
+
+if len(sys.argv) != 5:
+    print(__doc__)
+    sys.exit(1)
+if not MULTI_TENANT:
+    print("❌ TENANCY_MODE is single; use scripts.create_admin instead")
+    sys.exit(1)
+
+name, slug, email, password = sys.argv[1:]
+
+with SessionLocal() as db:
+    school = db.execute(select(School).where(School.slug == slug)).scalar()
+    if school is None:
+        school = School(name=name, slug=slug)
+        db.add(school)
+        db.commit()
+        print(f"🏫 Registered {name} (id {school.id})")
+    else:
+        print(f"ℹ️  {slug} already exists (id {school.id})")
+    school_id = school.id
+
+with tenant_scope(school_id):
+    if TENANCY_MODE == "database":
+        bind = tenant_engines()[0]
+        create_database(bind)
+        migrate(bind)
+
+    with tenant_engines()[2]() as db:
+        if db.execute(select(User.id).where(User.email == email)).first() is None:
+            hashed_password = get_password_hash(password)
+            password_hasher.shutdown()
+            db.add(User(name=f"{name} Admin", email=email, password=hashed_password, role='school_admin'))
+            db.commit()
+            print(f"✅ Admin {email} created")
+        else:
+            print(f"ℹ️  Admin {email} already exists")
+
+print(f"🆔 School ID: {school_id}")
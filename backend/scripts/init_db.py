@@ -1,11 +1,13 @@
 #!/usr/bin/env python3
 
 from config.database import test_connection, create_database
+from services.migrations import migrate
 
 print("🔍 Testing database connection...")
+create_database()
 test_connection()
 
-print("🏗️  Initializing database tables...")
-create_database()
+print("🏗️  Applying migrations...")
+migrate()
 
-print("✅ Database setup complete!")
\ No newline at end of file
+print("✅ Database setup complete!")
@@ -0,0 +1,50 @@
+#!/usr/bin/env python3
+"""Apply pending schema migrations; run before starting new workers.
+
+    python -m scripts.migrate           apply pending migrations
+    python -m scripts.migrate --status  list applied and pending migrations
+
+With TENANCY_MODE=database the control database is migrated first, then
+every registered school's own database.
+"""
+
+import sys
+from config.database import engine, create_database, tenant_router, test_connection
+from config.tenancy import TENANCY_MODE
+from services.migrations import FINGERPRINT, MIGRATIONS, applied_migrations, migrate
+from services.schools import all_school_ids
+
+
+def targets():
+    """(label, sync engine) of every database this deployment keeps schema in"""
+    yield "primary", engine
+    if TENANCY_MODE == "database":
+        for school_id in all_school_ids():
+            yield f"school {school_id}", tenant_router.route(school_id)[0]
+
+
+def status(bind):
+    with bind.connect() as connection:
+        applied = {row.version: row for row in applied_migrations(connection)}
+    for step in MIGRATIONS:
+        row = applied.get(step.version)
+        state = f"applied {row.applied_at:%Y-%m-%d %H:%M}" if row else "pending"
+        print(f"   {step.version:>3} {step.name:<30} {state}")
+    latest = applied[max(applied)] if applied else None
+    if latest is not None and latest.fingerprint != FINGERPRINT:
+        print("⚠️  Models have changed since the last migration was applied")
+
+
+print("🔍 Testing database connection...")
+create_database()
+test_connection()
+
+for label, bind in targets():
+    if TENANCY_MODE == "database":
+        print(f"🏫 {label}")
+    if "--status" in sys.argv:
+        status(bind)
+        continue
+    create_database(bind)
+    applied = migrate(bind)
+    print(f"✅ {len(applied)} migration(s) applied" if applied else "✅ Schema is up to date")
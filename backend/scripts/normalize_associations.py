@@ -0,0 +1,48 @@
+#!/usr/bin/env python3
+
+import sys
+from config.database import engine, tenant_engines, test_connection
+from config.tenancy import tenant_scope
+from services.associations import migrate
+from services import feed
+from services.migrations import SchemaOutOfDate, require_schema
+from services.schools import active_school_ids
+
+
+
+def require_migrated(bind):
+    """This script only fills tables; creating them is scripts/migrate.py's job"""
+    try:
+        require_schema(bind)
+    except SchemaOutOfDate as e:
+        print(f"❌ {e}")
+        sys.exit(1)
+
+
+print("🔍 Testing database connection...")
+test_connection()
+require_migrated(engine)
+
+print("🔗 Converting subject, grade and audience text into association rows...")
+for school_id in active_school_ids():
+    with tenant_scope(school_id):
+        if school_id is not None:
+            print(f"🏫 School {school_id}")
+        require_migrated(tenant_engines()[0])
+        db = tenant_engines()[2]()
+        try:
+            report = migrate(db)
+            # Feed entries are derived from the same audience parsing
+            fanned_out = feed.rebuild(db)
+        finally:
+            db.close()
+
+    for table, rows in report["rows"].items():
+        print(f"   {table}: {rows} rows")
+    for table, tokens in report["unmatched"].items():
+        if tokens:
+            listed = ", ".join(f"{token} ({count})" for token, count in sorted(tokens.items(), key=lambda item: -item[1])[:20])
+            print(f"⚠️  {table}: unmatched values: {listed}")
+
+    print(f"   announcement_feed: {fanned_out} announcements fanned out")
+print("✅ Associations normalized!")
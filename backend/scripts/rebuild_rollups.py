@@ -0,0 +1,41 @@
+#!/usr/bin/env python3
+
+import sys
+from config.database import engine, tenant_engines, test_connection
+from config.tenancy import tenant_scope
+from services.enrollment import recount
+from services.rollups import rebuild
+from services.migrations import SchemaOutOfDate, require_schema
+from services.schools import active_school_ids
+
+
+
+def require_migrated(bind):
+    """This script only fills tables; creating them is scripts/migrate.py's job"""
+    try:
+        require_schema(bind)
+    except SchemaOutOfDate as e:
+        print(f"❌ {e}")
+        sys.exit(1)
+
+
+print("🔍 Testing database connection...")
+test_connection()
+require_migrated(engine)
+
+print("📊 Rebuilding report rollups...")
+for school_id in active_school_ids():
+    with tenant_scope(school_id):
+        if school_id is not None:
+            print(f"🏫 School {school_id}")
+        require_migrated(tenant_engines()[0])
+        db = tenant_engines()[2]()
+        try:
+            classes = recount(db.connection())
+            for table, groups in rebuild(db).items():
+                print(f"   {table}: {groups} groups")
+            print(f"   classes: {classes} enrollment counters corrected")
+        finally:
+            db.close()
+
+print("✅ Report rollups rebuilt!")
@@ -0,0 +1,397 @@
+import json
+import re
+from sqlalchemy import event, delete, func, insert, inspect, or_, select
+from sqlalchemy.orm import Session
+from config.database import (
+    Announcement, AnnouncementAudience, Class, Event, EventAudience, Grade, GradeSubject,
+    Subject, Teacher, TeacherSubject
+)
+
+ROLES = {
+    'teacher': 'teacher', 'teachers': 'teacher', 'staff': 'teacher', 'faculty': 'teacher',
+    'student': 'student', 'students': 'student',
+    'parent': 'parent', 'parents': 'parent',
+    'admin': 'admin', 'admins': 'admin'
+}
+EVERYONE = {'all', 'everyone', 'school', 'all users'}
+SEGMENTS = {
+    'primary': 'primary', 'secondary': 'secondary', 'sr_secondary': 'sr_secondary',
+    'sr secondary': 'sr_secondary', 'senior secondary': 'sr_secondary'
+}
+_SEPARATORS = re.compile(r'[,;\n]')
+_PREFIXES = re.compile(r'^(grade|class|std|standard)\s+')
+
+
+def normalize(value):
+    return str(value).strip().lower()
+
+
+def grade_value(value):
+    """Canonical grade for matching: 'Grade 9' and '9' both become '9'"""
+    return _PREFIXES.sub('', normalize(value))
+
+
+def split_list(value):
+    """Tokens of a comma/semicolon separated string or a JSON list"""
+    if value is None:
+        return []
+    if isinstance(value, (list, tuple)):
+        items = value
+    else:
+        text = str(value).strip()
+        items = None
+        if text.startswith('['):
+            try:
+                items = json.loads(text)
+            except ValueError:
+                text = text.strip('[]')
+        if not isinstance(items, list):
+            items = _SEPARATORS.split(text)
+    return [token for token in (str(item).strip().strip('"\'') for item in items) if token]
+
+
+def parse_subject_requirements(value, subjects_by_key, default_periods=None):
+    """Turn a Grade.subjects JSON value into {subject_id: periods_per_week}.
+
+    Accepts a list of subject ids, codes or names, a list of dicts such as
+    {"code": "MATH", "periods_per_week": 6}, or a {code: periods} mapping.
+    Subjects without a period count map to `default_periods`.
+    """
+    if not value:
+        return {}
+    if isinstance(value, str):
+        try:
+            value = json.loads(value)
+        except ValueError:
+            value = split_list(value)
+    if isinstance(value, dict):
+        value = [{"code": key, "periods_per_week": periods} for key, periods in value.items()]
+
+    requirements = {}
+    for item in value:
+        periods = default_periods
+        if isinstance(item, dict):
+            key = item.get("subject_id") or item.get("id") or item.get("code") or item.get("name")
+            periods = item.get("periods_per_week") or item.get("periods") or default_periods
+            periods = int(periods) if periods is not None else None
+        else:
+            key = item
+        subject_id = subjects_by_key.get(normalize(key))
+        if subject_id is not None and (periods is None or periods > 0):
+            requirements[subject_id] = periods
+    return requirements
+
+
+class Lookups:
+    """Name -> id maps for resolving free-text tokens, loaded once per flush or migration"""
+
+    def __init__(self, connection):
+        self.subjects = {}
+        for subject in connection.execute(select(Subject.id, Subject.code, Subject.name)):
+            for key in (subject.name, subject.code, subject.id):
+                self.subjects[normalize(key)] = subject.id
+
+        self.grades = {}
+        self.grade_values = set()
+        for grade in connection.execute(select(Grade.id, Grade.name)):
+            name = normalize(grade.name)
+            for key in (name, grade_value(name), grade.id):
+                self.grades[normalize(key)] = grade.id
+            self.grade_values.add(grade_value(name))
+
+        self.classes = {}
+        for class_ in connection.execute(select(Class.id, Class.name, Class.grade)):
+            name = normalize(class_.name)
+            self.classes[name] = class_.id
+            self.classes.setdefault(grade_value(name), class_.id)
+            self.grade_values.add(grade_value(class_.grade))
+
+    def subject_ids(self, value):
+        """(subject ids, unmatched tokens) for a Teacher.subjects string"""
+        ids, unmatched = [], []
+        for token in split_list(value):
+            subject_id = self.subjects.get(normalize(token))
+            if subject_id is None:
+                unmatched.append(token)
+            elif subject_id not in ids:
+                ids.append(subject_id)
+        return ids, unmatched
+
+    def grade_ids(self, value):
+        """(grade ids, unmatched tokens) for a Subject.grades string"""
+        ids, unmatched = [], []
+        for token in split_list(value):
+            key = normalize(token)
+            grade_id = self.grades.get(key, self.grades.get(grade_value(key)))
+            if grade_id is None:
+                unmatched.append(token)
+            elif grade_id not in ids:
+                ids.append(grade_id)
+        return ids, unmatched
+
+    def audience(self, value):
+        """(kind, value, class_id) targets for a target_audience string.
+
+        A token naming both a class and a grade counts as the grade. Tokens
+        that match nothing are kept as tags so no targeting is lost.
+        """
+        targets = []
+        for token in split_list(value):
+            key = normalize(token)
+            bare = grade_value(key)
+            class_id = self.classes.get(key, self.classes.get(bare))
+            if key in EVERYONE:
+                target = ('all', None, None)
+            elif key in ROLES:
+                target = ('role', ROLES[key], None)
+            elif key in SEGMENTS:
+                target = ('segment', SEGMENTS[key], None)
+            elif class_id is not None and bare not in self.grade_values:
+                target = ('class', None, class_id)
+            elif bare in self.grade_values:
+                target = ('grade', bare, None)
+            else:
+                target = ('tag', token[:100], None)
+            if target not in targets:
+                targets.append(target)
+        return targets
+
+
+def teacher_subject_rows(lookups, teacher_id, value):
+    subject_ids, _ = lookups.subject_ids(value)
+    return [{"teacher_id": teacher_id, "subject_id": subject_id} for subject_id in subject_ids]
+
+
+def audience_rows(lookups, owner_column, owner_id, value):
+    return [
+        {owner_column: owner_id, "kind": kind, "value": target, "class_id": class_id}
+        for kind, target, class_id in lookups.audience(value)
+    ]
+
+
+def replace_rows(connection, table, owner_column, owner_ids, rows):
+    """Swap the association rows of some owners for a freshly parsed set"""
+    if owner_ids:
+        connection.execute(delete(table).where(table.c[owner_column].in_(owner_ids)))
+    if rows:
+        connection.execute(insert(table), rows)
+
+
+def curriculum_pairs(connection, lookups):
+    """{(grade_id, subject_id): periods} listed by either Grade.subjects or Subject.grades.
+
+    Both catalogues are small, so they are re-read whole; periods come from
+    the grade side. Also returns the Subject.grades tokens that matched no grade.
+    """
+    pairs = {}
+    for grade_id, value in connection.execute(select(Grade.id, Grade.subjects)):
+        for subject_id, periods in parse_subject_requirements(value, lookups.subjects).items():
+            pairs[(grade_id, subject_id)] = periods
+    unmatched = []
+    for subject_id, value in connection.execute(select(Subject.id, Subject.grades)):
+        grade_ids, missing = lookups.grade_ids(value)
+        unmatched.extend(missing)
+        for grade_id in grade_ids:
+            pairs.setdefault((grade_id, subject_id), None)
+    return pairs, unmatched
+
+
+def replace_curriculum(connection, lookups, grade_ids=None, subject_ids=None):
+    """Rewrite grade_subjects rows touching the given grades or subjects (all rows if neither)"""
+    table = GradeSubject.__table__
+    pairs, unmatched = curriculum_pairs(connection, lookups)
+    if grade_ids is None and subject_ids is None:
+        connection.execute(delete(table))
+    else:
+        grade_ids, subject_ids = set(grade_ids or ()), set(subject_ids or ())
+        connection.execute(delete(table).where(or_(
+            table.c.grade_id.in_(grade_ids), table.c.subject_id.in_(subject_ids)
+        )))
+        pairs = {
+            pair: periods for pair, periods in pairs.items()
+            if pair[0] in grade_ids or pair[1] in subject_ids
+        }
+    rows = [
+        {"grade_id": grade_id, "subject_id": subject_id, "periods_per_week": periods}
+        for (grade_id, subject_id), periods in sorted(pairs.items())
+    ]
+    if rows:
+        connection.execute(insert(table), rows)
+    return len(rows), unmatched
+
+
+# model -> (text column, association table, owner column, row builder)
+SOURCES = {
+    Teacher: ('subjects', TeacherSubject.__table__, 'teacher_id', teacher_subject_rows),
+    Announcement: (
+        'target_audience', AnnouncementAudience.__table__, 'announcement_id',
+        lambda lookups, owner_id, value: audience_rows(lookups, 'announcement_id', owner_id, value)
+    ),
+    Event: (
+        'target_audience', EventAudience.__table__, 'event_id',
+        lambda lookups, owner_id, value: audience_rows(lookups, 'event_id', owner_id, value)
+    )
+}
+CURRICULUM = {Grade: 'subjects', Subject: 'grades'}
+# catalogue model -> (columns its rows are referred to by, owners whose text refers to them)
+CATALOGUES = {
+    Subject: (('name', 'code'), (Teacher,)),
+    Class: (('name', 'grade'), (Announcement, Event)),
+    Grade: (('name',), (Announcement, Event))
+}
+
+
+def _text_changed(session, obj, column):
+    return obj in session.new or inspect(obj).attrs[column].history.has_changes()
+
+
+def _catalogue_keys(session, obj, columns):
+    """Tokens that named a catalogue row before or after this flush; empty if it wasn't added, renamed or deleted"""
+    state = inspect(obj)
+    if obj not in session.new and obj not in session.deleted and not any(
+        state.attrs[column].history.has_changes() for column in columns
+    ):
+        return set()
+    keys = set()
+    for column in columns:
+        history = state.attrs[column].history
+        for value in (*history.added, *history.unchanged, *history.deleted):
+            if value:
+                keys.update((normalize(value), grade_value(value)))
+    keys.discard('')
+    return keys
+
+
+def mentioning(connection, model, keys, exclude=()):
+    """(id, text) of the owners whose text contains any of the keys: a superset, re-parsed exactly by the caller"""
+    column = getattr(model, SOURCES[model][0])
+    statement = select(model.id, column).where(
+        or_(*[func.lower(column).contains(key, autoescape=True) for key in sorted(keys)])
+    )
+    if exclude:
+        statement = statement.where(model.id.notin_(exclude))
+    return connection.execute(statement).all()
+
+
+@event.listens_for(Session, "after_flush")
+def _sync_flush(session, flush_context):
+    changed = {}
+    curriculum = {Grade: set(), Subject: set()}
+    removed = {}
+    # Owners whose text may name a catalogue row that was added, renamed or deleted
+    mentioned = {}
+
+    for obj in list(session.new) + list(session.dirty):
+        model = type(obj)
+        if model in SOURCES and _text_changed(session, obj, SOURCES[model][0]):
+            changed.setdefault(model, []).append(obj)
+        elif model in CURRICULUM and _text_changed(session, obj, CURRICULUM[model]):
+            curriculum[model].add(obj.id)
+
+    for obj in session.deleted:
+        model = type(obj)
+        if model in SOURCES:
+            # Databases that don't enforce ON DELETE CASCADE (SQLite) need the rows removed by hand
+            removed.setdefault(model, []).append(inspect(obj).identity[0])
+        elif model in CURRICULUM:
+            curriculum[model].add(inspect(obj).identity[0])
+
+    for obj in list(session.new) + list(session.dirty) + list(session.deleted):
+        model = type(obj)
+        if model in CATALOGUES:
+            columns, owners = CATALOGUES[model]
+            keys = _catalogue_keys(session, obj, columns)
+            for owner in owners if keys else ():
+                mentioned.setdefault(owner, set()).update(keys)
+
+    if not (changed or removed or mentioned or curriculum[Grade] or curriculum[Subject]):
+        return
+
+    connection = session.connection()
+    for model, owner_ids in removed.items():
+        _, table, owner_column, _ = SOURCES[model]
+        replace_rows(connection, table, owner_column, owner_ids, [])
+
+    if changed or mentioned or curriculum[Grade] or curriculum[Subject]:
+        lookups = Lookups(connection)
+        for model, objs in changed.items():
+            column, table, owner_column, build = SOURCES[model]
+            rows = [row for obj in objs for row in build(lookups, obj.id, getattr(obj, column))]
+            replace_rows(connection, table, owner_column, [obj.id for obj in objs], rows)
+        relinked = []
+        for model, keys in mentioned.items():
+            _, table, owner_column, build = SOURCES[model]
+            owners = mentioning(connection, model, keys, [obj.id for obj in changed.get(model, ())])
+            rows = [row for owner_id, value in owners for row in build(lookups, owner_id, value)]
+            replace_rows(connection, table, owner_column, [owner_id for owner_id, _ in owners], rows)
+            if model is Announcement:
+                relinked.extend(owner_id for owner_id, _ in owners)
+        if curriculum[Grade] or curriculum[Subject]:
+            replace_curriculum(connection, lookups, curriculum[Grade], curriculum[Subject])
+        if relinked:
+            # Feed entries resolve the same audience text, so they move with the links
+            from services import feed
+            feed.refresh(connection, relinked, lookups)
+
+
+def migrate(session, batch_size=1000):
+    """Rebuild every association table from the free-text columns.
+
+    Safe to re-run: it also links tokens that only became resolvable later
+    (e.g. a subject created after the teacher that lists it). Returns per-table
+    row counts and how often each unresolvable token occurred.
+    """
+    connection = session.connection()
+    lookups = Lookups(connection)
+    report = {"rows": {}, "unmatched": {}}
+
+    def count_unmatched(name, tokens):
+        counts = report["unmatched"].setdefault(name, {})
+        for token in tokens:
+            counts[token] = counts.get(token, 0) + 1
+
+    for model, (column, table, owner_column, build) in SOURCES.items():
+        connection.execute(delete(table))
+        total = 0
+        source = select(model.id, getattr(model, column)).order_by(model.id)
+        for chunk in connection.execute(source).partitions(batch_size):
+            rows = [row for owner_id, value in chunk for row in build(lookups, owner_id, value)]
+            if rows:
+                connection.execute(insert(table), rows)
+            total += len(rows)
+            if model is Teacher:
+                for _, value in chunk:
+                    count_unmatched(table.name, lookups.subject_ids(value)[1])
+        report["rows"][table.name] = total
+
+    total, unmatched = replace_curriculum(connection, lookups)
+    report["rows"][GradeSubject.__tablename__] = total
+    count_unmatched(GradeSubject.__tablename__, unmatched)
+
+    session.commit()
+    return report
+
+
+def teachers_for_subject(subject_id):
+    """Subquery of teacher ids qualified for a subject (uses ix_teacher_subjects_subject_teacher)"""
+    return select(TeacherSubject.teacher_id).where(TeacherSubject.subject_id == subject_id)
+
+
+def subjects_for_grade(grade_id):
+    """Subquery of subject ids taught in a grade"""
+    return select(GradeSubject.subject_id).where(GradeSubject.grade_id == grade_id)
+
+
+def announcements_for(kind, value=None, class_id=None):
+    """Subquery of announcement ids explicitly targeting one audience"""
+    statement = select(AnnouncementAudience.announcement_id).where(AnnouncementAudience.kind == kind)
+    if kind == 'class':
+        return statement.where(AnnouncementAudience.class_id == class_id)
+    if value is not None:
+        value = normalize(value)
+        if kind == 'role':
+            value = ROLES.get(value, value)
+        elif kind == 'grade':
+            value = grade_value(value)
+        statement = statement.where(AnnouncementAudience.value == value)
+    return statement
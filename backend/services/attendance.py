@@ -0,0 +1,353 @@
+import calendar
+import os
+from datetime import date
+from sqlalchemy import func, insert, or_, select
+from config.database import Attendance, AttendanceRoster, AttendanceRosterMember, Class, Student
+from config.tenancy import tenant_identity
+from services.enrollment import ENROLLED_STATUS
+
+# Bitmaps hold roll numbers 1..ATTENDANCE_MAX_ROLL_NUMBER, at most 128 bytes each by default
+ATTENDANCE_MAX_ROLL_NUMBER = int(os.getenv("ATTENDANCE_MAX_ROLL_NUMBER", "1024"))
+
+
+def pack(roll_numbers):
+    """Bitmap integer with bit n-1 set for each roll number n"""
+    bits = 0
+    for roll_number in roll_numbers:
+        bits |= 1 << (roll_number - 1)
+    return bits
+
+
+def to_blob(bits):
+    return bits.to_bytes((bits.bit_length() + 7) // 8, "little")
+
+
+def from_blob(blob):
+    return int.from_bytes(blob or b"", "little")
+
+
+def unpack(bits):
+    """Roll numbers set in a bitmap, in order"""
+    roll_numbers = []
+    while bits:
+        lowest = bits & -bits
+        roll_numbers.append(lowest.bit_length())
+        bits ^= lowest
+    return roll_numbers
+
+
+class BitCounter:
+    """Per-bit counts over many bitmaps, kept as bit-sliced binary counters.
+
+    Plane k holds bit k of every position's count, so adding a day is a
+    ripple-carry add across all roll numbers at once: a few big-integer
+    XORs and ANDs per day instead of a loop over students.
+    """
+
+    def __init__(self):
+        self.planes = []
+
+    def add(self, bits):
+        carry = bits
+        for level, plane in enumerate(self.planes):
+            if not carry:
+                return
+            self.planes[level] = plane ^ carry
+            carry &= plane
+        if carry:
+            self.planes.append(carry)
+
+    def count(self, roll_number):
+        position = roll_number - 1
+        return sum(((plane >> position) & 1) << level for level, plane in enumerate(self.planes))
+
+
+def month_range(month):
+    """First and last day of a 'YYYY-MM' month"""
+    year, number = (int(part) for part in month.split("-"))
+    return date(year, number, 1), date(year, number, calendar.monthrange(year, number)[1])
+
+
+def roster(session, class_id):
+    """{roll_number: (student id, name)} of the class's active students, how many have no usable
+    roll number, and the roll numbers held by more than one student"""
+    rows = session.execute(
+        select(Student.roll_number, Student.id, Student.name)
+        .where(Student.class_id == class_id, Student.status == ENROLLED_STATUS)
+        .order_by(Student.id)
+    ).tuples().all()
+    students, duplicates, unrolled = {}, set(), 0
+    for roll_number, student_id, name in rows:
+        if roll_number is None or not 1 <= roll_number <= ATTENDANCE_MAX_ROLL_NUMBER:
+            unrolled += 1
+        elif roll_number in students:
+            duplicates.add(roll_number)
+        else:
+            students[roll_number] = (student_id, name)
+    return students, unrolled, duplicates
+
+
+def roster_members(session, roster_ids):
+    """{roster id: {roll_number: student id}} of some stored rosters"""
+    members = {roster_id: {} for roster_id in roster_ids}
+    if members:
+        for roster_id, roll_number, student_id in session.execute(
+            select(AttendanceRosterMember.roster_id, AttendanceRosterMember.roll_number, AttendanceRosterMember.student_id)
+            .where(AttendanceRosterMember.roster_id.in_(sorted(members)))
+        ).tuples():
+            members[roster_id][roll_number] = student_id
+    return members
+
+
+def save_roster(session, class_id, mapping):
+    """Id of a stored roster for a {roll_number: student id} mapping, reusing the class's latest when nothing has changed"""
+    latest = session.execute(
+        select(func.max(AttendanceRoster.id)).where(AttendanceRoster.class_id == class_id)
+    ).scalar()
+    if latest is not None and roster_members(session, [latest])[latest] == mapping:
+        return latest
+    stored = AttendanceRoster(class_id=class_id)
+    session.add(stored)
+    session.flush()
+    if mapping:
+        session.execute(insert(AttendanceRosterMember), [
+            {"roster_id": stored.id, "roll_number": roll_number, "student_id": student_id}
+            for roll_number, student_id in sorted(mapping.items())
+        ])
+    return stored.id
+
+
+def student_names(session, student_ids):
+    if not student_ids:
+        return {}
+    return dict(session.execute(select(Student.id, Student.name).where(Student.id.in_(sorted(student_ids)))).tuples().all())
+
+
+def mark(session, class_id, day, absent=(), present=None, merge=False, marked_by=None):
+    """Record one class's attendance for a day as a single row.
+
+    Without `present`, every roll number on the class roster not listed as
+    absent is present. With `merge`, only the listed roll numbers change
+    and earlier marks for the others are kept, as long as the same student
+    still holds the roll number. The roster is stored alongside, so the
+    bits keep meaning the same students after roll numbers change. Raises
+    ValueError for roll numbers not on the roster or held by two students.
+    Nothing is committed here.
+    """
+    students, unrolled, duplicates = roster(session, class_id)
+    if duplicates:
+        raise ValueError(
+            f"Roll numbers held by more than one student in class {class_id}: "
+            f"{', '.join(map(str, sorted(duplicates)))}; renumber them before marking"
+        )
+    absent, listed_present = set(absent), set(present or ())
+    both = absent & listed_present
+    if both:
+        raise ValueError(f"Roll numbers marked both present and absent: {', '.join(map(str, sorted(both)))}")
+    unknown = (absent | listed_present) - set(students)
+    if unknown:
+        raise ValueError(f"Roll numbers not in class {class_id}: {', '.join(map(str, sorted(unknown)))}")
+
+    if present is None and not merge:
+        listed_present = set(students) - absent
+    marked_bits = pack(absent | listed_present)
+    present_bits = pack(listed_present)
+    mapping = {roll_number: student_id for roll_number, (student_id, _) in students.items()}
+    if merge:
+        existing = session.get(Attendance, {**tenant_identity(), "class_id": class_id, "date": day}, with_for_update=True)
+        if existing is not None:
+            kept = from_blob(existing.marked) & ~marked_bits
+            if existing.roster_id is not None:
+                # Students who have left keep that day's marks while nobody else holds their roll number
+                before = roster_members(session, [existing.roster_id])[existing.roster_id]
+                on_roster = set(mapping.values())
+                for roll_number, student_id in before.items():
+                    if roll_number not in mapping and student_id not in on_roster:
+                        mapping[roll_number] = student_id
+                # Other earlier marks only carry over for roll numbers still held by the same student
+                kept &= pack(roll for roll, student_id in mapping.items() if before.get(roll) == student_id)
+            present_bits |= from_blob(existing.present) & kept
+            marked_bits |= kept
+    roster_id = save_roster(session, class_id, mapping)
+
+    session.merge(Attendance(
+        **tenant_identity(), class_id=class_id, date=day,
+        marked=to_blob(marked_bits), present=to_blob(present_bits),
+        marked_count=marked_bits.bit_count(), present_count=present_bits.bit_count(),
+        marked_by=marked_by, roster_id=roster_id
+    ))
+    return {
+        "class_id": class_id,
+        "date": day,
+        "marked": marked_bits.bit_count(),
+        "present": present_bits.bit_count(),
+        "absent": unpack(marked_bits & ~present_bits),
+        "without_roll_number": unrolled
+    }
+
+
+def register(session, class_id, day):
+    """The class's marks for one day, student by student, as the roster stood that day"""
+    row = session.execute(
+        select(Attendance.marked, Attendance.present, Attendance.roster_id)
+        .where(Attendance.class_id == class_id, Attendance.date == day)
+    ).first()
+    if row is not None and row.roster_id is not None:
+        members = roster_members(session, [row.roster_id])[row.roster_id]
+        names = student_names(session, members.values())
+        students = {roll_number: (student_id, names.get(student_id)) for roll_number, student_id in members.items()}
+    else:
+        students, _, _ = roster(session, class_id)
+    marked, present = (from_blob(row.marked), from_blob(row.present)) if row else (0, 0)
+    return {
+        "class_id": class_id,
+        "date": day,
+        "taken": row is not None,
+        "students": [
+            {"roll_number": roll_number, "student_id": student_id, "name": name,
+             "status": ("present" if present >> (roll_number - 1) & 1 else "absent")
+             if marked >> (roll_number - 1) & 1 else None}
+            for roll_number, (student_id, name) in sorted(students.items())
+        ]
+    }
+
+
+def percent(part, whole):
+    return round(100 * part / whole, 1) if whole else None
+
+
+def class_summary(session, class_id, start, end):
+    """Days present and marked per student of a class between two dates.
+
+    Days are folded into two BitCounters per stored roster, so the cost per
+    day does not depend on class size, and each roster's counts go to the
+    students who held those roll numbers then. Students who have since left
+    the class are listed after the current roster with in_class false.
+    """
+    rows = session.execute(
+        select(Attendance.date, Attendance.marked, Attendance.present, Attendance.marked_count,
+               Attendance.present_count, Attendance.roster_id)
+        .where(Attendance.class_id == class_id, Attendance.date.between(start, end))
+        .order_by(Attendance.date)
+    ).tuples().all()
+    counters = {}
+    for _, marked_blob, present_blob, _, _, roster_id in rows:
+        marked, present = counters.setdefault(roster_id, (BitCounter(), BitCounter()))
+        marked.add(from_blob(marked_blob))
+        present.add(from_blob(present_blob))
+
+    students, _, _ = roster(session, class_id)
+    current = {roll_number: student_id for roll_number, (student_id, _) in students.items()}
+    members = roster_members(session, [roster_id for roster_id in counters if roster_id is not None])
+    # Unrecorded rosters (rows marked before rosters were kept) read against the current one
+    members[None] = current
+    totals, last_roll = {}, {}
+    for roster_id, (marked, present) in sorted(counters.items(), key=lambda item: item[0] or 0):
+        for roll_number, student_id in members[roster_id].items():
+            days_marked, days_present = totals.get(student_id, (0, 0))
+            totals[student_id] = (days_marked + marked.count(roll_number), days_present + present.count(roll_number))
+            last_roll[student_id] = roll_number
+
+    former = {student_id for student_id, (days_marked, _) in totals.items() if days_marked} - set(current.values())
+    names = {student_id: name for student_id, name in students.values()}
+    names.update(student_names(session, former))
+    summary = []
+    listed = [(roll_number, student_id, True) for roll_number, student_id in sorted(current.items())]
+    listed += sorted((last_roll[student_id], student_id, False) for student_id in former)
+    for roll_number, student_id, in_class in listed:
+        days_marked, days_present = totals.get(student_id, (0, 0))
+        summary.append({
+            "roll_number": roll_number, "student_id": student_id, "name": names.get(student_id), "in_class": in_class,
+            "present": days_present, "absent": days_marked - days_present, "marked": days_marked,
+            "percent": percent(days_present, days_marked)
+        })
+    total_marked = sum(row[3] for row in rows)
+    total_present = sum(row[4] for row in rows)
+    return {
+        "class_id": class_id,
+        "start": start,
+        "end": end,
+        "days": len(rows),
+        "percent": percent(total_present, total_marked),
+        "students": summary,
+        "daily": [
+            {"date": day, "present": present_count, "absent": marked_count - present_count}
+            for day, _, _, marked_count, present_count, _ in rows
+        ]
+    }
+
+
+def student_summary(session, student_id, start, end):
+    """One student's marks between two dates, in whichever class and under whichever roll number they had each day"""
+    student = session.execute(
+        select(Student.id, Student.name, Student.class_id, Student.roll_number).where(Student.id == student_id)
+    ).first()
+    if student is None:
+        return None
+    # roster id -> (class id, roll number) of every roster the student was on
+    held = {
+        roster_id: (class_id, roll_number) for roster_id, class_id, roll_number in session.execute(
+            select(AttendanceRosterMember.roster_id, AttendanceRoster.class_id, AttendanceRosterMember.roll_number)
+            .join(AttendanceRoster, AttendanceRoster.id == AttendanceRosterMember.roster_id)
+            .where(AttendanceRosterMember.student_id == student_id)
+        ).tuples()
+    }
+    class_ids = {class_id for class_id, _ in held.values()}
+    unrecorded = student.class_id is not None and student.roll_number is not None
+    if unrecorded:
+        class_ids.add(student.class_id)
+    days = []
+    if class_ids:
+        rows = session.execute(
+            select(Attendance.date, Attendance.class_id, Attendance.marked, Attendance.present, Attendance.roster_id)
+            .where(Attendance.class_id.in_(sorted(class_ids)), Attendance.date.between(start, end))
+            .where(or_(Attendance.roster_id.in_(sorted(held)), Attendance.roster_id.is_(None)))
+            .order_by(Attendance.date, Attendance.class_id)
+        ).tuples().all()
+        for day, class_id, marked, present, roster_id in rows:
+            if roster_id is not None:
+                position = held[roster_id][1] - 1
+            elif unrecorded and class_id == student.class_id:
+                position = student.roll_number - 1
+            else:
+                continue
+            if from_blob(marked) >> position & 1:
+                days.append({
+                    "date": day, "class_id": class_id,
+                    "status": "present" if from_blob(present) >> position & 1 else "absent"
+                })
+    days_present = sum(1 for day in days if day["status"] == "present")
+    return {
+        "student_id": student.id, "name": student.name, "class_id": student.class_id,
+        "roll_number": student.roll_number, "start": start, "end": end,
+        "present": days_present, "absent": len(days) - days_present, "marked": len(days),
+        "percent": percent(days_present, len(days)), "days": days
+    }
+
+
+def school_summary(session, start, end):
+    """Attendance per class between two dates, summed from the stored daily counts"""
+    rows = session.execute(
+        select(
+            Class.id, Class.name, Class.grade, Class.section, func.count(Attendance.date),
+            func.coalesce(func.sum(Attendance.marked_count), 0), func.coalesce(func.sum(Attendance.present_count), 0)
+        )
+        .select_from(Class)
+        .outerjoin(Attendance, (Attendance.class_id == Class.id) & Attendance.date.between(start, end))
+        .group_by(Class.id, Class.name, Class.grade, Class.section)
+        .order_by(Class.id)
+    ).tuples().all()
+    classes = [
+        {"class_id": class_id, "class_name": name, "grade": grade, "section": section,
+         "days": days, "marked": marked, "present": present, "percent": percent(present, marked)}
+        for class_id, name, grade, section, days, marked, present in rows
+    ]
+    total_marked = sum(item["marked"] for item in classes)
+    total_present = sum(item["present"] for item in classes)
+    return {
+        "start": start,
+        "end": end,
+        "percent": percent(total_present, total_marked),
+        "classes_without_marks": sum(1 for item in classes if not item["days"]),
+        "classes": classes
+    }
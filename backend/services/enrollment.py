@@ -0,0 +1,99 @@
+from sqlalchemy import bindparam, event, func, inspect, or_, select, update
+from sqlalchemy.orm import Session
+from config.database import Class, Student
+from services.rollups import committed_values
+from services.table_versions import bump
+
+# Only active students take a seat; inactive and transferred ones keep their class_id for history
+ENROLLED_STATUS = 'active'
+
+
+class ClassFull(Exception):
+    """Raised when an enrollment would take a class past its max_students"""
+
+    def __init__(self, class_id, requested):
+        super().__init__(f"Class {class_id} has no room for {requested} more student(s)")
+        self.class_id = class_id
+        self.requested = requested
+
+
+def seat(values):
+    """Class a student row occupies a seat in, or None"""
+    if values.get('status') in (None, ENROLLED_STATUS):
+        return values.get('class_id')
+    return None
+
+
+def adjust_enrollment(connection, deltas):
+    """Add each {class_id: n} onto classes.current_students with one atomic UPDATE per class.
+
+    Increases only apply while the class stays within max_students, checked
+    in the same statement, so concurrent enrollments cannot overfill a class;
+    a refused increase raises ClassFull and the caller rolls back. Classes
+    are updated in id order so concurrent writers lock them in the same order.
+    """
+    deltas = {class_id: delta for class_id, delta in deltas.items() if class_id is not None and delta}
+    for class_id, delta in sorted(deltas.items()):
+        current = func.coalesce(Class.current_students, 0)
+        statement = update(Class).where(Class.id == class_id).values(current_students=current + delta)
+        if delta > 0:
+            statement = statement.where(or_(Class.max_students.is_(None), current + delta <= Class.max_students))
+        if connection.execute(statement).rowcount == 0 and delta > 0:
+            raise ClassFull(class_id, delta)
+    if deltas:
+        bump(connection, {"classes"})
+
+
+def recount(connection):
+    """Set every class's current_students from the students table.
+
+    Counts come from one grouped scan of students; only classes whose
+    counter disagrees are written, so a correlated count per class (slow
+    without a (class_id, status) index) is never needed.
+    """
+    enrolled = dict(connection.execute(
+        select(Student.class_id, func.count())
+        .where(Student.status == ENROLLED_STATUS, Student.class_id.is_not(None))
+        .group_by(Student.class_id)
+    ).tuples().all())
+    stale = [
+        {"class_id": class_id, "count": enrolled.get(class_id, 0)}
+        for class_id, current in connection.execute(select(Class.id, Class.current_students)).tuples()
+        if current != enrolled.get(class_id, 0)
+    ]
+    if stale:
+        connection.execute(
+            update(Class).where(Class.id == bindparam("class_id")).values(current_students=bindparam("count")),
+            stale
+        )
+    bump(connection, {"classes"})
+    return len(stale)
+
+
+@event.listens_for(Session, "after_flush")
+def _count_flush(session, flush_context):
+    deltas = {}
+
+    def add(class_id, delta):
+        if class_id is not None:
+            deltas[class_id] = deltas.get(class_id, 0) + delta
+
+    for obj in session.new:
+        if isinstance(obj, Student):
+            add(seat(inspect(obj).dict), 1)
+    for obj in session.deleted:
+        if isinstance(obj, Student):
+            add(seat(committed_values(inspect(obj), ('class_id', 'status'))), -1)
+    for obj in session.dirty:
+        if not isinstance(obj, Student):
+            continue
+        state = inspect(obj)
+        if not (state.attrs.class_id.history.has_changes() or state.attrs.status.history.has_changes()):
+            continue
+        old, new = seat(committed_values(state, ('class_id', 'status'))), seat(state.dict)
+        if old != new:
+            add(old, -1)
+            add(new, 1)
+
+    if any(deltas.values()):
+        adjust_enrollment(session.connection(), deltas)
@@ -0,0 +1,421 @@
+import calendar
+import hashlib
+import os
+import threading
+from datetime import date, datetime, timedelta
+from sqlalchemy import event, and_, bindparam, or_, select, union_all, update
+from sqlalchemy.orm import Session
+from config.database import Event, EventAudience, FeedVersion
+from config.tenancy import current_school_id
+from services.feed import EVERYONE, EVERYTHING, bump_versions
+
+# Events no longer than this are found with a bounded range scan on start_date;
+# longer and recurring events are looked up by last_date instead
+SHORT_SPAN_DAYS = int(os.getenv("CALENDAR_SHORT_SPAN_DAYS", "14"))
+MAX_WINDOW_DAYS = 400
+MAX_COUNT = 5000
+ICS_HISTORY_DAYS = int(os.getenv("CALENDAR_ICS_HISTORY_DAYS", "180"))
+CACHE_SIZE = int(os.getenv("CALENDAR_CACHE_SIZE", "256"))
+
+# Row in feed_versions bumped on every event write, shared by all workers
+VERSION_KEY = 'calendar'
+
+FREQUENCIES = ('DAILY', 'WEEKLY', 'MONTHLY', 'YEARLY')
+WEEKDAYS = ('MO', 'TU', 'WE', 'TH', 'FR', 'SA', 'SU')
+TARGETED_KINDS = ('role', 'segment', 'grade', 'class')
+
+EVENT_COLUMNS = (
+    Event.id, Event.title, Event.description, Event.type, Event.start_date, Event.end_date,
+    Event.start_time, Event.end_time, Event.location, Event.target_audience, Event.status,
+    Event.recurrence_rule, Event.span_days, Event.last_date, Event.updated_at
+)
+
+
+class Recurrence:
+    """Parsed RRULE subset: FREQ, INTERVAL, BYDAY (weekly only), COUNT and UNTIL"""
+
+    def __init__(self, freq, interval=1, weekdays=(), count=None, until=None):
+        self.freq = freq
+        self.interval = interval
+        self.weekdays = weekdays
+        self.count = count
+        self.until = until
+
+    @classmethod
+    def parse(cls, rule):
+        parts = {}
+        for part in rule.strip().upper().removeprefix('RRULE:').split(';'):
+            name, _, value = part.partition('=')
+            if not value:
+                raise ValueError(f"Invalid recurrence rule part '{part}'")
+            parts[name.strip()] = value.strip()
+
+        freq = parts.pop('FREQ', None)
+        if freq not in FREQUENCIES:
+            raise ValueError(f"FREQ must be one of {', '.join(FREQUENCIES)}")
+        try:
+            interval = int(parts.pop('INTERVAL', 1))
+            count = int(parts['COUNT']) if 'COUNT' in parts else None
+            until = datetime.strptime(parts['UNTIL'][:8], '%Y%m%d').date() if 'UNTIL' in parts else None
+        except ValueError:
+            raise ValueError("INTERVAL and COUNT must be integers and UNTIL a YYYYMMDD date")
+        parts.pop('COUNT', None)
+        parts.pop('UNTIL', None)
+        if interval < 1 or (count is not None and not 1 <= count <= MAX_COUNT):
+            raise ValueError(f"INTERVAL must be positive and COUNT between 1 and {MAX_COUNT}")
+        if count is not None and until is not None:
+            raise ValueError("COUNT and UNTIL cannot be combined")
+
+        weekdays = ()
+        if 'BYDAY' in parts:
+            if freq != 'WEEKLY':
+                raise ValueError("BYDAY is only supported with FREQ=WEEKLY")
+            days = parts.pop('BYDAY').split(',')
+            if any(day not in WEEKDAYS for day in days):
+                raise ValueError(f"BYDAY must list days from {','.join(WEEKDAYS)}")
+            weekdays = tuple(sorted({WEEKDAYS.index(day) for day in days}))
+        if parts:
+            raise ValueError(f"Unsupported recurrence rule parts: {', '.join(parts)}")
+        return cls(freq, interval, weekdays, count, until)
+
+    def text(self):
+        """Normalized RRULE value, as stored and written to the .ics feed"""
+        parts = [f"FREQ={self.freq}"]
+        if self.interval != 1:
+            parts.append(f"INTERVAL={self.interval}")
+        if self.weekdays:
+            parts.append("BYDAY=" + ",".join(WEEKDAYS[day] for day in self.weekdays))
+        if self.count is not None:
+            parts.append(f"COUNT={self.count}")
+        if self.until is not None:
+            parts.append(f"UNTIL={self.until:%Y%m%d}")
+        return ";".join(parts)
+
+    def starts(self, first, since):
+        """Occurrence start dates on or after `since`, in order.
+
+        Jumps straight to the period containing `since` instead of walking
+        the series from `first`, so a window years into a series is as cheap
+        as its first week. Ignores COUNT and UNTIL; callers stop at the
+        series' last start.
+        """
+        since = max(since, first)
+        if self.freq == 'DAILY':
+            periods = -(-(since - first).days // self.interval)
+            day = first + timedelta(days=periods * self.interval)
+            while True:
+                yield day
+                day += timedelta(days=self.interval)
+
+        elif self.freq == 'WEEKLY':
+            weekdays = self.weekdays or (first.weekday(),)
+            anchor = first - timedelta(days=first.weekday())
+            period = 7 * self.interval
+            week = anchor + timedelta(days=(since - anchor).days // period * period)
+            while True:
+                for weekday in weekdays:
+                    day = week + timedelta(days=weekday)
+                    if day >= since:
+                        yield day
+                week += timedelta(days=period)
+
+        else:
+            step = self.interval * (12 if self.freq == 'YEARLY' else 1)
+            months = (since.year - first.year) * 12 + since.month - first.month
+            offset = months // step * step
+            while True:
+                year, month = divmod(first.month - 1 + offset, 12)
+                year += first.year
+                if year > date.max.year:
+                    return
+                # Like RFC 5545, months without the start's day (e.g. the 31st) are skipped
+                if first.day <= calendar.monthrange(year, month + 1)[1]:
+                    day = date(year, month + 1, first.day)
+                    if day >= since:
+                        yield day
+                offset += step
+
+    def last_start(self, first):
+        """Start of the final occurrence, or None if the series never ends"""
+        if self.until is not None:
+            last = None
+            for day in self.starts(first, first):
+                if day > self.until:
+                    break
+                last = day
+            return last or first
+        if self.count is not None:
+            for number, day in enumerate(self.starts(first, first), 1):
+                if number == self.count:
+                    return day
+        return None
+
+
+_parsed = {}
+
+
+def parse_rule(rule):
+    """Recurrence for a stored rule, parsed once per process"""
+    recurrence = _parsed.get(rule)
+    if recurrence is None:
+        recurrence = _parsed[rule] = Recurrence.parse(rule)
+    return recurrence
+
+
+def normalize_rule(rule):
+    """Validated, canonical form of a user-supplied rule (ValueError if unsupported)"""
+    if rule is None or not rule.strip():
+        return None
+    return Recurrence.parse(rule).text()
+
+
+def derive_range(start_date, end_date, recurrence_rule):
+    """(span_days, last_date) stored with an event"""
+    span = max((end_date - start_date).days, 0) if end_date else 0
+    if not recurrence_rule:
+        return span, start_date + timedelta(days=span)
+    last_start = parse_rule(recurrence_rule).last_start(start_date)
+    return span, last_start + timedelta(days=span) if last_start else None
+
+
+def occurrences(row, window_start, window_end):
+    """(start, end) of each occurrence of an event row overlapping the window"""
+    span = timedelta(days=row.span_days or 0)
+    if not row.recurrence_rule:
+        yield row.start_date, row.start_date + span
+        return
+    last_start = row.last_date - span if row.last_date else None
+    for day in parse_rule(row.recurrence_rule).starts(row.start_date, window_start - span):
+        if day > window_end or (last_start is not None and day > last_start):
+            break
+        yield day, day + span
+
+
+@event.listens_for(Session, "before_flush")
+def _derive_flush(session, flush_context, instances):
+    for obj in list(session.new) + list(session.dirty):
+        if isinstance(obj, Event) and obj.start_date is not None:
+            span_days, last_date = derive_range(obj.start_date, obj.end_date, obj.recurrence_rule)
+            if obj.span_days != span_days:
+                obj.span_days = span_days
+            if obj.last_date != last_date:
+                obj.last_date = last_date
+
+
+@event.listens_for(Session, "after_flush")
+def _version_flush(session, flush_context):
+    if (any(isinstance(obj, Event) for obj in session.new)
+            or any(isinstance(obj, Event) for obj in session.deleted)
+            or any(isinstance(obj, Event) and session.is_modified(obj) for obj in session.dirty)):
+        bump_version(session.connection())
+
+
+def bump_version(connection):
+    """Invalidate every worker's cached calendars; call after Core writes to events"""
+    bump_versions(connection, {VERSION_KEY})
+
+
+def backfill(session, batch_size=1000):
+    """Fill span_days and last_date for events written before they existed"""
+    rows = session.execute(select(Event.id, Event.start_date, Event.end_date, Event.recurrence_rule)).all()
+    statement = update(Event.__table__).where(Event.__table__.c.id == bindparam('event_id')).values(
+        span_days=bindparam('span'), last_date=bindparam('last')
+    )
+    for start in range(0, len(rows), batch_size):
+        params = []
+        for row in rows[start:start + batch_size]:
+            span, last = derive_range(row.start_date, row.end_date, row.recurrence_rule)
+            params.append({"event_id": row.id, "span": span, "last": last})
+        session.connection().execute(statement, params)
+    bump_version(session.connection())
+    session.commit()
+    return len(rows)
+
+
+def audience_filter(audiences):
+    """Events a viewer with these audience keys sees, or None for admins (everything).
+
+    Events without any role, segment, grade or class target are for everyone,
+    matching how the announcement feed treats untargeted announcements.
+    """
+    if EVERYTHING in audiences:
+        return None
+    matches = []
+    for key in audiences:
+        kind, _, value = key.partition(':')
+        if key == EVERYONE:
+            matches.append(EventAudience.kind == 'all')
+        elif kind == 'class':
+            matches.append(and_(EventAudience.kind == 'class', EventAudience.class_id == int(value)))
+        elif kind in TARGETED_KINDS:
+            matches.append(and_(EventAudience.kind == kind, EventAudience.value == value))
+    targeted = select(EventAudience.event_id).where(EventAudience.kind.in_(TARGETED_KINDS))
+    criteria = [Event.id.notin_(targeted)]
+    if matches:
+        criteria.append(Event.id.in_(select(EventAudience.event_id).where(or_(*matches))))
+    return or_(*criteria)
+
+
+def window_statement(window_start, window_end, audiences, type=None):
+    """Events overlapping [window_start, window_end] as two index range reads.
+
+    Short one-off events can only overlap if they start at most
+    SHORT_SPAN_DAYS before the window, which bounds the start_date scan no
+    matter how much history has piled up. Long and recurring events are
+    found through last_date, which skips everything that ended before the window.
+    """
+    short = select(*EVENT_COLUMNS).where(
+        Event.start_date.between(window_start - timedelta(days=SHORT_SPAN_DAYS), window_end),
+        Event.last_date >= window_start,
+        Event.span_days <= SHORT_SPAN_DAYS,
+        Event.recurrence_rule.is_(None)
+    )
+    long = select(*EVENT_COLUMNS).where(
+        or_(Event.last_date >= window_start, Event.last_date.is_(None)),
+        Event.start_date <= window_end,
+        or_(Event.span_days > SHORT_SPAN_DAYS, Event.recurrence_rule.isnot(None))
+    )
+    criteria = [criterion for criterion in (audience_filter(audiences), Event.type == type if type else None)
+                if criterion is not None]
+    if criteria:
+        short, long = short.where(*criteria), long.where(*criteria)
+    return union_all(short, long)
+
+
+class CalendarCache:
+    """LRU of rendered calendars, each tagged with the calendar version it was built from"""
+
+    def __init__(self, maxsize=CACHE_SIZE):
+        self.maxsize = maxsize
+        self.entries = {}
+        self.lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, key, version):
+        with self.lock:
+            entry = self.entries.pop(key, None)
+            if entry is None or entry[0] != version:
+                self.misses += 1
+                return None
+            self.entries[key] = entry
+            self.hits += 1
+            return entry[1]
+
+    def set(self, key, version, value):
+        with self.lock:
+            self.entries.pop(key, None)
+            self.entries[key] = (version, value)
+            while len(self.entries) > self.maxsize:
+                self.entries.pop(next(iter(self.entries)))
+
+
+calendar_cache = CalendarCache()
+
+
+async def calendar_version(db):
+    version = (await db.execute(select(FeedVersion.version).where(FeedVersion.audience == VERSION_KEY))).scalar()
+    return version or 0
+
+
+def calendar_etag(version, *request_parts):
+    digest = hashlib.sha1(repr((version, request_parts)).encode()).hexdigest()
+    return f'"{digest}"'
+
+
+async def events_in_range(db, window_start, window_end, audiences, version, type=None):
+    """Occurrences overlapping the window, recurring events expanded only inside it"""
+    key = ('range', current_school_id(), tuple(audiences), window_start, window_end, type)
+    items = calendar_cache.get(key, version)
+    if items is not None:
+        return items
+    rows = (await db.execute(window_statement(window_start, window_end, audiences, type))).all()
+    items = []
+    for row in rows:
+        for start, end in occurrences(row, window_start, window_end):
+            if end < window_start:
+                continue
+            items.append({
+                "id": row.id,
+                "title": row.title,
+                "description": row.description,
+                "type": row.type,
+                "location": row.location,
+                "target_audience": row.target_audience,
+                "status": row.status,
+                "start_time": row.start_time,
+                "end_time": row.end_time,
+                "recurrence_rule": row.recurrence_rule,
+                "occurrence_start": start,
+                "occurrence_end": end
+            })
+    items.sort(key=lambda item: (item["occurrence_start"], item["start_time"] or datetime.min.time(), item["id"]))
+    calendar_cache.set(key, version, items)
+    return items
+
+
+def _ics_text(value):
+    return (str(value).replace('\\', '\\\\').replace(';', '\\;').replace(',', '\\,')
+            .replace('\r\n', '\\n').replace('\n', '\\n'))
+
+
+def _fold(line):
+    """Split a content line into 75-octet chunks as RFC 5545 requires"""
+    encoded = line.encode()
+    if len(encoded) <= 75:
+        return line
+    chunks, start = [], 0
+    while start < len(encoded):
+        end = min(start + (75 if not chunks else 74), len(encoded))
+        while end < len(encoded) and (encoded[end] & 0xC0) == 0x80:
+            end -= 1  # never split a UTF-8 sequence
+        chunks.append(encoded[start:end].decode())
+        start = end
+    return "\r\n ".join(chunks)
+
+
+def render_ics(rows, name):
+    """VCALENDAR text; recurring events keep their RRULE so clients expand them"""
+    lines = [
+        "BEGIN:VCALENDAR", "VERSION:2.0", "PRODID:-//Learnroot//School Calendar//EN",
+        "CALSCALE:GREGORIAN", "METHOD:PUBLISH", f"X-WR-CALNAME:{_ics_text(name)}"
+    ]
+    for row in sorted(rows, key=lambda row: (row.start_date, row.id)):
+        last_day = row.start_date + timedelta(days=row.span_days or 0)
+        lines += ["BEGIN:VEVENT", f"UID:event-{row.id}@learnroot"]
+        lines.append(f"DTSTAMP:{(row.updated_at or datetime.utcnow()):%Y%m%dT%H%M%SZ}")
+        if row.start_time is not None:
+            lines.append(f"DTSTART:{datetime.combine(row.start_date, row.start_time):%Y%m%dT%H%M%S}")
+            end_time = row.end_time or row.start_time
+            lines.append(f"DTEND:{datetime.combine(last_day, end_time):%Y%m%dT%H%M%S}")
+        else:
+            # All-day events end on the following day, exclusive
+            lines.append(f"DTSTART;VALUE=DATE:{row.start_date:%Y%m%d}")
+            lines.append(f"DTEND;VALUE=DATE:{last_day + timedelta(days=1):%Y%m%d}")
+        if row.recurrence_rule:
+            lines.append(f"RRULE:{row.recurrence_rule}")
+        lines.append(f"SUMMARY:{_ics_text(row.title)}")
+        if row.description:
+            lines.append(f"DESCRIPTION:{_ics_text(row.description)}")
+        if row.location:
+            lines.append(f"LOCATION:{_ics_text(row.location)}")
+        lines.append(f"CATEGORIES:{row.type.upper()}")
+        lines.append(f"STATUS:{'CANCELLED' if row.status == 'cancelled' else 'CONFIRMED'}")
+        lines.append("END:VEVENT")
+    lines.append("END:VCALENDAR")
+    return "\r\n".join(_fold(line) for line in lines) + "\r\n"
+
+
+async def ics_feed(db, audiences, version, name="Learnroot"):
+    """Cached .ics body for an audience; rebuilt only after an event write bumps the version"""
+    since = date.today() - timedelta(days=ICS_HISTORY_DAYS)
+    key = ('ics', current_school_id(), tuple(audiences), since)
+    body = calendar_cache.get(key, version)
+    if body is None:
+        statement = select(*EVENT_COLUMNS).where(or_(Event.last_date >= since, Event.last_date.is_(None)))
+        criterion = audience_filter(audiences)
+        if criterion is not None:
+            statement = statement.where(criterion)
+        body = render_ics((await db.execute(statement)).all(), name)
+        calendar_cache.set(key, version, body)
+    return body
@@ -0,0 +1,88 @@
+import csv
+import io
+import json
+import zlib
+from datetime import date, datetime, time
+from decimal import Decimal
+from config.database import engine
+
+EXPORT_BATCH_SIZE = 1000
+
+
+def stream_rows(statement, bind=None, batch_size=EXPORT_BATCH_SIZE):
+    """Yield rows from a server-side cursor, holding at most one batch in memory.
+
+    The generator owns its connection, so it stays valid after the request's
+    session has been closed by the time the response body is streamed.
+    """
+    with (bind or engine).connect() as conn:
+        result = conn.execution_options(stream_results=True, yield_per=batch_size).execute(statement)
+        for row in result:
+            yield row
+
+
+def _text(value):
+    if value is None:
+        return ''
+    if isinstance(value, (date, datetime, time)):
+        return value.isoformat()
+    return value
+
+
+def csv_chunks(columns, rows, rows_per_chunk=500):
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    writer.writerow(columns)
+    count = 0
+    for row in rows:
+        writer.writerow([_text(value) for value in row])
+        count += 1
+        if count % rows_per_chunk == 0:
+            yield buffer.getvalue().encode('utf-8')
+            buffer.seek(0)
+            buffer.truncate()
+    yield buffer.getvalue().encode('utf-8')
+
+
+def _json_default(value):
+    if isinstance(value, (date, datetime, time)):
+        return value.isoformat()
+    if isinstance(value, Decimal):
+        return str(value)
+    raise TypeError(f"Cannot serialize {type(value).__name__}")
+
+
+def ndjson_chunks(columns, rows, rows_per_chunk=500):
+    lines = []
+    for row in rows:
+        lines.append(json.dumps(dict(zip(columns, row)), default=_json_default, separators=(',', ':')))
+        if len(lines) >= rows_per_chunk:
+            yield ('\n'.join(lines) + '\n').encode('utf-8')
+            lines = []
+    if lines:
+        yield ('\n'.join(lines) + '\n').encode('utf-8')
+
+
+def gzip_chunks(chunks, level=6):
+    compressor = zlib.compressobj(level, zlib.DEFLATED, 31)  # wbits=31 writes a gzip header
+    for chunk in chunks:
+        compressed = compressor.compress(chunk)
+        if compressed:
+            yield compressed
+    yield compressor.flush()
+
+
+FORMATS = {
+    'csv': (csv_chunks, 'text/csv'),
+    'ndjson': (ndjson_chunks, 'application/x-ndjson')
+}
+
+
+def export_stream(statement, fmt='csv', compress=False, bind=None):
+    """Build the byte generator and media type for an export of `statement`"""
+    formatter, media_type = FORMATS[fmt]
+    columns = [column.key for column in statement.selected_columns]
+    chunks = formatter(columns, stream_rows(statement, bind=bind))
+    if compress:
+        return gzip_chunks(chunks), 'application/gzip'
+    return chunks, media_type
@@ -0,0 +1,203 @@
+import hashlib
+import os
+import threading
+import time
+from sqlalchemy import event, delete, insert, inspect, or_, select
+from sqlalchemy.orm import Session
+from config.database import Announcement, AnnouncementFeed, Class, FeedVersion, Teacher, Timetable
+from config.tenancy import current_school_id
+from services.associations import Lookups, grade_value, split_list
+from services.rollups import upsert_increment
+
+EVERYONE = 'all'
+EVERYTHING = 'any'  # every announcement regardless of audience, read by admins
+ADMIN_ROLES = {'super_admin', 'school_admin'}
+VIEWER_CACHE_TTL = float(os.getenv("FEED_VIEWER_TTL", "60"))  # seconds
+VIEWER_CACHE_SIZE = int(os.getenv("FEED_VIEWER_CACHE_SIZE", "10000"))
+
+# Columns copied onto feed entries; changing anything else only bumps versions
+FEED_COLUMNS = ('target_audience', 'type', 'status', 'expiry_date', 'created_at')
+
+
+def audience_keys(lookups, target_audience):
+    """Feed keys an announcement is written under"""
+    keys = {EVERYTHING}
+    for kind, value, class_id in lookups.audience(target_audience):
+        if kind == 'all':
+            keys.add(EVERYONE)
+        elif kind == 'class':
+            keys.add(f"class:{class_id}")
+        elif kind in ('role', 'segment', 'grade'):
+            keys.add(f"{kind}:{value}")
+    if keys == {EVERYTHING}:
+        # No audience, or only free-form tags: nobody can be excluded, so everyone sees it
+        keys.add(EVERYONE)
+    return keys
+
+
+def bump_versions(connection, audiences):
+    if audiences:
+        rows = [{"audience": audience, "version": 1} for audience in sorted(audiences)]
+        upsert_increment(connection, FeedVersion.__table__, ['audience'], 'version', rows)
+
+
+def refresh(connection, announcement_ids, lookups=None):
+    """Rewrite the feed entries of some announcements from their current rows.
+
+    Deleted announcements simply lose their entries. Every audience whose
+    entries changed gets its version bumped in the same transaction.
+    """
+    table = AnnouncementFeed.__table__
+    announcement_ids = sorted(set(announcement_ids))
+    if not announcement_ids:
+        return
+    touched = {
+        row.audience for row in connection.execute(
+            select(table.c.audience).where(table.c.announcement_id.in_(announcement_ids)).distinct()
+        )
+    }
+    connection.execute(delete(table).where(table.c.announcement_id.in_(announcement_ids)))
+
+    announcements = connection.execute(
+        select(Announcement.id, Announcement.target_audience, Announcement.type, Announcement.status,
+               Announcement.expiry_date, Announcement.created_at)
+        .where(Announcement.id.in_(announcement_ids))
+    ).all()
+    if announcements:
+        lookups = lookups or Lookups(connection)
+        rows = [
+            {
+                "audience": audience,
+                "announcement_id": announcement.id,
+                "published_at": announcement.created_at,
+                "type": announcement.type,
+                "status": announcement.status,
+                "expiry_date": announcement.expiry_date
+            }
+            for announcement in announcements
+            for audience in audience_keys(lookups, announcement.target_audience)
+        ]
+        connection.execute(insert(table), rows)
+        touched.update(row["audience"] for row in rows)
+    bump_versions(connection, touched)
+
+
+def touch(connection, announcement_ids):
+    """Bump the versions of an announcement's audiences without rewriting its entries"""
+    table = AnnouncementFeed.__table__
+    bump_versions(connection, {
+        row.audience for row in connection.execute(
+            select(table.c.audience).where(table.c.announcement_id.in_(sorted(set(announcement_ids)))).distinct()
+        )
+    })
+
+
+@event.listens_for(Session, "after_flush")
+def _fan_out_flush(session, flush_context):
+    refreshed, touched = [], []
+    for obj in session.new:
+        if isinstance(obj, Announcement):
+            refreshed.append(obj.id)
+    for obj in session.dirty:
+        if not isinstance(obj, Announcement) or not session.is_modified(obj):
+            continue
+        state = inspect(obj)
+        if any(state.attrs[column].history.has_changes() for column in FEED_COLUMNS):
+            refreshed.append(obj.id)
+        else:
+            touched.append(obj.id)
+    for obj in session.deleted:
+        if isinstance(obj, Announcement):
+            refreshed.append(inspect(obj).identity[0])
+
+    if refreshed or touched:
+        connection = session.connection()
+        refresh(connection, refreshed)
+        if touched:
+            touch(connection, touched)
+
+
+def rebuild(session, batch_size=1000):
+    """Re-fan every announcement, e.g. after classes or grades were renamed"""
+    connection = session.connection()
+    lookups = Lookups(connection)
+    audiences = {row.audience for row in connection.execute(select(FeedVersion.audience))}
+    connection.execute(delete(AnnouncementFeed.__table__))
+    total = 0
+    for chunk in connection.execute(select(Announcement.id).order_by(Announcement.id)).partitions(batch_size):
+        refresh(connection, [row.id for row in chunk], lookups)
+        total += len(chunk)
+    # Audiences that lost every entry still need new ETags
+    bump_versions(connection, audiences)
+    session.commit()
+    return total
+
+
+class ViewerCache:
+    """Short-lived LRU of each user's audience keys, so unchanged polls skip the class lookups"""
+
+    def __init__(self, maxsize=VIEWER_CACHE_SIZE, ttl=VIEWER_CACHE_TTL):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self.entries = {}
+        self.lock = threading.Lock()
+
+    def get(self, user_id):
+        with self.lock:
+            entry = self.entries.pop(user_id, None)
+            if entry is None or entry[1] < time.monotonic():
+                return None
+            self.entries[user_id] = entry
+            return entry[0]
+
+    def set(self, user_id, keys):
+        with self.lock:
+            self.entries.pop(user_id, None)
+            self.entries[user_id] = (keys, time.monotonic() + self.ttl)
+            while len(self.entries) > self.maxsize:
+                self.entries.pop(next(iter(self.entries)))
+
+
+viewer_cache = ViewerCache()
+
+
+async def viewer_audiences(db, principal):
+    """Audience keys a user's feed reads: their role plus the grades, segments and classes they teach"""
+    if principal.role in ADMIN_ROLES:
+        return (EVERYTHING,)
+    viewer = (current_school_id(), principal.id)
+    keys = viewer_cache.get(viewer)
+    if keys is not None:
+        return keys
+
+    keys = {EVERYONE, "role:teacher"}
+    teacher = (await db.execute(select(Teacher.id, Teacher.grade).where(Teacher.user_id == principal.id))).first()
+    if teacher is not None:
+        keys.update(f"grade:{grade_value(grade)}" for grade in split_list(teacher.grade))
+        taught = select(Timetable.class_id).where(Timetable.teacher_id == teacher.id)
+        classes = await db.execute(
+            select(Class.id, Class.grade, Class.segment)
+            .where(or_(Class.class_teacher_id == teacher.id, Class.id.in_(taught)))
+        )
+        for class_ in classes:
+            keys.update({f"class:{class_.id}", f"grade:{grade_value(class_.grade)}", f"segment:{class_.segment}"})
+
+    keys = tuple(sorted(keys))
+    viewer_cache.set(viewer, keys)
+    return keys
+
+
+async def feed_etag(db, audiences, *request_parts):
+    """Strong ETag from the audiences' versions and everything else that shapes the response"""
+    versions = (await db.execute(
+        select(FeedVersion.audience, FeedVersion.version).where(FeedVersion.audience.in_(audiences))
+    )).all()
+    digest = hashlib.sha1(repr((sorted(versions), audiences, request_parts)).encode()).hexdigest()
+    return f'"{digest}"'
+
+
+def etag_matches(if_none_match, etag):
+    if not if_none_match:
+        return False
+    candidates = [value.strip() for value in if_none_match.split(',')]
+    return '*' in candidates or any(candidate.removeprefix('W/') == etag for candidate in candidates)
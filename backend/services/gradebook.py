@@ -0,0 +1,299 @@
+from datetime import datetime
+import numpy as np
+from sqlalchemy import bindparam, delete, func, insert, select, update
+from config.database import Class, Exam, ExamResult, ExamSubject, Mark, Student, Subject
+from config.tenancy import tenant_identity
+from services.enrollment import ENROLLED_STATUS
+from services.settings_store import get_settings
+
+# ExamResult columns that only move when other students' totals change
+STANDING_COLUMNS = ('rank', 'class_rank', 'percentile')
+SCORE_COLUMNS = ('class_id', 'total', 'max_total', 'percent', 'grade', 'passed', 'failed_subjects')
+
+
+def papers(session, exam_id):
+    """{subject_id: max_marks} of an exam"""
+    rows = session.execute(
+        select(ExamSubject.subject_id, ExamSubject.max_marks)
+        .where(ExamSubject.exam_id == exam_id).order_by(ExamSubject.subject_id)
+    ).tuples()
+    return {subject_id: float(max_marks) for subject_id, max_marks in rows}
+
+
+def grade_bands(settings):
+    """Grading scheme as (min_percent ascending, grade names) for a sorted search"""
+    bands = sorted(settings.grading_scheme, key=lambda band: band.min_percent)
+    return [band.min_percent for band in bands], [band.grade for band in bands]
+
+
+def compute_scores(student_ids, maxima, rows, settings):
+    """{student_id: (total, percent, grade, passed, failed_subjects)} from (student_id, subject_id, marks) rows.
+
+    A student passes with pass_percent overall and in every paper; absent
+    or missing papers count as zero. Vectorized over the whole
+    students x papers matrix.
+    """
+    student_ids = list(student_ids)
+    index = {student_id: position for position, student_id in enumerate(student_ids)}
+    columns = {subject_id: position for position, subject_id in enumerate(maxima)}
+    limits = np.fromiter(maxima.values(), dtype=float, count=len(maxima))
+    # NaN for absent or not yet entered: adds nothing to the total and fails the paper
+    matrix = np.full((len(student_ids), len(maxima)), np.nan)
+    marked = [row for row in rows if row[2] is not None and row[1] in columns]
+    if marked:
+        matrix[[index[row[0]] for row in marked], [columns[row[1]] for row in marked]] = [float(row[2]) for row in marked]
+
+    totals = np.round(np.nansum(matrix, axis=1), 2)
+    percents = np.round(totals * 100 / limits.sum(), 2) if limits.sum() else np.zeros(len(student_ids))
+    with np.errstate(invalid='ignore'):
+        failed = (~(matrix >= limits * settings.pass_percent / 100)).sum(axis=1)
+    minimums, names = grade_bands(settings)
+    bands = np.maximum(np.searchsorted(np.array(minimums), percents, side='right') - 1, 0)
+    passed = (percents >= settings.pass_percent) & (failed == 0)
+    return {
+        student_id: (totals[i].item(), percents[i].item(), names[bands[i]], bool(passed[i]), int(failed[i]))
+        for i, student_id in enumerate(student_ids)
+    }
+
+
+def standings(class_ids, totals):
+    """Grade rank, class rank and percentile for each total; ties share the higher rank.
+
+    The percentile is the share of the rest of the grade scoring below.
+    """
+    totals = np.asarray(totals, dtype=float)
+    count = len(totals)
+    ordered = np.sort(totals)
+    ranks = count - np.searchsorted(ordered, totals, side='right') + 1
+    below = np.searchsorted(ordered, totals, side='left')
+    percentiles = np.round(below * 100 / (count - 1), 2) if count > 1 else np.full(count, 100.0)
+
+    # Class ranks from one sort on (class, total): each class is a contiguous run of keys
+    dense = {class_id: position for position, class_id in enumerate(dict.fromkeys(class_ids))}
+    groups = np.fromiter((dense[class_id] for class_id in class_ids), dtype=float, count=count)
+    span = ordered[-1] + 1 if count else 1
+    keys = groups * span + totals
+    ordered_keys = np.sort(keys)
+    class_ends = np.searchsorted(ordered_keys, (groups + 1) * span, side='left')
+    class_ranks = class_ends - np.searchsorted(ordered_keys, keys, side='right') + 1
+    return ranks.tolist(), class_ranks.tolist(), percentiles.tolist()
+
+
+def refresh_results(session, exam_id, student_ids=None):
+    """Bring the exam's result table up to date; returns the number of result rows written.
+
+    Everyone on the grade's roster gets a result, with zero for papers they
+    have no marks in, as do students with marks who have since left it.
+    With `student_ids`, only those students, and any grade-mates without a
+    result yet, are rescored. Everyone's ranks and percentiles are
+    recomputed from the stored totals, but only the rows whose standing
+    actually moved are rewritten. Without it the whole table is rebuilt,
+    as publishing does. Nothing is committed here.
+    """
+    connection = session.connection()
+    maxima = papers(session, exam_id)
+    marks = select(Mark.student_id, Mark.subject_id, Mark.marks).where(Mark.exam_id == exam_id)
+    enrolled = (
+        select(Student.id).join(Class, Class.id == Student.class_id)
+        .where(Class.grade == select(Exam.grade).where(Exam.id == exam_id).scalar_subquery(),
+               Student.status == ENROLLED_STATUS)
+    )
+    current = {}
+    if student_ids is not None:
+        current = {
+            row[0]: row[1:] for row in session.execute(
+                select(ExamResult.student_id, ExamResult.class_id, ExamResult.total, *(
+                    getattr(ExamResult, column) for column in STANDING_COLUMNS
+                )).where(ExamResult.exam_id == exam_id)
+            ).tuples()
+        }
+        # Grade-mates without a result yet are scored too, so standings always rank the whole grade
+        grade = set(session.execute(enrolled).scalars())
+        student_ids = sorted(set(student_ids) | (grade - set(current)))
+        marks = marks.where(Mark.student_id.in_(student_ids))
+        grade &= set(student_ids)
+    else:
+        grade = set(session.execute(enrolled).scalars())
+    rows = session.execute(marks).tuples().all()
+    scored_ids = sorted({row[0] for row in rows} | grade)
+    classes = dict(session.execute(
+        select(Student.id, Student.class_id).where(Student.id.in_(scored_ids))
+    ).tuples().all()) if scored_ids else {}
+    scores = compute_scores(scored_ids, maxima, rows, get_settings())
+    max_total = round(sum(maxima.values()), 2)
+
+    removed = [student_id for student_id in (student_ids or ()) if student_id in current and student_id not in scores]
+    for student_id in removed:
+        del current[student_id]
+
+    everyone = sorted(set(current) | set(scores))
+    class_ids = [classes[s] if s in scores else current[s][0] for s in everyone]
+    totals = [scores[s][0] if s in scores else float(current[s][1]) for s in everyone]
+    ranks, class_ranks, percentiles = standings(class_ids, totals) if everyone else ([], [], [])
+
+    inserts, rescored, moved = [], [], []
+    for position, student_id in enumerate(everyone):
+        standing = {"rank": ranks[position], "class_rank": class_ranks[position], "percentile": percentiles[position]}
+        if student_id in scores:
+            total, percent, grade, passed, failed = scores[student_id]
+            row = {"student_id": student_id, "class_id": classes.get(student_id), "total": total, "max_total": max_total,
+                   "percent": percent, "grade": grade, "passed": passed, "failed_subjects": failed, **standing}
+            (rescored if student_id in current else inserts).append(row)
+        else:
+            _, _, rank, class_rank, percentile = current[student_id]
+            if (rank, class_rank, float(percentile)) != tuple(standing.values()):
+                moved.append({"student_id": student_id, **standing})
+
+    now = datetime.utcnow()
+    if student_ids is None:
+        connection.execute(delete(ExamResult).where(ExamResult.exam_id == exam_id))
+    elif removed:
+        connection.execute(delete(ExamResult).where(ExamResult.exam_id == exam_id, ExamResult.student_id.in_(removed)))
+    if inserts:
+        connection.execute(insert(ExamResult), [{"exam_id": exam_id, "updated_at": now, **row} for row in inserts])
+    for batch, columns in ((rescored, SCORE_COLUMNS + STANDING_COLUMNS), (moved, STANDING_COLUMNS)):
+        if batch:
+            connection.execute(
+                update(ExamResult)
+                .where(ExamResult.exam_id == exam_id, ExamResult.student_id == bindparam("result_student_id"))
+                .values(updated_at=now, **{column: bindparam(f"new_{column}") for column in columns}),
+                [{"result_student_id": row["student_id"], **{f"new_{column}": row[column] for column in columns}}
+                 for row in batch]
+            )
+    return len(inserts) + len(rescored) + len(moved) + len(removed)
+
+
+def grade_roster(session, exam):
+    """Active students of every class in the exam's grade, as (id, class_id, roll_number)"""
+    return session.execute(
+        select(Student.id, Student.class_id, Student.roll_number)
+        .join(Class, Class.id == Student.class_id)
+        .where(Class.grade == exam.grade, Student.status == ENROLLED_STATUS)
+    ).tuples().all()
+
+
+def save_marks(session, exam, class_id, subject_id, entries, entered_by=None):
+    """Replace one class's marks in one paper with a single batched insert, then update the results.
+
+    Each entry names a student by student_id or roll_number and gives
+    marks, or absent. Raises ValueError, naming every bad entry, before
+    anything is written. Nothing is committed here.
+    """
+    maxima = papers(session, exam.id)
+    if subject_id not in maxima:
+        raise ValueError(f"Subject {subject_id} is not a paper of this exam")
+    if session.execute(select(Class.grade).where(Class.id == class_id)).scalar() != exam.grade:
+        raise ValueError(f"Class {class_id} is not in grade {exam.grade}")
+
+    roster = session.execute(
+        select(Student.id, Student.roll_number).where(Student.class_id == class_id, Student.status == ENROLLED_STATUS)
+    ).tuples().all()
+    ids = {student_id for student_id, _ in roster}
+    by_roll = {roll_number: student_id for student_id, roll_number in roster if roll_number is not None}
+
+    rows, errors, seen = [], [], set()
+    for position, entry in enumerate(entries):
+        student_id = entry.get("student_id")
+        if student_id is None:
+            student_id = by_roll.get(entry.get("roll_number"))
+        if student_id not in ids:
+            errors.append(f"entry {position + 1}: not a student of class {class_id}")
+            continue
+        if student_id in seen:
+            errors.append(f"entry {position + 1}: student {student_id} is listed twice")
+            continue
+        seen.add(student_id)
+        marks = entry.get("marks")
+        if entry.get("absent"):
+            marks = None
+        elif marks is None:
+            errors.append(f"entry {position + 1}: give marks or mark the student absent")
+            continue
+        elif not 0 <= marks <= maxima[subject_id]:
+            errors.append(f"entry {position + 1}: marks must be between 0 and {maxima[subject_id]:g}")
+            continue
+        rows.append({"exam_id": exam.id, "student_id": student_id, "subject_id": subject_id,
+                     "marks": marks, "entered_by": entered_by, "updated_at": datetime.utcnow()})
+    if errors:
+        raise ValueError("; ".join(errors))
+
+    connection = session.connection()
+    connection.execute(delete(Mark).where(
+        Mark.exam_id == exam.id, Mark.subject_id == subject_id, Mark.student_id.in_(sorted(seen))
+    ))
+    if rows:
+        connection.execute(insert(Mark), rows)
+    return {"saved": len(rows), "results_updated": refresh_results(session, exam.id, seen)}
+
+
+def missing_marks(session, exam):
+    """Papers per class still missing marks for some active students"""
+    roster = grade_roster(session, exam)
+    enrolled = {}
+    for _, class_id, _ in roster:
+        enrolled[class_id] = enrolled.get(class_id, 0) + 1
+    entered = {
+        (class_id, subject_id): count for class_id, subject_id, count in session.execute(
+            select(Student.class_id, Mark.subject_id, func.count())
+            .join(Student, Student.id == Mark.student_id)
+            .where(Mark.exam_id == exam.id, Student.status == ENROLLED_STATUS)
+            .group_by(Student.class_id, Mark.subject_id)
+        ).tuples()
+    }
+    return [
+        {"class_id": class_id, "subject_id": subject_id, "missing": count - entered.get((class_id, subject_id), 0)}
+        for class_id, count in sorted(enrolled.items())
+        for subject_id in papers(session, exam.id)
+        if count > entered.get((class_id, subject_id), 0)
+    ]
+
+
+def publish(session, exam, force=False):
+    """Rebuild the exam's results and mark it published; refused while marks are missing unless forced"""
+    missing = missing_marks(session, exam)
+    if missing and not force:
+        return {"published": False, "missing": missing}
+    written = refresh_results(session, exam.id)
+    exam.status = 'published'
+    exam.published_at = datetime.utcnow()
+    return {"published": True, "missing": missing, "results": written}
+
+
+def results(session, exam_id, class_id=None):
+    """The cached result table, best first"""
+    statement = (
+        select(ExamResult, Student.name, Student.admission_number, Student.roll_number)
+        .join(Student, Student.id == ExamResult.student_id)
+        .where(ExamResult.exam_id == exam_id)
+        .order_by(ExamResult.rank, Student.name)
+    )
+    if class_id is not None:
+        statement = statement.where(ExamResult.class_id == class_id)
+    return [
+        {**{column: getattr(result, column) for column in ('student_id',) + SCORE_COLUMNS + STANDING_COLUMNS},
+         "name": name, "admission_number": admission_number, "roll_number": roll_number}
+        for result, name, admission_number, roll_number in session.execute(statement)
+    ]
+
+
+def report_card(session, exam_id, student_id):
+    """One student's result with their marks and grade in every paper"""
+    result = session.get(ExamResult, {**tenant_identity(), "exam_id": exam_id, "student_id": student_id})
+    settings = get_settings()
+    rows = session.execute(
+        select(ExamSubject.subject_id, Subject.name, Subject.code, ExamSubject.max_marks, Mark.marks)
+        .join(Subject, Subject.id == ExamSubject.subject_id)
+        .outerjoin(Mark, (Mark.exam_id == ExamSubject.exam_id) & (Mark.subject_id == ExamSubject.subject_id)
+                   & (Mark.student_id == student_id))
+        .where(ExamSubject.exam_id == exam_id)
+        .order_by(Subject.name)
+    ).tuples().all()
+    return {
+        "result": {column: getattr(result, column) for column in SCORE_COLUMNS + STANDING_COLUMNS} if result else None,
+        "subjects": [
+            {"subject_id": subject_id, "name": name, "code": code, "max_marks": max_marks, "marks": marks,
+             "grade": settings.grade_for(float(marks) * 100 / float(max_marks)) if marks is not None and max_marks else None}
+            for subject_id, name, code, max_marks, marks in rows
+        ]
+    }
+
@@ -0,0 +1,25 @@
+import threading
+
+_subscribers = []
+_lock = threading.Lock()
+
+
+def subscribe(callback):
+    """Register callback(tables) to hear about writes that bypass the ORM flush hooks"""
+    with _lock:
+        _subscribers.append(callback)
+    return callback
+
+
+def publish(tables):
+    """Tell every in-process cache that rows in these tables changed"""
+    tables = set(tables or ())
+    if not tables:
+        return
+    with _lock:
+        subscribers = list(_subscribers)
+    for callback in subscribers:
+        try:
+            callback(tables)
+        except Exception as e:
+            print(f"❌ Cache invalidation failed in {callback.__name__}: {e}")
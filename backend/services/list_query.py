@@ -0,0 +1,123 @@
+import base64
+import json
+from datetime import datetime
+from typing import Optional
+from fastapi import HTTPException, Query
+from sqlalchemy import and_, func, or_, select
+from services.projection import Projection
+
+DEFAULT_LIMIT = 50
+MAX_LIMIT = 200
+
+
+class ListParams:
+    """Query-string parameters shared by every paginated list endpoint"""
+
+    def __init__(
+        self,
+        limit: int = Query(DEFAULT_LIMIT, ge=1, le=MAX_LIMIT),
+        cursor: Optional[str] = None,
+        fields: Optional[str] = None,
+        include_total: bool = False
+    ):
+        self.limit = limit
+        self.cursor = cursor
+        self.fields = [field.strip() for field in fields.split(',') if field.strip()] if fields else None
+        self.include_total = include_total
+
+
+def encode_cursor(created_at, row_id):
+    raw = json.dumps([created_at.isoformat() if created_at else None, row_id])
+    return base64.urlsafe_b64encode(raw.encode()).decode().rstrip('=')
+
+
+def decode_cursor(cursor):
+    try:
+        padded = cursor + '=' * (-len(cursor) % 4)
+        created_at, row_id = json.loads(base64.urlsafe_b64decode(padded))
+        return (datetime.fromisoformat(created_at) if created_at else None), int(row_id)
+    except (ValueError, TypeError):
+        raise HTTPException(status_code=400, detail="Invalid cursor")
+
+
+class ListResource:
+    """A projection plus the filters and keyset columns used to page through it.
+
+    `filters` maps filter names to (column, type), or to (function, type)
+    where the function builds the WHERE clause from the cast value.
+    """
+
+    def __init__(self, projection: Projection, filters, id_column, created_at_column):
+        self.projection = projection
+        self.filters = filters
+        self.id_column = id_column
+        self.created_at_column = created_at_column
+
+    def apply_filters(self, statement, values):
+        for name, value in values.items():
+            if value is None:
+                continue
+            if name not in self.filters:
+                raise HTTPException(status_code=400, detail=f"Unknown filter: {name}")
+            column, cast = self.filters[name]
+            try:
+                value = cast(value)
+            except (TypeError, ValueError):
+                raise HTTPException(status_code=400, detail=f"Invalid value for {name}")
+            statement = statement.where(column(value) if callable(column) else column == value)
+        return statement
+
+
+def page_statements(resource: ListResource, params: ListParams, filters=None):
+    """Build the page query (newest first on (created_at, id)) and the optional count query"""
+    projection = resource.projection
+    columns = projection.columns(params.fields)
+    keyset = [resource.created_at_column.label('_created_at'), resource.id_column.label('_id')]
+    statement = resource.apply_filters(projection.select(columns + keyset), filters or {})
+
+    count_statement = None
+    if params.include_total:
+        # Counted only on request, from the filtered statement without ordering or limit
+        counted = resource.apply_filters(projection.select([resource.id_column]), filters or {})
+        count_statement = select(func.count()).select_from(counted.subquery())
+
+    if params.cursor:
+        created_at, row_id = decode_cursor(params.cursor)
+        statement = statement.where(or_(
+            resource.created_at_column < created_at,
+            and_(resource.created_at_column == created_at, resource.id_column < row_id)
+        ))
+
+    statement = statement.order_by(
+        resource.created_at_column.desc(), resource.id_column.desc()
+    ).limit(params.limit + 1)
+    return statement, count_statement, [column.key for column in columns]
+
+
+def page_response(rows, names, params: ListParams, total=None):
+    has_more = len(rows) > params.limit
+    rows = rows[:params.limit]
+
+    data = [dict(zip(names, row)) for row in rows]
+    next_cursor = encode_cursor(rows[-1][-2], rows[-1][-1]) if has_more else None
+
+    pagination = {"limit": params.limit, "next_cursor": next_cursor, "has_more": has_more}
+    if total is not None:
+        pagination["total"] = total
+    return {"success": True, "data": data, "pagination": pagination}
+
+
+async def paginate(db, resource: ListResource, params: ListParams, filters=None):
+    """Run a keyset-paginated list query on an AsyncSession"""
+    statement, count_statement, names = page_statements(resource, params, filters)
+    total = (await db.execute(count_statement)).scalar() if count_statement is not None else None
+    rows = (await db.execute(statement)).all()
+    return page_response(rows, names, params, total)
+
+
+def paginate_sync(db, resource: ListResource, params: ListParams, filters=None):
+    """Same as paginate() for a sync Session"""
+    statement, count_statement, names = page_statements(resource, params, filters)
+    total = db.execute(count_statement).scalar() if count_statement is not None else None
+    rows = db.execute(statement).all()
+    return page_response(rows, names, params, total)
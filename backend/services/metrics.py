@@ -0,0 +1,251 @@
+import contextvars
+import os
+import re
+import threading
+import time
+from collections import OrderedDict
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+from config.pools import pool_stats
+
+METRICS_ENABLED = os.getenv("METRICS_ENABLED", "true").lower() == "true"
+SLOW_QUERY_MS = float(os.getenv("SLOW_QUERY_MS", "200"))
+SLOW_QUERY_LOG_SIZE = int(os.getenv("SLOW_QUERY_LOG_SIZE", "100"))
+
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10)
+QUERY_BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 5)
+COUNT_BUCKETS = (0, 1, 2, 3, 5, 10, 25, 50, 100)
+
+
+def _labels(names, values, extra=None):
+    pairs = list(zip(names, values)) + ([extra] if extra else [])
+    if not pairs:
+        return ""
+    escaped = (str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n") for _, value in pairs)
+    return "{" + ",".join(f'{name}="{value}"' for (name, _), value in zip(pairs, escaped)) + "}"
+
+
+class Counter:
+    def __init__(self, name, help, labels=()):
+        self.name = name
+        self.help = help
+        self.labels = labels
+        self.values = {}
+        self.lock = threading.Lock()
+
+    def inc(self, *label_values, amount=1):
+        with self.lock:
+            self.values[label_values] = self.values.get(label_values, 0) + amount
+
+    def render(self):
+        lines = [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} counter"]
+        with self.lock:
+            values = sorted(self.values.items())
+        lines += [f"{self.name}{_labels(self.labels, key)} {value}" for key, value in values]
+        return lines
+
+
+class Histogram:
+    """Cumulative-bucket histogram per label set, rendered the way Prometheus expects"""
+
+    def __init__(self, name, help, labels=(), buckets=LATENCY_BUCKETS):
+        self.name = name
+        self.help = help
+        self.labels = labels
+        self.buckets = tuple(buckets)
+        self.series = {}  # label values -> [bucket counts..., sum, count]
+        self.lock = threading.Lock()
+
+    def observe(self, value, *label_values):
+        with self.lock:
+            series = self.series.get(label_values)
+            if series is None:
+                series = self.series[label_values] = [0] * (len(self.buckets) + 2)
+            for position, bound in enumerate(self.buckets):
+                if value <= bound:
+                    series[position] += 1
+                    break
+            series[-2] += value
+            series[-1] += 1
+
+    def render(self):
+        lines = [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} histogram"]
+        with self.lock:
+            series = sorted((key, list(values)) for key, values in self.series.items())
+        for key, values in series:
+            cumulative = 0
+            for bound, count in zip(self.buckets, values):
+                cumulative += count
+                lines.append(f"{self.name}_bucket{_labels(self.labels, key, ('le', bound))} {cumulative}")
+            lines.append(f"{self.name}_bucket{_labels(self.labels, key, ('le', '+Inf'))} {values[-1]}")
+            lines.append(f"{self.name}_sum{_labels(self.labels, key)} {round(values[-2], 6)}")
+            lines.append(f"{self.name}_count{_labels(self.labels, key)} {values[-1]}")
+        return lines
+
+
+class Registry:
+    def __init__(self):
+        self.metrics = []
+        self.collectors = []
+
+    def counter(self, name, help, labels=()):
+        metric = Counter(name, help, labels)
+        self.metrics.append(metric)
+        return metric
+
+    def histogram(self, name, help, labels=(), buckets=LATENCY_BUCKETS):
+        metric = Histogram(name, help, labels, buckets)
+        self.metrics.append(metric)
+        return metric
+
+    def collector(self, func):
+        """Register func() -> exposition lines, called on every scrape for point-in-time gauges"""
+        self.collectors.append(func)
+        return func
+
+    def render(self):
+        lines = []
+        for metric in self.metrics:
+            lines += metric.render()
+        for collect in self.collectors:
+            try:
+                lines += collect()
+            except Exception as e:
+                print(f"❌ Metrics collector {collect.__name__} failed: {e}")
+        return "\n".join(lines) + "\n"
+
+
+registry = Registry()
+
+http_requests = registry.counter(
+    "learnroot_http_requests_total", "HTTP requests by route template and status", ("method", "route", "status"))
+http_latency = registry.histogram(
+    "learnroot_http_request_duration_seconds", "Request latency by route template", ("method", "route"))
+http_db_time = registry.histogram(
+    "learnroot_http_request_db_seconds", "Database time spent per request", ("method", "route"), QUERY_BUCKETS)
+http_db_queries = registry.histogram(
+    "learnroot_http_request_db_queries", "Queries issued per request", ("method", "route"), COUNT_BUCKETS)
+http_exceptions = registry.counter(
+    "learnroot_http_exceptions_total", "Unhandled exceptions by route template", ("route", "exception"))
+db_queries = registry.counter("learnroot_db_queries_total", "Statements executed on any engine", ("engine",))
+db_latency = registry.histogram(
+    "learnroot_db_query_duration_seconds", "Statement execution time", ("engine",), QUERY_BUCKETS)
+db_slow_queries = registry.counter(
+    "learnroot_db_slow_queries_total", f"Statements slower than SLOW_QUERY_MS ({SLOW_QUERY_MS:g} ms)", ("engine",))
+
+
+class RequestStats:
+    """Database work attributed to the request running in the current context"""
+
+    __slots__ = ("scope", "queries", "db_seconds")
+
+    def __init__(self, scope=None):
+        self.scope = scope
+        self.queries = 0
+        self.db_seconds = 0.0
+
+    @property
+    def route(self):
+        """Matched route template, once the router has run"""
+        route = self.scope.get("route") if self.scope is not None else None
+        return getattr(route, "path", None)
+
+
+# Copied into threadpool calls and greenlets, so sync and async sessions both report here
+current_request = contextvars.ContextVar("current_request", default=None)
+
+
+_LITERALS = re.compile(r"'(?:[^']|'')*'|\b\d+(?:\.\d+)?\b")
+_PLACEHOLDER_LISTS = re.compile(r"\(\s*(?:\?|%s|%\(\w+\)s|:\w+)(?:\s*,\s*(?:\?|%s|%\(\w+\)s|:\w+))+\s*\)")
+_WHITESPACE = re.compile(r"\s+")
+
+
+def normalize_sql(statement):
+    """Statement shape with literals and IN-list lengths erased, for grouping slow queries"""
+    statement = _LITERALS.sub("?", statement)
+    statement = _PLACEHOLDER_LISTS.sub("(...)", statement)
+    return _WHITESPACE.sub(" ", statement).strip()
+
+
+class SlowQueryLog:
+    """Most recently seen slow statement shapes with their counts and timings"""
+
+    def __init__(self, maxsize=SLOW_QUERY_LOG_SIZE):
+        self.maxsize = maxsize
+        self.entries = OrderedDict()
+        self.lock = threading.Lock()
+
+    def record(self, statement, seconds, engine, route):
+        sql = normalize_sql(statement)
+        with self.lock:
+            entry = self.entries.pop(sql, None) or {
+                "sql": sql, "engine": engine, "count": 0, "total_ms": 0.0, "max_ms": 0.0, "routes": []
+            }
+            entry["count"] += 1
+            entry["total_ms"] += seconds * 1000
+            entry["max_ms"] = max(entry["max_ms"], seconds * 1000)
+            entry["last_seen"] = time.time()
+            if route and route not in entry["routes"] and len(entry["routes"]) < 10:
+                entry["routes"].append(route)
+            self.entries[sql] = entry
+            while len(self.entries) > self.maxsize:
+                self.entries.popitem(last=False)
+        return sql
+
+    def snapshot(self):
+        with self.lock:
+            entries = [dict(entry, routes=list(entry["routes"])) for entry in self.entries.values()]
+        for entry in entries:
+            entry["avg_ms"] = round(entry["total_ms"] / entry["count"], 3)
+            entry["total_ms"] = round(entry["total_ms"], 3)
+            entry["max_ms"] = round(entry["max_ms"], 3)
+        return sorted(entries, key=lambda entry: -entry["total_ms"])
+
+
+slow_queries = SlowQueryLog()
+
+
+@event.listens_for(Engine, "before_cursor_execute")
+def _before_execute(connection, cursor, statement, parameters, context, executemany):
+    connection.info.setdefault("query_started", []).append(time.perf_counter())
+
+
+@event.listens_for(Engine, "after_cursor_execute")
+def _after_execute(connection, cursor, statement, parameters, context, executemany):
+    started = connection.info.get("query_started")
+    if not started:
+        return
+    elapsed = time.perf_counter() - started.pop()
+    engine = getattr(connection.engine.pool, "metrics", None)
+    engine = engine.name if engine is not None else connection.engine.url.get_backend_name()
+    db_queries.inc(engine)
+    db_latency.observe(elapsed, engine)
+
+    stats = current_request.get()
+    if stats is not None:
+        stats.queries += 1
+        stats.db_seconds += elapsed
+    if elapsed * 1000 >= SLOW_QUERY_MS:
+        db_slow_queries.inc(engine)
+        route = stats.route if stats is not None else None
+        sql = slow_queries.record(statement, elapsed, engine, route)
+        print(f"🐢 Slow query ({elapsed * 1000:.1f} ms, {route or 'no request'}): {sql[:300]}")
+
+
+@registry.collector
+def _pool_gauges():
+    names = {
+        "size": ("gauge", "Configured pool size"),
+        "checked_out": ("gauge", "Connections currently checked out"),
+        "overflow": ("gauge", "Overflow connections currently open"),
+        "checkouts": ("counter", "Successful checkouts"),
+        "timeouts": ("counter", "Checkouts that timed out waiting for a connection"),
+        "wait_seconds_total": ("counter", "Time spent waiting for connections")
+    }
+    stats = pool_stats()
+    lines = []
+    for key, (kind, help) in names.items():
+        name = f"learnroot_db_pool_{key}" + ("_total" if kind == "counter" and not key.endswith("_total") else "")
+        lines += [f"# HELP {name} {help}", f"# TYPE {name} {kind}"]
+        lines += [f"{name}{_labels(('pool',), (pool,))} {values[key]}" for pool, values in sorted(stats.items())]
+    return lines
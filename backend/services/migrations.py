@@ -0,0 +1,277 @@
+import hashlib
+import json
+import os
+import time
+from sqlalchemy import UniqueConstraint, inspect, select, text
+from sqlalchemy.exc import DBAPIError
+from sqlalchemy.orm import Session
+from config.database import (
+    Base, SchemaMigration, School, engine, Event, Student, Teacher, Announcement,
+    EnrollmentRollup, TeacherSubject, AnnouncementFeed, Attendance, AttendanceRoster, AttendanceRosterMember,
+    Exam, ExamSubject, Mark, ExamResult
+)
+from config.tenancy import SHARED_SCHEMA, tenant_scope
+
+# Lets a development server apply pending migrations itself instead of refusing to start
+AUTO_MIGRATE = os.getenv("DB_AUTO_MIGRATE", "false").lower() == "true"
+LOCK_NAME = "learnroot_migrations"
+LOCK_TIMEOUT = 300  # seconds a second migrator waits for the first
+
+
+class SchemaOutOfDate(RuntimeError):
+    pass
+
+
+class Migration:
+    def __init__(self, version, name, upgrade):
+        self.version = version
+        self.name = name
+        self.upgrade = upgrade  # upgrade(connection), inside the migration's transaction
+
+
+MIGRATIONS = []
+
+
+def migration(version, name):
+    """Register an upgrade step. Steps must be idempotent: on a fresh database
+    the initial schema already creates every table in its latest shape."""
+    def register(func):
+        MIGRATIONS.append(Migration(version, name, func))
+        MIGRATIONS.sort(key=lambda step: step.version)
+        return func
+    return register
+
+
+def schema_fingerprint(metadata=Base.metadata):
+    """Hash of every table, column, index and unique constraint the models declare"""
+    tables = []
+    for table in sorted(metadata.tables.values(), key=lambda table: table.name):
+        tables.append([
+            table.name,
+            [[column.name, repr(column.type), column.nullable, column.primary_key,
+              sorted(key.target_fullname for key in column.foreign_keys)] for column in table.columns],
+            sorted([index.name, [column.name for column in index.columns], bool(index.unique)] for index in table.indexes),
+            sorted([constraint.name or "", [column.name for column in constraint.columns]]
+                   for constraint in table.constraints if isinstance(constraint, UniqueConstraint))
+        ])
+    return hashlib.sha256(json.dumps(tables, default=str).encode()).hexdigest()
+
+
+FINGERPRINT = schema_fingerprint()
+
+
+def latest_version():
+    return MIGRATIONS[-1].version if MIGRATIONS else 0
+
+
+def add_missing_columns(connection, model, names):
+    """ALTER TABLE ... ADD COLUMN for any of `names` the table lacks; returns those added"""
+    existing = {column["name"] for column in inspect(connection).get_columns(model.__tablename__)}
+    added = []
+    for name in names:
+        if name in existing:
+            continue
+        column = model.__table__.c[name]
+        definition = column.type.compile(connection.dialect)
+        if not column.nullable:
+            definition += f" NOT NULL DEFAULT {column.default.arg!r}"
+        connection.execute(text(f"ALTER TABLE {model.__tablename__} ADD COLUMN {name} {definition}"))
+        added.append(name)
+    return added
+
+
+def create_missing_indexes(connection, tables=None):
+    """Create declared indexes the database lacks; returns their names"""
+    inspector = inspect(connection)
+    created = []
+    for table in tables or Base.metadata.sorted_tables:
+        existing = {index["name"] for index in inspector.get_indexes(table.name)}
+        for index in sorted(table.indexes, key=lambda index: index.name):
+            if index.name not in existing:
+                index.create(connection)
+                created.append(index.name)
+    return created
+
+
+def tenant_ids(connection):
+    """Schools a data migration visits one at a time: each of them under the shared schema"""
+    if not SHARED_SCHEMA:
+        return [None]
+    return connection.execute(select(School.id).order_by(School.id)).scalars().all()
+
+
+def is_empty(connection, model):
+    return connection.execute(select(text("1")).select_from(model.__table__).limit(1)).first() is None
+
+
+@migration(1, "initial_schema")
+def initial_schema(connection):
+    Base.metadata.create_all(connection)
+
+
+@migration(2, "event_calendar_columns")
+def event_calendar_columns(connection):
+    from services.event_calendar import backfill
+    added = add_missing_columns(connection, Event, ("recurrence_rule", "span_days", "last_date"))
+    create_missing_indexes(connection, [Event.__table__])
+    if added:
+        # Joins the migration's transaction; backfill's commit only ends its savepoint
+        backfill(Session(bind=connection, join_transaction_mode="create_savepoint"))
+
+
+@migration(3, "declared_indexes")
+def declared_indexes(connection):
+    created = create_missing_indexes(connection)
+    if created:
+        print(f"   created {', '.join(created)}")
+
+
+@migration(4, "derived_tables")
+def derived_tables(connection):
+    """Fill rollups, associations and the feed for data written before those tables existed"""
+    from services import associations, feed, rollups
+    for school_id in tenant_ids(connection):
+        with tenant_scope(school_id):
+            session = Session(bind=connection, join_transaction_mode="create_savepoint")
+            if is_empty(connection, EnrollmentRollup) and not is_empty(connection, Student):
+                rollups.rebuild(session)
+            if is_empty(connection, TeacherSubject) and not is_empty(connection, Teacher):
+                associations.migrate(session)
+            if is_empty(connection, AnnouncementFeed) and not is_empty(connection, Announcement):
+                feed.rebuild(session)
+
+
+@migration(5, "school_registry")
+def school_registry(connection):
+    """Registry the tenant middleware checks; single-school deployments leave it empty"""
+    School.__table__.create(connection, checkfirst=True)
+
+
+@migration(6, "student_updated_at_index")
+def student_updated_at_index(connection):
+    create_missing_indexes(connection, [Student.__table__])
+
+
+@migration(7, "attendance")
+def attendance(connection):
+    Attendance.__table__.create(connection, checkfirst=True)
+
+
+@migration(8, "gradebook")
+def gradebook(connection):
+    for model in (Exam, ExamSubject, Mark, ExamResult):
+        model.__table__.create(connection, checkfirst=True)
+
+
+@migration(9, "attendance_rosters")
+def attendance_rosters(connection):
+    """Days marked before this keep a NULL roster and are read against the current one"""
+    for model in (AttendanceRoster, AttendanceRosterMember):
+        model.__table__.create(connection, checkfirst=True)
+    add_missing_columns(connection, Attendance, ("roster_id",))
+
+
+def _lock(connection):
+    if connection.dialect.name == "mysql":
+        acquired = connection.execute(text("SELECT GET_LOCK(:name, :timeout)"),
+                                      {"name": LOCK_NAME, "timeout": LOCK_TIMEOUT}).scalar()
+        if acquired != 1:
+            raise RuntimeError("Another migration is still running")
+        connection.commit()
+
+
+def _unlock(connection):
+    if connection.dialect.name == "mysql":
+        connection.execute(text("SELECT RELEASE_LOCK(:name)"), {"name": LOCK_NAME})
+        connection.commit()
+
+
+def applied_migrations(connection):
+    if not inspect(connection).has_table(SchemaMigration.__tablename__):
+        return []
+    return connection.execute(
+        select(SchemaMigration.version, SchemaMigration.name, SchemaMigration.fingerprint, SchemaMigration.applied_at)
+        .order_by(SchemaMigration.version)
+    ).all()
+
+
+def migrate(bind=engine):
+    """Apply pending migrations in order, one transaction each; returns the names applied.
+
+    On MySQL an advisory lock serializes concurrent deploys, and DDL commits
+    implicitly, which is why every step has to be safe to re-run.
+    """
+    applied = []
+    with bind.connect() as connection:
+        _lock(connection)
+        try:
+            SchemaMigration.__table__.create(connection, checkfirst=True)
+            connection.commit()
+            done = {row.version for row in applied_migrations(connection)}
+            for step in MIGRATIONS:
+                if step.version in done:
+                    continue
+                print(f"⬆️  Migration {step.version}: {step.name}")
+                started = time.perf_counter()
+                step.upgrade(connection)
+                connection.execute(SchemaMigration.__table__.insert().values(
+                    version=step.version, name=step.name, fingerprint=FINGERPRINT,
+                    duration_ms=int((time.perf_counter() - started) * 1000)
+                ))
+                connection.commit()
+                applied.append(step.name)
+        finally:
+            connection.rollback()
+            _unlock(connection)
+    return applied
+
+
+def require_schema(bind=engine):
+    """check_schema for scripts: raise SchemaOutOfDate unless every migration has been applied.
+
+    Scripts never create tables themselves; anything created outside a
+    migration would be missing from schema_migrations.
+    """
+    with bind.connect() as connection:
+        applied = applied_migrations(connection)
+    current = applied[-1].version if applied else None
+    if current is None or current < latest_version():
+        raise SchemaOutOfDate(
+            f"Database schema is at version {current or 'none'}, code needs {latest_version()}; "
+            f"run python -m scripts.migrate first"
+        )
+
+
+async def check_schema(db):
+    """The one query a worker runs at startup: is the database at this code's schema version?
+
+    Raises SchemaOutOfDate when migrations are pending (or the table is
+    missing), unless DB_AUTO_MIGRATE applies them here. A newer database
+    is accepted, since rolling deploys migrate before old workers stop.
+    """
+    try:
+        row = (await db.execute(
+            select(SchemaMigration.version, SchemaMigration.fingerprint)
+            .order_by(SchemaMigration.version.desc()).limit(1)
+        )).first()
+    except DBAPIError as e:
+        await db.rollback()
+        row = None
+        error = e
+    else:
+        error = None
+
+    if row is None or row.version < latest_version():
+        if AUTO_MIGRATE:
+            from starlette.concurrency import run_in_threadpool
+            await run_in_threadpool(migrate)
+            return {"version": latest_version(), "fingerprint": FINGERPRINT, "migrated": True}
+        current = row.version if row is not None else "none"
+        raise SchemaOutOfDate(
+            f"Database schema is at version {current}, code needs {latest_version()}; "
+            f"run python -m scripts.migrate" + (f" ({error.orig})" if error is not None else "")
+        ) from error
+
+    if row.version == latest_version() and row.fingerprint != FINGERPRINT:
+        print("⚠️  Models differ from the schema the last migration was applied with; add a migration")
+    return {"version": row.version, "fingerprint": row.fingerprint, "migrated": False}
@@ -0,0 +1,193 @@
+import asyncio
+import os
+import threading
+import time
+from concurrent.futures import ProcessPoolExecutor
+from passlib.context import CryptContext
+from starlette.concurrency import run_in_threadpool
+from services.metrics import registry
+
+pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
+
+HASH_WORKERS = int(os.getenv("HASH_WORKERS", str(os.cpu_count() or 2)))
+HASH_MAX_PENDING = int(os.getenv("HASH_MAX_PENDING", "256"))
+HASH_QUEUE_TIMEOUT = float(os.getenv("HASH_QUEUE_TIMEOUT", "5"))  # seconds to wait for a queue slot
+
+
+hash_latency = registry.histogram(
+    "learnroot_password_hash_seconds", "bcrypt hash/verify time from submission to result, including queueing",
+    ("operation",), (0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10))
+hash_slot_wait = registry.histogram(
+    "learnroot_password_hash_slot_wait_seconds", "Time async callers waited for a hashing queue slot",
+    (), (0.001, 0.01, 0.1, 0.5, 1, 2.5, 5))
+hash_busy = registry.counter("learnroot_password_hash_busy_total", "Requests rejected because the hashing queue was full")
+
+OPERATIONS = {"_hash": "hash", "_verify": "verify"}
+
+
+class HashingBusyError(Exception):
+    """Raised when the hashing queue stays full for longer than HASH_QUEUE_TIMEOUT"""
+
+
+def _hash(password):
+    return pwd_context.hash(password)
+
+
+def _verify(password, hashed_password):
+    return pwd_context.verify(password, hashed_password)
+
+
+class PasswordHasher:
+    """Runs bcrypt on a dedicated process pool with a bounded number of queued jobs.
+
+    Callers block for a queue slot for at most `queue_timeout` seconds, which
+    pushes back on login/registration storms instead of growing an unbounded
+    backlog.
+    """
+
+    def __init__(self, workers=HASH_WORKERS, max_pending=HASH_MAX_PENDING, queue_timeout=HASH_QUEUE_TIMEOUT):
+        self.workers = workers
+        self.max_pending = max_pending
+        self.queue_timeout = queue_timeout
+        self.slots = threading.BoundedSemaphore(max_pending)
+        self.pool = None
+        self.pool_lock = threading.Lock()
+        self.pending = 0
+
+    def _get_pool(self):
+        with self.pool_lock:
+            if self.pool is None:
+                self.pool = ProcessPoolExecutor(max_workers=self.workers)
+            return self.pool
+
+    def _release(self, future):
+        with self.pool_lock:
+            self.pending -= 1
+        self.slots.release()
+
+    def submit(self, fn, *args, acquired=False):
+        if not acquired and not self.slots.acquire(timeout=self.queue_timeout):
+            hash_busy.inc()
+            raise HashingBusyError("Password hashing queue is full")
+        submitted = time.perf_counter()
+        try:
+            future = self._get_pool().submit(fn, *args)
+        except Exception:
+            self.slots.release()
+            raise
+        with self.pool_lock:
+            self.pending += 1
+        operation = OPERATIONS.get(fn.__name__, fn.__name__)
+        future.add_done_callback(lambda _: hash_latency.observe(time.perf_counter() - submitted, operation))
+        future.add_done_callback(self._release)
+        return future
+
+    def hash(self, password):
+        return self.submit(_hash, password).result()
+
+    def verify(self, password, hashed_password):
+        return self.submit(_verify, password, hashed_password).result()
+
+    def hash_many(self, passwords):
+        """Hash a batch in parallel; results come back in input order"""
+        futures = []
+        try:
+            for password in passwords:
+                futures.append(self.submit(_hash, password))
+            return [future.result() for future in futures]
+        except BaseException:
+            # Queued jobs give their slots back through the done callback as they are cancelled
+            for future in futures:
+                future.cancel()
+            raise
+
+    def _release_unwanted(self, waiter):
+        if not waiter.cancelled() and waiter.exception() is None and waiter.result():
+            self.slots.release()
+
+    async def submit_async(self, fn, *args):
+        # Only wait on a thread when the queue is full, so the event loop never blocks
+        acquired = self.slots.acquire(blocking=False)
+        if not acquired:
+            started = time.perf_counter()
+            waiter = asyncio.ensure_future(run_in_threadpool(self.slots.acquire, True, self.queue_timeout))
+            try:
+                acquired = await asyncio.shield(waiter)
+            except asyncio.CancelledError:
+                # The thread may still get a slot after the caller has gone; hand it straight back
+                waiter.add_done_callback(self._release_unwanted)
+                raise
+            hash_slot_wait.observe(time.perf_counter() - started)
+        if not acquired:
+            hash_busy.inc()
+            raise HashingBusyError("Password hashing queue is full")
+        return await asyncio.wrap_future(self.submit(fn, *args, acquired=True))
+
+    async def hash_async(self, password):
+        return await self.submit_async(_hash, password)
+
+    async def verify_async(self, password, hashed_password):
+        return await self.submit_async(_verify, password, hashed_password)
+
+    async def hash_many_async(self, passwords, window=None):
+        """Hash a batch with at most `window` of its jobs queued at once; results come back in input order.
+
+        The window defaults to twice the worker count, enough to keep the pool
+        busy, so a batch bigger than the queue never times out waiting behind
+        its own jobs and ties up at most `window` threads while the queue is
+        full. If a slot cannot be had in time, the batch's queued jobs are
+        cancelled and their slots freed before HashingBusyError propagates.
+        """
+        window = max(1, min(window or self.workers * 2, self.max_pending))
+        results = [None] * len(passwords)
+        running = {}
+        try:
+            for index, password in enumerate(passwords):
+                if len(running) >= window:
+                    done, _ = await asyncio.wait(running, return_when=asyncio.FIRST_COMPLETED)
+                    for task in done:
+                        results[running.pop(task)] = task.result()
+                running[asyncio.ensure_future(self.submit_async(_hash, password))] = index
+            while running:
+                done, _ = await asyncio.wait(running, return_when=asyncio.FIRST_COMPLETED)
+                for task in done:
+                    results[running.pop(task)] = task.result()
+        except BaseException:
+            for task in running:
+                task.cancel()
+            raise
+        return results
+
+    def shutdown(self):
+        with self.pool_lock:
+            pool, self.pool = self.pool, None
+        if pool is not None:
+            pool.shutdown(wait=False, cancel_futures=True)
+
+
+password_hasher = PasswordHasher()
+
+
+@registry.collector
+def _hasher_gauges():
+    return [
+        "# HELP learnroot_password_hash_pending Hash jobs queued or running",
+        "# TYPE learnroot_password_hash_pending gauge",
+        f"learnroot_password_hash_pending {password_hasher.pending}"
+    ]
+
+
+def get_password_hash(password):
+    return password_hasher.hash(password)
+
+
+def verify_password(plain_password, hashed_password):
+    return password_hasher.verify(plain_password, hashed_password)
+
+
+async def get_password_hash_async(password):
+    return await password_hasher.hash_async(password)
+
+
+async def verify_password_async(plain_password, hashed_password):
+    return await password_hasher.verify_async(plain_password, hashed_password)
@@ -0,0 +1,41 @@
+from fastapi import HTTPException
+from sqlalchemy import select
+
+
+class Projection:
+    """A named set of columns over one joined FROM clause.
+
+    Each resource declares its projection once; routes then fetch exactly
+    the fields they return in a single Core SELECT and get plain dicts back,
+    with no ORM identity map or lazy relationship loads involved.
+    """
+
+    def __init__(self, fields, from_clause=None, where=None, default_fields=None):
+        self.fields = fields
+        self.from_clause = from_clause
+        self.where = where or []
+        self.default_fields = default_fields or list(fields)
+
+    def columns(self, requested=None):
+        names = requested or self.default_fields
+        unknown = [name for name in names if name not in self.fields]
+        if unknown:
+            raise HTTPException(status_code=400, detail=f"Unknown fields: {', '.join(unknown)}")
+        return [self.fields[name].label(name) for name in names]
+
+    def select(self, columns):
+        statement = select(*columns)
+        if self.from_clause is not None:
+            statement = statement.select_from(self.from_clause)
+        return statement.where(*self.where)
+
+    def statement(self, requested=None):
+        return self.select(self.columns(requested))
+
+    async def fetch_one(self, db, *criteria, fields=None):
+        row = (await db.execute(self.statement(fields).where(*criteria).limit(1))).first()
+        return dict(row._mapping) if row is not None else None
+
+    async def fetch_all(self, db, *criteria, fields=None):
+        result = await db.execute(self.statement(fields).where(*criteria))
+        return [dict(row._mapping) for row in result]
@@ -0,0 +1,203 @@
+from datetime import datetime
+from sqlalchemy import Boolean, Column, Integer, MetaData, String, Table, case, func, select, text, update
+from config.database import Class, Student, Timetable
+from services import rollups
+from services.associations import grade_value, normalize
+from services.enrollment import ENROLLED_STATUS, recount
+from services.table_versions import bump
+
+# Grades in promotion order; a class moves to the same section one rung up
+LADDER = ('playgroup', 'pre-nursery', 'nursery', 'lkg', 'ukg') + tuple(str(grade) for grade in range(1, 13))
+# Students leaving from the top grade; the status enum has no 'graduated'
+LEAVING_STATUS = 'inactive'
+
+# Per-transaction map of source class to target class, joined into the students UPDATE
+PROMOTION_MAP = Table(
+    "promotion_map", MetaData(),
+    Column("class_id", Integer, primary_key=True, autoincrement=False),
+    Column("to_class_id", Integer),
+    Column("to_section", String(10)),
+    Column("leaving", Boolean, nullable=False),
+    prefixes=["TEMPORARY"]
+)
+
+
+def drop_promotion_map(connection):
+    """Drop this connection's temporary map, never a real table of the same name.
+
+    Table.drop would emit a plain DROP TABLE, which MySQL commits
+    implicitly; DROP TEMPORARY TABLE does not, so the promotion stays one
+    transaction.
+    """
+    if connection.dialect.name == "mysql":
+        connection.execute(text("DROP TEMPORARY TABLE IF EXISTS promotion_map"))
+    else:
+        connection.execute(text("DROP TABLE IF EXISTS temp.promotion_map"))
+
+
+def next_academic_year(academic_year):
+    first = int(academic_year[:4]) + 1
+    return f"{first}-{first + 1}"
+
+
+def grade_rank(grade):
+    """Position of a grade on the ladder, or None for a grade promotion cannot place"""
+    value = grade_value(grade)
+    return LADDER.index(value) if value in LADDER else None
+
+
+def build_plan(session, from_year, to_year, class_map=None, hold_back=(), lock=False):
+    """Where every class's active students go, with the enrollment each class ends up with.
+
+    Each class moves to the class one grade up with the same section (or
+    the only class of that grade); classes in the highest grade leave.
+    `class_map` overrides the target of any class: another class id, the
+    class's own id to keep its students, or None to have them leave.
+    Students in `hold_back` stay where they are. With `lock`, the classes
+    are locked FOR UPDATE so enrollments wait until the promotion commits.
+    """
+    class_map = class_map or {}
+    statement = select(Class.id, Class.name, Class.grade, Class.section, Class.max_students).order_by(Class.id)
+    classes = session.execute(statement.with_for_update() if lock else statement).all()
+    by_id = {class_.id: class_ for class_ in classes}
+
+    active = (Student.status == ENROLLED_STATUS, Student.class_id.is_not(None))
+    enrolled = dict(session.execute(
+        select(Student.class_id, func.count()).where(*active).group_by(Student.class_id)
+    ).tuples().all())
+    held = {}
+    if hold_back:
+        held = dict(session.execute(
+            select(Student.class_id, func.count()).where(*active, Student.id.in_(sorted(set(hold_back))))
+            .group_by(Student.class_id)
+        ).tuples().all())
+
+    rungs = {}
+    for class_ in classes:
+        rank = grade_rank(class_.grade)
+        if rank is not None:
+            rungs.setdefault(rank, []).append(class_)
+    top = max(rungs, default=None)
+
+    moves, unmapped = [], []
+    targets = {}
+    for class_ in classes:
+        if class_.id in class_map:
+            target = class_map[class_.id]
+            if target is not None and target not in by_id:
+                unmapped.append({"class_id": class_.id, "class_name": class_.name, "grade": class_.grade,
+                                 "students": enrolled.get(class_.id, 0), "reason": f"class_map target {target} does not exist"})
+                continue
+            targets[class_.id] = target
+            continue
+        rank = grade_rank(class_.grade)
+        if rank is None:
+            reason = f"grade '{class_.grade}' is not on the promotion ladder"
+        elif rank == top:
+            targets[class_.id] = None
+            continue
+        else:
+            candidates = rungs.get(rank + 1, [])
+            same_section = [c for c in candidates if normalize(c.section or '') == normalize(class_.section or '')]
+            if len(same_section) == 1 or len(candidates) == 1:
+                targets[class_.id] = (same_section or candidates)[0].id
+                continue
+            reason = f"no single class in grade {LADDER[rank + 1]} for section {class_.section}" if candidates \
+                else f"no class in grade {LADDER[rank + 1]}"
+        unmapped.append({"class_id": class_.id, "class_name": class_.name, "grade": class_.grade,
+                         "students": enrolled.get(class_.id, 0), "reason": reason})
+
+    after = dict(held)
+    for class_ in classes:
+        moving = enrolled.get(class_.id, 0) - held.get(class_.id, 0)
+        if class_.id not in targets:
+            after[class_.id] = after.get(class_.id, 0) + moving
+            continue
+        target = targets[class_.id]
+        if target is not None:
+            after[target] = after.get(target, 0) + moving
+        if moving or held.get(class_.id):
+            moves.append({
+                "class_id": class_.id, "class_name": class_.name, "grade": class_.grade,
+                "to_class_id": target, "to_class_name": by_id[target].name if target is not None else None,
+                "students": moving, "held_back": held.get(class_.id, 0)
+            })
+
+    capacity = [
+        {"class_id": class_.id, "class_name": class_.name, "max_students": class_.max_students,
+         "before": enrolled.get(class_.id, 0), "after": after.get(class_.id, 0)}
+        for class_ in classes
+    ]
+    over_capacity = [
+        item for item in capacity
+        if item["max_students"] is not None and item["after"] > item["max_students"] and item["after"] > item["before"]
+    ]
+    blocking = [item for item in unmapped if item["students"]]
+    timetable_entries = session.execute(
+        select(func.count()).select_from(Timetable).where(Timetable.academic_year == from_year)
+    ).scalar()
+
+    return {
+        "from_year": from_year,
+        "to_year": to_year,
+        "moves": moves,
+        "leaving": sum(move["students"] for move in moves if move["to_class_id"] is None),
+        "held_back": sum(held.values()),
+        "unmapped": unmapped,
+        "over_capacity": over_capacity,
+        "classes": capacity,
+        "timetable_entries": timetable_entries,
+        "ready": not blocking and not over_capacity
+    }
+
+
+def apply_plan(session, plan, hold_back=(), roll_timetable=True):
+    """Run a plan from build_plan as a handful of set-based statements in the caller's transaction.
+
+    The class moves go into a temporary table and every promoted student
+    moves in one UPDATE joined to it, so classes swapping students never
+    see each other's arrivals. Enrollment counters and the enrollment and
+    teacher-load rollups are then recomputed. Nothing is committed here.
+    """
+    connection = session.connection()
+    sections = {row.id: row.section for row in session.execute(select(Class.id, Class.section))}
+    rows = [
+        {"class_id": move["class_id"], "to_class_id": move["to_class_id"], "leaving": move["to_class_id"] is None,
+         "to_section": sections[move["to_class_id"]] if move["to_class_id"] is not None else None}
+        for move in plan["moves"] if move["to_class_id"] != move["class_id"] and move["students"]
+    ]
+    moved = 0
+    if rows:
+        drop_promotion_map(connection)
+        PROMOTION_MAP.create(connection)
+        try:
+            connection.execute(PROMOTION_MAP.insert(), rows)
+            statement = update(Student).where(
+                Student.class_id == PROMOTION_MAP.c.class_id, Student.status == ENROLLED_STATUS
+            ).values(
+                class_id=PROMOTION_MAP.c.to_class_id,
+                section=PROMOTION_MAP.c.to_section,
+                status=case((PROMOTION_MAP.c.leaving, LEAVING_STATUS), else_=Student.status),
+                updated_at=datetime.utcnow()
+            )
+            if hold_back:
+                statement = statement.where(Student.id.not_in(sorted(set(hold_back))))
+            moved = connection.execute(statement).rowcount
+        finally:
+            drop_promotion_map(connection)
+        rollups.refresh(session, Student)
+
+    rolled = 0
+    # Rolled in place rather than copied: unique_schedule is (class_id, day_of_week, period_number)
+    # without the year, so a copy would collide with the very rows it was copied from
+    if roll_timetable and plan["from_year"] != plan["to_year"]:
+        rolled = connection.execute(
+            update(Timetable).where(Timetable.academic_year == plan["from_year"])
+            .values(academic_year=plan["to_year"], updated_at=datetime.utcnow())
+        ).rowcount
+        if rolled:
+            rollups.refresh(session, Timetable)
+            bump(connection, {"timetable"})
+
+    recount(connection)
+    return {"students_moved": moved, "timetable_entries_rolled": rolled}
@@ -0,0 +1,20 @@
+from decimal import Decimal
+from fastapi.responses import JSONResponse
+import orjson
+
+
+def _default(value):
+    if isinstance(value, Decimal):
+        return int(value) if value == value.to_integral_value() else float(value)
+    raise TypeError
+
+
+class FastJSONResponse(JSONResponse):
+    """orjson-rendered response that handles date, time, datetime and Decimal natively.
+
+    Routes that return an instance directly also skip FastAPI's
+    jsonable_encoder pass over the payload.
+    """
+
+    def render(self, content) -> bytes:
+        return orjson.dumps(content, default=_default, option=orjson.OPT_NON_STR_KEYS)
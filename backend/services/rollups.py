@@ -0,0 +1,175 @@
+from sqlalchemy import event, delete, func, insert, inspect, select
+from sqlalchemy.dialects import mysql, postgresql, sqlite
+from sqlalchemy.orm import Session
+from config.database import (
+    Student, Teacher, Timetable, EnrollmentRollup, TeacherLoadRollup, StaffRollup
+)
+
+
+class Rollup:
+    """Row counts of one model per group, stored in a summary table.
+
+    `keys` maps each group column on the source model to the value stored
+    when the source column is NULL, so every group has a usable primary key.
+    """
+
+    def __init__(self, model, table, keys, count_column):
+        self.model = model
+        self.table = table.__table__
+        self.keys = keys
+        self.count_column = count_column
+
+    def key(self, values):
+        return tuple(
+            default if values.get(column) is None else values[column]
+            for column, default in self.keys.items()
+        )
+
+    def rows(self, deltas):
+        return [
+            {**dict(zip(self.keys, key)), self.count_column: delta}
+            for key, delta in deltas.items() if delta
+        ]
+
+    def rebuild_statement(self):
+        """INSERT ... SELECT recomputing every group from the source table"""
+        groups = [
+            func.coalesce(getattr(self.model, column), default)
+            for column, default in self.keys.items()
+        ]
+        source = select(*groups, func.count()).group_by(*groups)
+        return insert(self.table).from_select([*self.keys, self.count_column], source)
+
+
+ROLLUPS = {
+    Student: Rollup(
+        Student, EnrollmentRollup,
+        {'class_id': 0, 'gender': 'unknown', 'status': 'active'}, 'student_count'
+    ),
+    Timetable: Rollup(
+        Timetable, TeacherLoadRollup,
+        {'teacher_id': 0, 'academic_year': ''}, 'period_count'
+    ),
+    Teacher: Rollup(Teacher, StaffRollup, {'status': 'active'}, 'teacher_count')
+}
+
+
+def upsert_increment(connection, table, keys, count, rows):
+    """Add each row's `count` onto the row with the same `keys`, creating it if needed"""
+    if "school_id" in table.c and "school_id" not in keys:
+        # Shared-schema counters are per school; the column default fills it in
+        keys = ["school_id", *keys]
+    dialect = connection.dialect.name
+    if dialect == 'mysql':
+        statement = mysql.insert(table)
+        statement = statement.on_duplicate_key_update({count: table.c[count] + statement.inserted[count]})
+    elif dialect in ('sqlite', 'postgresql'):
+        statement = (sqlite if dialect == 'sqlite' else postgresql).insert(table)
+        statement = statement.on_conflict_do_update(
+            index_elements=list(keys),
+            set_={count: table.c[count] + statement.excluded[count]}
+        )
+    else:
+        raise NotImplementedError(f"Counters do not support the {dialect} dialect")
+    connection.execute(statement, rows)
+
+
+def apply_deltas(connection, rollup, deltas):
+    rows = rollup.rows(deltas)
+    if rows:
+        # Sorted so concurrent writers lock groups in the same order
+        rows.sort(key=lambda row: tuple(str(row[column]) for column in rollup.keys))
+        upsert_increment(connection, rollup.table, rollup.keys, rollup.count_column, rows)
+
+
+def committed_values(state, columns):
+    """Column values as they were before this flush"""
+    values = {}
+    for column in columns:
+        history = state.attrs[column].history
+        if history.deleted:
+            values[column] = history.deleted[0]
+        elif history.unchanged:
+            values[column] = history.unchanged[0]
+        else:
+            values[column] = state.dict.get(column)
+    return values
+
+
+@event.listens_for(Session, "after_flush")
+def _track_flush(session, flush_context):
+    deltas = {}
+
+    def add(rollup, key, delta):
+        groups = deltas.setdefault(rollup, {})
+        groups[key] = groups.get(key, 0) + delta
+
+    for obj in session.new:
+        rollup = ROLLUPS.get(type(obj))
+        if rollup is not None:
+            add(rollup, rollup.key(inspect(obj).dict), 1)
+
+    for obj in session.deleted:
+        rollup = ROLLUPS.get(type(obj))
+        if rollup is not None:
+            add(rollup, rollup.key(committed_values(inspect(obj), rollup.keys)), -1)
+
+    for obj in session.dirty:
+        rollup = ROLLUPS.get(type(obj))
+        if rollup is None:
+            continue
+        state = inspect(obj)
+        if not any(state.attrs[column].history.has_changes() for column in rollup.keys):
+            continue
+        old_key = rollup.key(committed_values(state, rollup.keys))
+        new_key = rollup.key(state.dict)
+        if old_key != new_key:
+            add(rollup, old_key, -1)
+            add(rollup, new_key, 1)
+
+    if deltas:
+        connection = session.connection()
+        for rollup, groups in deltas.items():
+            apply_deltas(connection, rollup, groups)
+
+
+def _load_old_value(target, value, oldvalue, initiator):
+    pass
+
+
+# Changing a group column must know the old group, even if it was never read
+for _rollup in ROLLUPS.values():
+    for _column in _rollup.keys:
+        event.listen(getattr(_rollup.model, _column), "set", _load_old_value, active_history=True)
+
+
+def record_rows(session, model, rows, sign=1):
+    """Count rows written with Core bulk statements, which skip the ORM flush hooks"""
+    rollup = ROLLUPS[model]
+    deltas = {}
+    for row in rows:
+        key = rollup.key(row)
+        deltas[key] = deltas.get(key, 0) + sign
+    apply_deltas(session.connection(), rollup, deltas)
+
+
+def reset_teacher_load(session, academic_year):
+    """Drop a year's load groups before its timetable is regenerated wholesale"""
+    session.execute(delete(TeacherLoadRollup).where(TeacherLoadRollup.academic_year == (academic_year or '')))
+
+
+def refresh(session, model):
+    """Recompute one model's rollup from its source table, inside the caller's transaction"""
+    rollup = ROLLUPS[model]
+    session.execute(delete(rollup.table))
+    session.execute(rollup.rebuild_statement())
+    return session.execute(select(func.count()).select_from(rollup.table)).scalar()
+
+
+def rebuild(session):
+    """Recompute every rollup from the source tables in one transaction"""
+    counts = {}
+    for model, rollup in ROLLUPS.items():
+        counts[rollup.table.name] = refresh(session, model)
+    session.commit()
+    return counts
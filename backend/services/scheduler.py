@@ -0,0 +1,261 @@
+import asyncio
+import os
+import time
+from datetime import datetime, timedelta
+from datetime import time as clock
+from sqlalchemy import and_, or_, select, text, update
+from starlette.concurrency import run_in_threadpool
+from config.database import engine, tenant_engines, Announcement, Event
+from config.tenancy import tenant_scope
+from services import enrollment, event_calendar, feed, rollups
+from services.invalidation import publish
+from services.schools import active_school_ids
+
+SCHEDULER_ENABLED = os.getenv("SCHEDULER_ENABLED", "true").lower() == "true"
+SCHEDULER_TICK = float(os.getenv("SCHEDULER_TICK", "30"))  # seconds between due-job checks
+LOCK_NAME = os.getenv("SCHEDULER_LOCK_NAME", "learnroot_scheduler")
+UPDATE_BATCH_SIZE = 1000
+
+
+class Job:
+    """A periodic task run by the leader.
+
+    `func(session, now)` runs in the threadpool on its own sync session,
+    once per school, and returns the tables it changed, which are published
+    as invalidations. Jobs run every `every` seconds or daily at `daily_at`, and once as soon
+    as this worker becomes leader if `run_on_start` is set.
+    """
+
+    def __init__(self, name, func, every=None, daily_at=None, run_on_start=True):
+        if (every is None) == (daily_at is None):
+            raise ValueError("A job needs exactly one of every= or daily_at=")
+        self.name = name
+        self.func = func
+        self.every = every
+        self.daily_at = daily_at
+        self.run_on_start = run_on_start
+        self.next_run = None
+        self.last_run = None
+        self.last_duration = None
+        self.last_error = None
+        self.runs = 0
+
+    def schedule_next(self, now):
+        if self.every is not None:
+            self.next_run = now + timedelta(seconds=self.every)
+        else:
+            candidate = datetime.combine(now.date(), self.daily_at)
+            self.next_run = candidate if candidate > now else candidate + timedelta(days=1)
+
+    def status(self):
+        return {
+            "name": self.name,
+            "every_seconds": self.every,
+            "daily_at": self.daily_at.isoformat() if self.daily_at else None,
+            "next_run": self.next_run.isoformat() if self.next_run else None,
+            "last_run": self.last_run.isoformat() if self.last_run else None,
+            "last_duration_seconds": round(self.last_duration, 4) if self.last_duration is not None else None,
+            "last_error": self.last_error,
+            "runs": self.runs
+        }
+
+
+class Scheduler:
+    """In-process asyncio scheduler; only the worker holding the advisory lock runs jobs.
+
+    On MySQL every worker tries GET_LOCK on a dedicated autocommit connection;
+    the lock is released when that connection closes, so a crashed leader is
+    replaced on the next tick. Other databases have no advisory locks and
+    every worker counts as leader, which is only correct for one worker.
+    """
+
+    def __init__(self, tick=SCHEDULER_TICK, lock_name=LOCK_NAME):
+        self.tick = tick
+        self.lock_name = lock_name
+        self.jobs = {}
+        self.task = None
+        self.lock_connection = None
+        self.is_leader = False
+
+    def register(self, name, func, **kwargs):
+        self.jobs[name] = Job(name, func, **kwargs)
+        return func
+
+    def job(self, name, **kwargs):
+        """Decorator form of register()"""
+        return lambda func: self.register(name, func, **kwargs)
+
+    async def start(self):
+        if self.task is None:
+            self.task = asyncio.create_task(self._loop())
+
+    async def stop(self):
+        if self.task is not None:
+            self.task.cancel()
+            try:
+                await self.task
+            except asyncio.CancelledError:
+                pass
+            self.task = None
+        await run_in_threadpool(self._release)
+
+    def _holds_lock(self):
+        if engine.dialect.name != "mysql":
+            return True
+        try:
+            if self.lock_connection is None:
+                self.lock_connection = engine.connect().execution_options(isolation_level="AUTOCOMMIT")
+            if self.is_leader:
+                # GET_LOCK is re-entrant, so re-check ownership instead of taking it again
+                holder = self.lock_connection.execute(
+                    text("SELECT IS_USED_LOCK(:name) = CONNECTION_ID()"), {"name": self.lock_name}
+                ).scalar()
+                return bool(holder)
+            acquired = self.lock_connection.execute(
+                text("SELECT GET_LOCK(:name, 0)"), {"name": self.lock_name}
+            ).scalar()
+            return acquired == 1
+        except Exception as e:
+            print(f"❌ Scheduler lock check failed: {e}")
+            self._close_lock_connection()
+            return False
+
+    def _close_lock_connection(self):
+        if self.lock_connection is not None:
+            try:
+                self.lock_connection.close()
+            except Exception:
+                pass
+            self.lock_connection = None
+
+    def _release(self):
+        if self.lock_connection is not None and self.is_leader:
+            try:
+                self.lock_connection.execute(text("SELECT RELEASE_LOCK(:name)"), {"name": self.lock_name})
+            except Exception:
+                pass
+        self._close_lock_connection()
+        self.is_leader = False
+
+    async def _loop(self):
+        while True:
+            try:
+                leader = await run_in_threadpool(self._holds_lock)
+                if leader and not self.is_leader:
+                    print(f"⏰ Scheduler: this worker is now leader ({len(self.jobs)} jobs)")
+                    now = datetime.now()
+                    for job in self.jobs.values():
+                        if job.run_on_start:
+                            job.next_run = now
+                        else:
+                            job.schedule_next(now)
+                self.is_leader = leader
+                if leader:
+                    await self.run_due()
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                print(f"❌ Scheduler tick failed: {e}")
+            await asyncio.sleep(self.tick)
+
+    async def run_due(self):
+        now = datetime.now()
+        for job in list(self.jobs.values()):
+            if job.next_run is not None and job.next_run <= now:
+                await self.run_job(job)
+
+    async def run_job(self, job):
+        started = time.perf_counter()
+        job.last_run = datetime.now()
+        try:
+            changed = await run_in_threadpool(_run_in_session, job.func, job.last_run)
+            job.last_error = None
+            publish(changed)
+        except Exception as e:
+            job.last_error = str(e)
+            print(f"❌ Scheduled job {job.name} failed: {e}")
+        job.runs += 1
+        job.last_duration = time.perf_counter() - started
+        job.schedule_next(datetime.now())
+
+    def status(self):
+        return {
+            "enabled": self.task is not None,
+            "leader": self.is_leader,
+            "jobs": [job.status() for job in self.jobs.values()]
+        }
+
+
+def _run_in_session(func, now):
+    changed = set()
+    failed = []
+    for school_id in active_school_ids():
+        with tenant_scope(school_id):
+            db = tenant_engines()[2]()
+            try:
+                changed.update(func(db, now) or ())
+                db.commit()
+            except Exception as e:
+                # One school's failure must not hold back the others
+                db.rollback()
+                failed.append(f"school {school_id}: {e}" if school_id is not None else str(e))
+            finally:
+                db.close()
+    if failed:
+        raise RuntimeError("; ".join(failed))
+    return changed
+
+
+scheduler = Scheduler()
+
+
+@scheduler.job("event_status", daily_at=clock(0, 0, 5))
+def refresh_event_status(db, now):
+    """Move events between upcoming, ongoing and completed with three set-based UPDATEs"""
+    today = now.date()
+    # last_date covers a recurring series' final occurrence and is NULL while it keeps recurring
+    running = or_(Event.last_date >= today, Event.last_date.is_(None))
+    transitions = [
+        ('completed', and_(Event.status.in_(['upcoming', 'ongoing']), Event.last_date < today)),
+        ('ongoing', and_(Event.status == 'upcoming', Event.start_date <= today, running)),
+        ('upcoming', and_(Event.status == 'ongoing', Event.start_date > today))
+    ]
+    changed = 0
+    for status, condition in transitions:
+        result = db.execute(
+            update(Event).where(condition).values(status=status, updated_at=datetime.utcnow()),
+            execution_options={"synchronize_session": False}
+        )
+        changed += result.rowcount
+    if not changed:
+        return set()
+    event_calendar.bump_version(db.connection())
+    return {"events", "feed_versions"}
+
+
+@scheduler.job("announcement_expiry", daily_at=clock(0, 0, 5))
+def expire_announcements(db, now):
+    """Mark announcements past their expiry date as expired and refresh their feed entries"""
+    ids = db.execute(
+        select(Announcement.id).where(Announcement.status == 'active', Announcement.expiry_date < now.date())
+    ).scalars().all()
+    for start in range(0, len(ids), UPDATE_BATCH_SIZE):
+        batch = ids[start:start + UPDATE_BATCH_SIZE]
+        db.execute(
+            update(Announcement).where(Announcement.id.in_(batch)).values(status='expired', updated_at=datetime.utcnow()),
+            execution_options={"synchronize_session": False}
+        )
+        # Core UPDATEs skip the flush hooks, so re-fan these entries explicitly
+        feed.refresh(db.connection(), batch)
+    return {"announcements", "announcement_feed", "feed_versions"} if ids else set()
+
+
+def rebuild_rollups(db, now):
+    """Nightly reconciliation of the report rollups and class enrollment counters against the source tables"""
+    enrollment.recount(db.connection())
+    return set(rollups.rebuild(db)) | {"classes"}
+
+
+# Opt-in because it scans every student, teacher and timetable row
+if os.getenv("SCHEDULER_REBUILD_ROLLUPS", "false").lower() == "true":
+    scheduler.register("rollup_rebuild", rebuild_rollups, daily_at=clock(3, 0), run_on_start=False)
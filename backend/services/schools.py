@@ -0,0 +1,59 @@
+import asyncio
+import os
+import time
+from sqlalchemy import select
+from config.database import AsyncSessionLocal, SessionLocal, School
+from config.tenancy import MULTI_TENANT
+
+SCHOOL_CACHE_TTL = float(os.getenv("SCHOOL_CACHE_TTL", "60"))  # seconds between registry reloads
+UNKNOWN_RETRY_SECONDS = 1.0  # an unknown id reloads the registry at most this often
+
+
+def active_school_ids():
+    """Schools background jobs and scripts should visit; [None] when the deployment has one school"""
+    if not MULTI_TENANT:
+        return [None]
+    with SessionLocal() as db:
+        return db.execute(select(School.id).where(School.status == 'active').order_by(School.id)).scalars().all()
+
+
+def all_school_ids():
+    """Every registered school, active or not, for schema work such as scripts.migrate"""
+    with SessionLocal() as db:
+        return db.execute(select(School.id).order_by(School.id)).scalars().all()
+
+
+class SchoolDirectory:
+    """Per-worker set of active school ids, so routing a request costs no query.
+
+    The set is reloaded every SCHOOL_CACHE_TTL seconds, and early when a
+    request names a school it has not seen, which is how newly created
+    schools become reachable without waiting for the TTL.
+    """
+
+    def __init__(self, ttl=SCHOOL_CACHE_TTL):
+        self.ttl = ttl
+        self.active = frozenset()
+        self.loaded_at = float("-inf")
+        self.lock = asyncio.Lock()
+
+    async def reload(self):
+        async with AsyncSessionLocal() as db:
+            ids = (await db.execute(select(School.id).where(School.status == 'active'))).scalars().all()
+        self.active = frozenset(ids)
+        self.loaded_at = time.monotonic()
+
+    async def is_active(self, school_id):
+        age = time.monotonic() - self.loaded_at
+        if age > self.ttl or (school_id not in self.active and age > UNKNOWN_RETRY_SECONDS):
+            async with self.lock:
+                # Another request may have reloaded while this one waited
+                if time.monotonic() - self.loaded_at > min(self.ttl, UNKNOWN_RETRY_SECONDS):
+                    await self.reload()
+        return school_id in self.active
+
+    def forget(self):
+        self.loaded_at = float("-inf")
+
+
+school_directory = SchoolDirectory()
@@ -0,0 +1,348 @@
+import asyncio
+import os
+import re
+import threading
+import time
+from bisect import bisect_left, insort
+from datetime import datetime, timedelta
+from sqlalchemy import event, func, inspect, select
+from sqlalchemy.orm import Session
+from starlette.concurrency import run_in_threadpool
+from config.database import Student, Subject, Teacher, read_engine
+from config.tenancy import current_school_id, tenant_scope
+from services.invalidation import subscribe
+
+SEARCH_SYNC_SECONDS = float(os.getenv("SEARCH_SYNC_SECONDS", "10"))  # how stale other workers' writes may be
+SYNC_OVERLAP = timedelta(seconds=5)  # re-read window that absorbs clock skew between workers
+SEARCH_CANDIDATES = 256  # documents scored per query before the scan stops
+
+# Field weights; identifiers outrank names on an exact hit
+FIELD_WEIGHTS = {
+    'name': 1.0, 'admission_number': 1.2, 'code': 1.2,
+    'email': 0.8, 'phone': 0.8, 'parent_phone': 0.6
+}
+# Fields also indexed as one compact token, so 'ADM-2026-001' matches 'adm2026'
+COMPACT_FIELDS = {'admission_number', 'code', 'phone', 'parent_phone'}
+PHONE_FIELDS = {'phone', 'parent_phone'}
+WORD = re.compile(r'[^\W_]+')
+NON_DIGIT = re.compile(r'\D+')
+
+
+class Source:
+    """How one model is indexed: the searchable fields and what a result shows"""
+
+    def __init__(self, model, fields, subtitle, extra=()):
+        self.model = model
+        self.fields = fields
+        self.subtitle = subtitle
+        self.extra = extra
+        self.columns = tuple(dict.fromkeys(('id', 'name') + fields + (subtitle,) + extra))
+        self.positions = {column: position for position, column in enumerate(self.columns)}
+
+    def select(self):
+        return select(*(getattr(self.model, column) for column in self.columns))
+
+
+SOURCES = {
+    'student': Source(Student, ('name', 'admission_number', 'email', 'phone', 'parent_phone'),
+                      'admission_number', ('class_id', 'status')),
+    'teacher': Source(Teacher, ('name', 'email', 'phone'), 'email', ('status',)),
+    'subject': Source(Subject, ('name', 'code'), 'code', ('stream',))
+}
+MODEL_KINDS = {source.model: kind for kind, source in SOURCES.items()}
+SOURCE_TABLES = {source.model.__tablename__ for source in SOURCES.values()}
+
+
+def tokenize(text):
+    return WORD.findall(text.casefold()) if text else []
+
+
+def field_tokens(field, value):
+    value = str(value).casefold()
+    tokens = WORD.findall(value)
+    if field in COMPACT_FIELDS and len(tokens) > 1:
+        tokens.append("".join(tokens))
+    if field in PHONE_FIELDS:
+        digits = NON_DIGIT.sub("", value)
+        if digits:
+            # Numbers stored with a country code still match on the local number
+            tokens.extend((digits, digits[-10:]))
+    return tokens
+
+
+def match_score(term, token, field):
+    closeness = 1.0 if token == term else 0.5 + 0.5 * len(term) / len(token)
+    return FIELD_WEIGHTS[field] * closeness
+
+
+class Document:
+    __slots__ = ('result', 'terms', 'text')
+
+    def __init__(self, result, terms):
+        self.result = result
+        self.terms = terms  # (token, field) pairs
+        # Every token behind a separator, so a prefix test is one substring search
+        self.text = "".join(f"\0{token}" for token, _ in terms)
+
+    def matches(self, term):
+        return f"\0{term}" in self.text
+
+    def best(self, term):
+        """Best score of `term` as a prefix of any of this document's tokens"""
+        return max(match_score(term, token, field) for token, field in self.terms if token.startswith(term))
+
+
+class SearchIndex:
+    """Prefix inverted index over the students, teachers and subjects of one school.
+
+    `tokens` is the sorted list of distinct tokens, so every token starting
+    with a prefix is one bisect away; `postings` maps each token to the
+    documents holding it. ORM writes are applied when their transaction
+    commits; everything else is picked up by sync().
+    """
+
+    def __init__(self):
+        self.lock = threading.RLock()
+        self.docs = {}      # (kind, id) -> Document
+        self.postings = {}  # token -> {(kind, id): field}
+        self.tokens = []
+        self.counts = dict.fromkeys(SOURCES, 0)
+        self.watermark = None
+        self.synced_at = float("-inf")
+
+    def load(self, db):
+        started = datetime.utcnow()
+        with self.lock:
+            for kind, source in SOURCES.items():
+                for row in db.execute(source.select()).tuples():
+                    self._add(kind, row, sort=False)
+            self.tokens = sorted(self.postings)
+            self.watermark = started
+            self.synced_at = time.monotonic()
+        return self
+
+    def _add(self, kind, row, sort=True):
+        source = SOURCES[kind]
+        key = (kind, row[0])
+        if key in self.docs:
+            self._remove(key)
+        terms = {}
+        for field in source.fields:
+            value = row[source.positions[field]]
+            if value is None or value == "":
+                continue
+            weight = FIELD_WEIGHTS[field]
+            for token in field_tokens(field, value):
+                current = terms.get(token)
+                if current is None or weight > FIELD_WEIGHTS[current]:
+                    terms[token] = field
+        result = {"type": kind, "id": row[0], "title": row[1], "subtitle": row[source.positions[source.subtitle]]}
+        for column in source.extra:
+            result[column] = row[source.positions[column]]
+        self.docs[key] = Document(result, tuple(terms.items()))
+        self.counts[kind] += 1
+        for token, field in terms.items():
+            postings = self.postings.get(token)
+            if postings is None:
+                postings = self.postings[token] = {}
+                if sort:
+                    insort(self.tokens, token)
+            postings[key] = field
+
+    def _remove(self, key):
+        document = self.docs.pop(key, None)
+        if document is None:
+            return
+        self.counts[key[0]] -= 1
+        for token, _ in document.terms:
+            postings = self.postings[token]
+            postings.pop(key, None)
+            if not postings:
+                del self.postings[token]
+                position = bisect_left(self.tokens, token)
+                if position < len(self.tokens) and self.tokens[position] == token:
+                    del self.tokens[position]
+
+    def apply(self, changes):
+        """Apply committed (kind, id, row) changes; row is None for a deleted row"""
+        with self.lock:
+            for kind, row_id, row in changes:
+                if row is None:
+                    self._remove((kind, row_id))
+                else:
+                    self._add(kind, row)
+
+    def sync(self, db):
+        """Catch up on rows other workers or Core statements changed since the last sync.
+
+        Rows updated since the watermark are re-indexed. Returns False when
+        a row count still disagrees afterwards: rows were deleted (or
+        written long before they committed) and only a reload is exact.
+        """
+        started = datetime.utcnow()
+        since = self.watermark - SYNC_OVERLAP
+        changed = {}
+        counts = {}
+        for kind, source in SOURCES.items():
+            changed[kind] = db.execute(source.select().where(source.model.updated_at >= since)).tuples().all()
+            counts[kind] = db.execute(select(func.count()).select_from(source.model)).scalar()
+        with self.lock:
+            for kind, rows in changed.items():
+                for row in rows:
+                    self._add(kind, row)
+            if counts != self.counts:
+                return False
+            self.watermark = started
+            self.synced_at = time.monotonic()
+        return True
+
+    def search(self, query, kinds=None, limit=10):
+        """Ranked results whose tokens start with every term of the query.
+
+        The rarest term drives the scan: its matching tokens are walked in
+        sorted order, the exact token first, and each document reached is
+        checked for the other terms. The scan stops after SEARCH_CANDIDATES
+        documents, so one-letter prefixes cost no more than long ones.
+        """
+        terms = list(dict.fromkeys(tokenize(query)))
+        if not terms:
+            return []
+        with self.lock:
+            ranges = {}
+            for term in terms:
+                lo = bisect_left(self.tokens, term)
+                hi = bisect_left(self.tokens, term + "\U0010ffff", lo)
+                if lo == hi:
+                    return []
+                ranges[term] = (lo, hi)
+
+            def estimate(term):
+                # Documents under a prefix, extrapolated from its first few tokens
+                lo, hi = ranges[term]
+                sample = self.tokens[lo:min(hi, lo + 16)]
+                return sum(len(self.postings[token]) for token in sample) * (hi - lo) / len(sample)
+
+            driver = min(terms, key=estimate)
+            others = [term for term in terms if term != driver]
+            lo, hi = ranges[driver]
+            found = {}
+            for position in range(lo, hi):
+                for key in self.postings[self.tokens[position]]:
+                    if key in found or (kinds and key[0] not in kinds):
+                        continue
+                    document = self.docs[key]
+                    if all(document.matches(term) for term in others):
+                        found[key] = document
+                        if len(found) >= SEARCH_CANDIDATES:
+                            break
+                if len(found) >= SEARCH_CANDIDATES:
+                    break
+            scored = [(sum(document.best(term) for term in terms), document) for document in found.values()]
+        scored.sort(key=lambda item: (-item[0], str(item[1].result['title']), item[1].result['id']))
+        return [{**document.result, "score": round(score, 3)} for score, document in scored[:limit]]
+
+    def stats(self):
+        with self.lock:
+            return {"documents": dict(self.counts), "tokens": len(self.tokens)}
+
+
+_indexes = {}        # school id -> SearchIndex
+_refresh_locks = {}  # school id -> asyncio.Lock held while its index loads or syncs
+_indexes_lock = threading.Lock()
+
+
+def _refresh(index, bind, school_id):
+    with tenant_scope(school_id), Session(bind) as db:
+        if index is None or not index.sync(db):
+            index = SearchIndex().load(db)
+    return index
+
+
+async def get_search_index(request=None):
+    """The current school's index, loaded on first use and synced every SEARCH_SYNC_SECONDS.
+
+    Loading and syncing run in the threadpool. While one request refreshes
+    an index the others keep answering from the current copy; a reload
+    builds a new index and swaps it in whole.
+    """
+    school_id = current_school_id()
+    with _indexes_lock:
+        index = _indexes.get(school_id)
+        lock = _refresh_locks.setdefault(school_id, asyncio.Lock())
+    if index is not None and (time.monotonic() - index.synced_at <= SEARCH_SYNC_SECONDS or lock.locked()):
+        return index
+    async with lock:
+        with _indexes_lock:
+            index = _indexes.get(school_id)
+        if index is None or time.monotonic() - index.synced_at > SEARCH_SYNC_SECONDS:
+            index = await run_in_threadpool(_refresh, index, read_engine(request), school_id)
+            with _indexes_lock:
+                _indexes[school_id] = index
+    return index
+
+
+def invalidate_search_index(school_id=None):
+    """Drop one school's index, or every index, so the next search reloads it"""
+    with _indexes_lock:
+        if school_id is None:
+            _indexes.clear()
+        else:
+            _indexes.pop(school_id, None)
+
+
+def search_stats():
+    with _indexes_lock:
+        indexes = dict(_indexes)
+    return {str(school_id): index.stats() for school_id, index in indexes.items()}
+
+
+@subscribe
+def _sync_soon(tables):
+    # Writes that skipped the flush hooks are caught by the next search's sync
+    if tables & SOURCE_TABLES:
+        with _indexes_lock:
+            for index in _indexes.values():
+                index.synced_at = float("-inf")
+
+
+def _snapshot(obj, kind):
+    return tuple(getattr(obj, column) for column in SOURCES[kind].columns)
+
+
+@event.listens_for(Session, "after_flush")
+def _collect_flush(session, flush_context):
+    changes = []
+    for obj in session.new:
+        kind = MODEL_KINDS.get(type(obj))
+        if kind is not None:
+            changes.append((kind, obj.id, _snapshot(obj, kind)))
+    for obj in session.dirty:
+        kind = MODEL_KINDS.get(type(obj))
+        if kind is None or not session.is_modified(obj):
+            continue
+        state = inspect(obj)
+        if any(state.attrs[column].history.has_changes() for column in SOURCES[kind].columns):
+            changes.append((kind, obj.id, _snapshot(obj, kind)))
+    for obj in session.deleted:
+        kind = MODEL_KINDS.get(type(obj))
+        if kind is not None:
+            changes.append((kind, inspect(obj).identity[0], None))
+    if changes:
+        session.info.setdefault("search_changes", {}).setdefault(current_school_id(), []).extend(changes)
+
+
+@event.listens_for(Session, "after_commit")
+def _apply_commit(session):
+    pending = session.info.pop("search_changes", None)
+    if not pending:
+        return
+    with _indexes_lock:
+        targets = [(_indexes.get(school_id), changes) for school_id, changes in pending.items()]
+    for index, changes in targets:
+        if index is not None:
+            index.apply(changes)
+
+
+@event.listens_for(Session, "after_rollback")
+def _discard_rollback(session):
+    session.info.pop("search_changes", None)
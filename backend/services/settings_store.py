@@ -0,0 +1,255 @@
+import asyncio
+import os
+import re
+import threading
+from datetime import date, time, timedelta
+from typing import Optional, Tuple
+from pydantic import BaseModel, ConfigDict, Field, field_validator, model_validator
+from sqlalchemy import select
+from config.database import Setting, TableVersion, tenant_engines
+from config.tenancy import current_school_id, tenant_scope
+from services.table_versions import track
+
+SETTINGS_POLL_SECONDS = float(os.getenv("SETTINGS_POLL_SECONDS", "5"))
+WEEKDAYS = ('monday', 'tuesday', 'wednesday', 'thursday', 'friday', 'saturday', 'sunday')
+
+track("settings")
+
+
+def academic_year_for(day, start_month=4):
+    """'2026-2027' style label of the academic year containing a date"""
+    first = day.year if day.month >= start_month else day.year - 1
+    return f"{first}-{first + 1}"
+
+
+class Period(BaseModel):
+    model_config = ConfigDict(frozen=True)
+
+    number: int
+    start_time: time
+    end_time: time
+
+
+class GradeBand(BaseModel):
+    model_config = ConfigDict(frozen=True)
+
+    grade: str
+    min_percent: float
+    grade_point: Optional[float] = None
+
+
+class Term(BaseModel):
+    model_config = ConfigDict(frozen=True)
+
+    name: str
+    start_date: date
+    end_date: date
+
+
+DEFAULT_PERIODS = (
+    Period(number=1, start_time=time(9, 0), end_time=time(9, 40)),
+    Period(number=2, start_time=time(9, 40), end_time=time(10, 20)),
+    Period(number=3, start_time=time(10, 20), end_time=time(11, 0)),
+    Period(number=4, start_time=time(11, 0), end_time=time(11, 40)),
+    Period(number=5, start_time=time(12, 0), end_time=time(12, 40)),
+    Period(number=6, start_time=time(12, 40), end_time=time(13, 20)),
+    Period(number=7, start_time=time(13, 20), end_time=time(14, 0)),
+    Period(number=8, start_time=time(14, 0), end_time=time(14, 40))
+)
+
+DEFAULT_GRADING_SCHEME = (
+    GradeBand(grade='A1', min_percent=91, grade_point=10),
+    GradeBand(grade='A2', min_percent=81, grade_point=9),
+    GradeBand(grade='B1', min_percent=71, grade_point=8),
+    GradeBand(grade='B2', min_percent=61, grade_point=7),
+    GradeBand(grade='C1', min_percent=51, grade_point=6),
+    GradeBand(grade='C2', min_percent=41, grade_point=5),
+    GradeBand(grade='D', min_percent=33, grade_point=4),
+    GradeBand(grade='E', min_percent=0, grade_point=None)
+)
+
+
+class SchoolSettings(BaseModel):
+    """Typed school configuration. Instances are frozen, so a snapshot can be shared freely"""
+
+    model_config = ConfigDict(frozen=True, extra='forbid')
+
+    school_name: str = "Learnroot School"
+    academic_year: str = Field(default_factory=lambda: academic_year_for(date.today()))
+    academic_year_start_month: int = 4
+    working_days: Tuple[str, ...] = WEEKDAYS[:6]
+    periods: Tuple[Period, ...] = DEFAULT_PERIODS
+    grading_scheme: Tuple[GradeBand, ...] = DEFAULT_GRADING_SCHEME
+    pass_percent: float = 33
+    terms: Tuple[Term, ...] = ()
+
+    @field_validator('academic_year')
+    @classmethod
+    def check_academic_year(cls, value):
+        match = re.fullmatch(r'(\d{4})-(\d{4})', value)
+        if not match or int(match.group(2)) != int(match.group(1)) + 1:
+            raise ValueError("academic_year must look like 2026-2027")
+        return value
+
+    @field_validator('working_days')
+    @classmethod
+    def check_working_days(cls, value):
+        days = tuple(day.lower() for day in value)
+        if not days or any(day not in WEEKDAYS for day in days) or len(set(days)) != len(days):
+            raise ValueError(f"working_days must be distinct days from {', '.join(WEEKDAYS)}")
+        return tuple(sorted(days, key=WEEKDAYS.index))
+
+    @field_validator('periods')
+    @classmethod
+    def check_periods(cls, value):
+        periods = tuple(sorted(value, key=lambda period: period.number))
+        if [period.number for period in periods] != list(range(1, len(periods) + 1)):
+            raise ValueError("periods must be numbered 1, 2, 3, ...")
+        for period, following in zip(periods, periods[1:] + (None,)):
+            if period.end_time <= period.start_time:
+                raise ValueError(f"Period {period.number} must end after it starts")
+            if following is not None and following.start_time < period.end_time:
+                raise ValueError(f"Period {following.number} starts before period {period.number} ends")
+        return periods
+
+    @field_validator('grading_scheme')
+    @classmethod
+    def check_grading_scheme(cls, value):
+        bands = tuple(sorted(value, key=lambda band: -band.min_percent))
+        if not bands or bands[-1].min_percent != 0 or any(not 0 <= band.min_percent <= 100 for band in bands):
+            raise ValueError("grading_scheme needs bands between 0 and 100 percent, the lowest starting at 0")
+        if len({band.min_percent for band in bands}) != len(bands):
+            raise ValueError("grading_scheme bands must have distinct min_percent values")
+        return bands
+
+    @field_validator('terms')
+    @classmethod
+    def check_terms(cls, value):
+        terms = tuple(sorted(value, key=lambda term: term.start_date))
+        if len({term.name for term in terms}) != len(terms):
+            raise ValueError("terms must have distinct names")
+        for term, following in zip(terms, terms[1:] + (None,)):
+            if term.end_date < term.start_date:
+                raise ValueError(f"Term {term.name} must end on or after its start")
+            if following is not None and following.start_date <= term.end_date:
+                raise ValueError(f"Term {following.name} starts before term {term.name} ends")
+        return terms
+
+    @model_validator(mode='after')
+    def check_ranges(self):
+        if not 1 <= self.academic_year_start_month <= 12:
+            raise ValueError("academic_year_start_month must be between 1 and 12")
+        if not 0 <= self.pass_percent <= 100:
+            raise ValueError("pass_percent must be between 0 and 100")
+        return self
+
+    def academic_terms(self):
+        """Configured terms, or the academic year split into two halves when none are set"""
+        if self.terms:
+            return self.terms
+        first = int(self.academic_year[:4])
+        month = self.academic_year_start_month
+        starts = [date(first, month, 1), date(first + (month + 5) // 12, (month + 5) % 12 + 1, 1),
+                  date(first + 1, month, 1)]
+        return tuple(
+            Term(name=f"Term {number}", start_date=start, end_date=end - timedelta(days=1))
+            for number, (start, end) in enumerate(zip(starts, starts[1:]), start=1)
+        )
+
+    def grade_for(self, percent):
+        for band in self.grading_scheme:
+            if percent >= band.min_percent:
+                return band.grade
+        return self.grading_scheme[-1].grade
+
+
+class SettingsStore:
+    """Process-wide settings snapshots, swapped whole so readers never see a half-applied write.
+
+    `settings` is the current school's frozen SchoolSettings, safe to read
+    anywhere and never mutated in place. Each worker polls the 'settings' row of table_versions, bumped
+    by every write, and only reloads the settings table when that number
+    has moved. Schools are loaded on their first request (ensure()).
+    """
+
+    def __init__(self, poll_seconds=SETTINGS_POLL_SECONDS):
+        self.poll_seconds = poll_seconds
+        self.default = (-1, SchoolSettings())
+        self.snapshots = {}  # school id (None for a single-school deployment) -> (version, settings)
+        self.lock = threading.Lock()
+        self.task = None
+
+    @property
+    def snapshot(self):
+        return self.snapshots.get(current_school_id(), self.default)
+
+    @property
+    def settings(self):
+        return self.snapshot[1]
+
+    @property
+    def version(self):
+        return self.snapshot[0]
+
+    def install(self, version, settings):
+        school_id = current_school_id()
+        with self.lock:
+            # A slow reload must not replace a newer snapshot installed meanwhile
+            if version >= self.snapshots.get(school_id, self.default)[0]:
+                self.snapshots[school_id] = (version, settings)
+
+    async def refresh(self, db, force=False):
+        """Reload from the database if the version moved; returns True when a new snapshot was installed"""
+        version = (await db.execute(
+            select(TableVersion.version).where(TableVersion.table_name == 'settings')
+        )).scalar() or 0
+        if version == self.version and not force:
+            return False
+        rows = (await db.execute(select(Setting.key, Setting.value))).all()
+        known = {row.key: row.value for row in rows if row.key in SchoolSettings.model_fields}
+        self.install(version, SchoolSettings(**known))
+        return True
+
+    async def ensure(self):
+        """Load the current school's settings if this worker has not yet"""
+        if current_school_id() not in self.snapshots:
+            async with tenant_engines()[3]() as db:
+                await self.refresh(db, force=True)
+
+    def validate(self, changes):
+        """Settings with `changes` applied; pydantic's ValidationError if they are invalid"""
+        merged = {**self.settings.model_dump(), **changes}
+        return SchoolSettings(**merged)
+
+    async def start(self):
+        if self.task is None:
+            self.task = asyncio.create_task(self._poll())
+
+    async def stop(self):
+        if self.task is not None:
+            self.task.cancel()
+            try:
+                await self.task
+            except asyncio.CancelledError:
+                pass
+            self.task = None
+
+    async def _poll(self):
+        while True:
+            await asyncio.sleep(self.poll_seconds)
+            for school_id in list(self.snapshots):
+                try:
+                    with tenant_scope(school_id):
+                        async with tenant_engines()[3]() as db:
+                            if await self.refresh(db):
+                                print(f"⚙️  Settings reloaded (version {self.version})")
+                except Exception as e:
+                    print(f"❌ Settings poll failed: {e}")
+
+
+settings_store = SettingsStore()
+
+
+def get_settings():
+    """Current settings snapshot, without any I/O"""
+    return settings_store.settings
@@ -0,0 +1,39 @@
+from sqlalchemy import event, select
+from sqlalchemy.orm import Session
+from config.database import TableVersion
+from services.rollups import upsert_increment
+
+# Only tables some cached state depends on are counted, so writes to
+# busy tables (students, attendance) never contend on a version row
+TRACKED_TABLES = set()
+
+
+def track(*tables):
+    TRACKED_TABLES.update(tables)
+
+
+def bump(connection, tables):
+    """Bump the versions of tables written outside the ORM, in the caller's transaction"""
+    tables = sorted(set(tables) & TRACKED_TABLES)
+    if tables:
+        rows = [{"table_name": table, "version": 1} for table in tables]
+        upsert_increment(connection, TableVersion.__table__, ['table_name'], 'version', rows)
+
+
+@event.listens_for(Session, "after_flush")
+def _bump_flush(session, flush_context):
+    tables = {obj.__table__.name for obj in session.new}
+    tables.update(obj.__table__.name for obj in session.deleted)
+    tables.update(obj.__table__.name for obj in session.dirty if session.is_modified(obj))
+    if tables & TRACKED_TABLES:
+        bump(session.connection(), tables)
+
+
+async def read_versions(db, tables):
+    """{table: version} for some tables; never-written tables are at version 0"""
+    rows = await db.execute(
+        select(TableVersion.table_name, TableVersion.version).where(TableVersion.table_name.in_(sorted(tables)))
+    )
+    versions = dict.fromkeys(tables, 0)
+    versions.update(rows.tuples().all())
+    return versions
@@ -0,0 +1,209 @@
+import threading
+from sqlalchemy import select
+from config.database import TableVersion, Timetable
+from config.tenancy import current_school_id
+from services.rollups import upsert_increment
+from services.table_versions import track
+
+DAYS = ['monday', 'tuesday', 'wednesday', 'thursday', 'friday', 'saturday']
+MAX_PERIODS = 16  # bit stride per day, so every week fits in 96 bits
+
+# Every timetable write bumps this version; an index built at an older one is reloaded
+track("timetable")
+
+
+def slot_bit(day_of_week: str, period_number: int) -> int:
+    """Bit position of a (day, period) cell in an occupancy bitset"""
+    if day_of_week not in DAYS:
+        raise ValueError(f"Invalid day_of_week: {day_of_week}")
+    if not 1 <= period_number <= MAX_PERIODS:
+        raise ValueError(f"period_number must be between 1 and {MAX_PERIODS}")
+    return DAYS.index(day_of_week) * MAX_PERIODS + (period_number - 1)
+
+
+def normalize_room(room):
+    if room is None:
+        return None
+    room = room.strip().lower()
+    return room or None
+
+
+class TimetableIndex:
+    """Occupancy bitsets for one academic year, keyed by teacher, class and room.
+
+    Each bitset is a plain int with one bit per (day, period) cell, so a
+    conflict check is three dict lookups and three ANDs. `version` is the
+    shared timetable version the index reflects.
+    """
+
+    def __init__(self, academic_year, version=0):
+        self.academic_year = academic_year
+        self.version = version
+        self.lock = threading.RLock()
+        self.bits = {'class': {}, 'teacher': {}, 'room': {}}
+        self.owners = {}   # (kind, key, bit) -> timetable id
+        self.entries = {}  # timetable id -> (class_id, teacher_id, room, bit)
+
+    def load(self, db):
+        rows = db.query(
+            Timetable.id, Timetable.class_id, Timetable.teacher_id,
+            Timetable.room, Timetable.day_of_week, Timetable.period_number
+        ).filter(Timetable.academic_year == self.academic_year)
+        with self.lock:
+            for row in rows:
+                self.add(row.id, row.class_id, row.teacher_id, row.room,
+                         row.day_of_week, row.period_number)
+        return self
+
+    def _keys(self, class_id, teacher_id, room):
+        keys = [('class', class_id), ('teacher', teacher_id)]
+        room = normalize_room(room)
+        if room is not None:
+            keys.append(('room', room))
+        return keys
+
+    def add(self, entry_id, class_id, teacher_id, room, day_of_week, period_number):
+        bit = slot_bit(day_of_week, period_number)
+        with self.lock:
+            if entry_id in self.entries:
+                self.remove(entry_id)
+            for kind, key in self._keys(class_id, teacher_id, room):
+                self.bits[kind][key] = self.bits[kind].get(key, 0) | (1 << bit)
+                self.owners[(kind, key, bit)] = entry_id
+            self.entries[entry_id] = (class_id, teacher_id, room, bit)
+
+    def remove(self, entry_id):
+        with self.lock:
+            entry = self.entries.pop(entry_id, None)
+            if entry is None:
+                return
+            class_id, teacher_id, room, bit = entry
+            for kind, key in self._keys(class_id, teacher_id, room):
+                if self.owners.get((kind, key, bit)) != entry_id:
+                    continue
+                del self.owners[(kind, key, bit)]
+                remaining = self.bits[kind].get(key, 0) & ~(1 << bit)
+                if remaining:
+                    self.bits[kind][key] = remaining
+                else:
+                    self.bits[kind].pop(key, None)
+
+    def committed(self, entry_id, entry=None):
+        """Apply this worker's own committed write, which bumped the shared version by one"""
+        with self.lock:
+            if entry is None:
+                self.remove(entry_id)
+            else:
+                self.add(entry.id, entry.class_id, entry.teacher_id, entry.room, entry.day_of_week, entry.period_number)
+            self.version += 1
+
+    def conflicts(self, class_id, teacher_id, room, day_of_week, period_number,
+                  ignore_id=None, pending=None):
+        """List the clashes a slot would cause.
+
+        `pending` is an optional overlay of {(kind, key): bitset} holding
+        slots proposed earlier in the same batch.
+        """
+        bit = slot_bit(day_of_week, period_number)
+        mask = 1 << bit
+        found = []
+        with self.lock:
+            for kind, key in self._keys(class_id, teacher_id, room):
+                if self.bits[kind].get(key, 0) & mask:
+                    owner = self.owners.get((kind, key, bit))
+                    if owner is not None and owner != ignore_id:
+                        found.append({"type": kind, "key": key, "timetable_id": owner})
+                        continue
+                if pending and pending.get((kind, key), 0) & mask:
+                    found.append({"type": kind, "key": key, "timetable_id": None})
+        return found
+
+    def validate(self, slots):
+        """Check many proposed slots at once, including clashes between them"""
+        pending = {}
+        results = []
+        for position, slot in enumerate(slots):
+            try:
+                found = self.conflicts(
+                    slot['class_id'], slot['teacher_id'], slot.get('room'),
+                    slot['day_of_week'], slot['period_number'],
+                    ignore_id=slot.get('id'), pending=pending
+                )
+            except ValueError as e:
+                results.append({"index": position, "valid": False, "error": str(e), "conflicts": []})
+                continue
+            mask = 1 << slot_bit(slot['day_of_week'], slot['period_number'])
+            for key in self._keys(slot['class_id'], slot['teacher_id'], slot.get('room')):
+                pending[key] = pending.get(key, 0) | mask
+            results.append({"index": position, "valid": not found, "conflicts": found})
+        return results
+
+    def free_slots(self, class_id=None, teacher_id=None, room=None, periods_per_day=MAX_PERIODS):
+        """(day, period) cells where the given class, teacher and room are all free"""
+        with self.lock:
+            busy = 0
+            if class_id is not None:
+                busy |= self.bits['class'].get(class_id, 0)
+            if teacher_id is not None:
+                busy |= self.bits['teacher'].get(teacher_id, 0)
+            room = normalize_room(room)
+            if room is not None:
+                busy |= self.bits['room'].get(room, 0)
+        free = []
+        for day_index, day in enumerate(DAYS):
+            for period in range(1, periods_per_day + 1):
+                if not busy >> (day_index * MAX_PERIODS + period - 1) & 1:
+                    free.append({"day_of_week": day, "period_number": period})
+        return free
+
+
+_indexes = {}  # (school id, academic year) -> TimetableIndex
+_indexes_lock = threading.Lock()
+
+
+def timetable_version(db, lock=False):
+    """The shared timetable version.
+
+    With `lock` the version row is locked until the transaction ends, so
+    timetable writers in every worker take turns: a writer that holds it
+    sees every earlier write, and no other write can land before its own.
+    Call it first in the transaction, before anything else is read.
+    """
+    if lock:
+        upsert_increment(db.connection(), TableVersion.__table__, ['table_name'], 'version',
+                         [{"table_name": "timetable", "version": 0}])
+    return db.execute(select(TableVersion.version).where(TableVersion.table_name == "timetable")).scalar() or 0
+
+
+def get_timetable_index(db, academic_year):
+    """The index for a year, reloaded from the database whenever another write has moved the shared version"""
+    version = timetable_version(db)
+    key = (current_school_id(), academic_year)
+    with _indexes_lock:
+        index = _indexes.get(key)
+    if index is None or index.version != version:
+        index = TimetableIndex(academic_year, version).load(db)
+        with _indexes_lock:
+            cached = _indexes.get(key)
+            if cached is None or cached.version <= version:
+                _indexes[key] = index
+    return index
+
+
+async def get_timetable_index_async(db, academic_year):
+    """Async variant of get_timetable_index for an AsyncSession"""
+    return await db.run_sync(get_timetable_index, academic_year)
+
+
+async def lock_timetable(db):
+    """Take the timetable write lock for the rest of db's transaction"""
+    return await db.run_sync(timetable_version, True)
+
+
+def invalidate_timetable_index(academic_year=None):
+    """Drop cached indexes so the next access reloads from the database"""
+    with _indexes_lock:
+        if academic_year is None:
+            _indexes.clear()
+        else:
+            _indexes.pop((current_school_id(), academic_year), None)
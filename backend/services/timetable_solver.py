@@ -0,0 +1,253 @@
+import random
+import time
+from concurrent.futures import ProcessPoolExecutor
+from config.database import Class, Grade, GradeSubject, Teacher, TeacherSubject
+
+DEFAULT_PERIODS_PER_WEEK = 4
+
+
+def _norm(value):
+    return str(value).strip().lower()
+
+
+def build_problem(db, days, periods_per_day, rooms=None, default_periods=DEFAULT_PERIODS_PER_WEEK):
+    """Load classes, grade requirements and teacher qualifications into plain data.
+
+    The result only holds builtins so it can be shipped to worker processes.
+    """
+    grade_requirements = {}
+    curriculum = db.query(Grade.name, GradeSubject.subject_id, GradeSubject.periods_per_week).join(
+        GradeSubject, GradeSubject.grade_id == Grade.id
+    ).order_by(Grade.id, GradeSubject.subject_id)
+    for row in curriculum:
+        grade_requirements.setdefault(_norm(row.name), {})[row.subject_id] = row.periods_per_week or default_periods
+
+    qualified = {}
+    teachers = db.query(TeacherSubject.subject_id, TeacherSubject.teacher_id).join(
+        Teacher, Teacher.id == TeacherSubject.teacher_id
+    ).filter(Teacher.status == 'active').order_by(TeacherSubject.teacher_id)
+    for row in teachers:
+        qualified.setdefault(row.subject_id, []).append(row.teacher_id)
+
+    lessons = []
+    for class_ in db.query(Class.id, Class.grade).order_by(Class.id):
+        for subject_id, periods in grade_requirements.get(_norm(class_.grade), {}).items():
+            lessons.append({
+                "class_id": class_.id,
+                "subject_id": subject_id,
+                "periods": periods,
+                "teachers": qualified.get(subject_id, [])
+            })
+
+    return {
+        "days": list(days),
+        "periods_per_day": periods_per_day,
+        "rooms": list(rooms or []),
+        "lessons": lessons
+    }
+
+
+def _pick_teachers(problem, rng):
+    """Fix one teacher per (class, subject), spreading load across qualified staff"""
+    load = {}
+    chosen = {}
+    order = sorted(range(len(problem["lessons"])),
+                   key=lambda i: (len(problem["lessons"][i]["teachers"]), rng.random()))
+    for i in order:
+        lesson = problem["lessons"][i]
+        if not lesson["teachers"]:
+            continue
+        teacher_id = min(lesson["teachers"], key=lambda t: (load.get(t, 0), rng.random()))
+        load[teacher_id] = load.get(teacher_id, 0) + lesson["periods"]
+        chosen[i] = teacher_id
+    return chosen, load
+
+
+def solve_once(problem, seed, deadline):
+    """One randomized greedy construction followed by an ejection repair pass"""
+    rng = random.Random(seed)
+    days = problem["days"]
+    periods_per_day = problem["periods_per_day"]
+    slot_count = len(days) * periods_per_day
+    full = (1 << slot_count) - 1
+    room_capacity = len(problem["rooms"]) or None
+
+    chosen, teacher_load = _pick_teachers(problem, rng)
+    class_load = {}
+    for lesson in problem["lessons"]:
+        class_load[lesson["class_id"]] = class_load.get(lesson["class_id"], 0) + lesson["periods"]
+
+    # Expand requirements into single periods, hardest first
+    units = []
+    for i, lesson in enumerate(problem["lessons"]):
+        units.extend([i] * lesson["periods"])
+    units.sort(key=lambda i: (
+        -teacher_load.get(chosen.get(i), 0),
+        -class_load[problem["lessons"][i]["class_id"]],
+        rng.random()
+    ))
+
+    class_bits = {}
+    teacher_bits = {}
+    slot_used = [0] * slot_count
+    day_count = {}             # (lesson index, day) -> periods placed that day
+    at_class = {}              # (class_id, slot) -> unit position
+    at_teacher = {}            # (teacher_id, slot) -> unit position
+    placed = {}                # unit position -> slot
+    unplaced = []
+
+    def free_mask(class_id, teacher_id):
+        busy = class_bits.get(class_id, 0) | teacher_bits.get(teacher_id, 0)
+        return full & ~busy
+
+    def place(position, slot):
+        i = units[position]
+        class_id = problem["lessons"][i]["class_id"]
+        teacher_id = chosen[i]
+        class_bits[class_id] = class_bits.get(class_id, 0) | (1 << slot)
+        teacher_bits[teacher_id] = teacher_bits.get(teacher_id, 0) | (1 << slot)
+        slot_used[slot] += 1
+        day_key = (i, slot // periods_per_day)
+        day_count[day_key] = day_count.get(day_key, 0) + 1
+        at_class[(class_id, slot)] = position
+        at_teacher[(teacher_id, slot)] = position
+        placed[position] = slot
+
+    def unplace(position):
+        i = units[position]
+        slot = placed.pop(position)
+        class_id = problem["lessons"][i]["class_id"]
+        teacher_id = chosen[i]
+        class_bits[class_id] &= ~(1 << slot)
+        teacher_bits[teacher_id] &= ~(1 << slot)
+        slot_used[slot] -= 1
+        day_count[(i, slot // periods_per_day)] -= 1
+        del at_class[(class_id, slot)]
+        del at_teacher[(teacher_id, slot)]
+
+    def best_slot(position, exclude=None):
+        i = units[position]
+        mask = free_mask(problem["lessons"][i]["class_id"], chosen[i])
+        best = None
+        best_score = None
+        while mask:
+            low = mask & -mask
+            slot = low.bit_length() - 1
+            mask ^= low
+            if slot == exclude or (room_capacity and slot_used[slot] >= room_capacity):
+                continue
+            # Prefer days where this subject is not yet taught to this class
+            score = day_count.get((i, slot // periods_per_day), 0) * 10 + rng.random()
+            if best_score is None or score < best_score:
+                best, best_score = slot, score
+        return best
+
+    for position, i in enumerate(units):
+        if i not in chosen:
+            unplaced.append(position)
+            continue
+        if time.time() > deadline:
+            unplaced.append(position)
+            continue
+        slot = best_slot(position)
+        if slot is None:
+            unplaced.append(position)
+        else:
+            place(position, slot)
+
+    # Repair: free a slot for each unplaced period by moving one blocker elsewhere
+    still_unplaced = []
+    for position in unplaced:
+        i = units[position]
+        if i not in chosen or time.time() > deadline:
+            still_unplaced.append(position)
+            continue
+        class_id = problem["lessons"][i]["class_id"]
+        teacher_id = chosen[i]
+        repaired = False
+        for slot in rng.sample(range(slot_count), slot_count):
+            blockers = {at_class.get((class_id, slot)), at_teacher.get((teacher_id, slot))}
+            blockers.discard(None)
+            if len(blockers) != 1:
+                continue
+            blocker = blockers.pop()
+            unplace(blocker)
+            target = best_slot(blocker, exclude=slot)
+            if target is None:
+                place(blocker, slot)
+                continue
+            place(blocker, target)
+            place(position, slot)
+            repaired = True
+            break
+        if not repaired:
+            still_unplaced.append(position)
+
+    repeats = sum(count - 1 for count in day_count.values() if count > 1)
+    assignments = []
+    rooms_at_slot = {}
+    for position, slot in sorted(placed.items(), key=lambda item: item[1]):
+        i = units[position]
+        lesson = problem["lessons"][i]
+        room = None
+        if problem["rooms"]:
+            used = rooms_at_slot.get(slot, 0)
+            room = problem["rooms"][used]
+            rooms_at_slot[slot] = used + 1
+        assignments.append({
+            "class_id": lesson["class_id"],
+            "subject_id": lesson["subject_id"],
+            "teacher_id": chosen[i],
+            "room": room,
+            "day_of_week": days[slot // periods_per_day],
+            "period_number": slot % periods_per_day + 1
+        })
+
+    missing = {}
+    for position in still_unplaced:
+        i = units[position]
+        lesson = problem["lessons"][i]
+        reason = "no free slot" if i in chosen else "no qualified teacher"
+        key = (lesson["class_id"], lesson["subject_id"], reason)
+        missing[key] = missing.get(key, 0) + 1
+
+    return {
+        "seed": seed,
+        "score": len(still_unplaced) * 1000 + repeats,
+        "placed": len(placed),
+        "unplaced": len(still_unplaced),
+        "same_day_repeats": repeats,
+        "assignments": assignments,
+        "unplaced_lessons": [
+            {"class_id": class_id, "subject_id": subject_id, "periods": periods, "reason": reason}
+            for (class_id, subject_id, reason), periods in missing.items()
+        ]
+    }
+
+
+def solve(problem, time_budget=10.0, restarts=4, workers=1, seed=None):
+    """Run several randomized restarts within a wall-clock budget and keep the best.
+
+    With workers > 1 the restarts run on a process pool.
+    """
+    started = time.time()
+    deadline = started + time_budget
+    base_seed = seed if seed is not None else random.randrange(1 << 30)
+    seeds = [base_seed + n for n in range(max(1, restarts))]
+
+    results = []
+    if workers > 1 and len(seeds) > 1:
+        with ProcessPoolExecutor(max_workers=workers) as pool:
+            futures = [pool.submit(solve_once, problem, s, deadline) for s in seeds]
+            results = [future.result() for future in futures]
+    else:
+        for s in seeds:
+            results.append(solve_once(problem, s, deadline))
+            if results[-1]["score"] == 0 or time.time() > deadline:
+                break
+
+    best = min(results, key=lambda result: result["score"])
+    best["restarts"] = len(results)
+    best["elapsed_seconds"] = round(time.time() - started, 3)
+    best["total_periods"] = sum(lesson["periods"] for lesson in problem["lessons"])
+    return best
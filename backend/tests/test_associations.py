@@ -0,0 +1,85 @@
+"""Association tables follow catalogue rows created or renamed after the text that names them.
+
+Run from the backend directory: python -m pytest tests
+"""
+
+import pytest
+from sqlalchemy import create_engine, select
+from sqlalchemy.orm import Session
+from config.database import (
+    Announcement, AnnouncementAudience, AnnouncementFeed, Base, Class, Grade, Subject, Teacher, TeacherSubject, User
+)
+import services.associations  # noqa: F401  registers the flush hook
+import services.feed  # noqa: F401
+
+
+@pytest.fixture
+def session():
+    engine = create_engine("sqlite://")
+    Base.metadata.create_all(engine)
+    with Session(engine) as session:
+        yield session
+    engine.dispose()
+
+
+def teacher_subjects(session, teacher):
+    return set(session.scalars(select(TeacherSubject.subject_id).where(TeacherSubject.teacher_id == teacher.id)))
+
+
+def audience(session, announcement):
+    return set(session.execute(
+        select(AnnouncementAudience.kind, AnnouncementAudience.value, AnnouncementAudience.class_id)
+        .where(AnnouncementAudience.announcement_id == announcement.id)
+    ).tuples())
+
+
+def test_teacher_created_before_subjects_is_linked_when_they_are_added(session):
+    teacher = Teacher(name="T", email="t@example.com", subjects="MATH, Physics")
+    other = Teacher(name="U", email="u@example.com", subjects="English")
+    session.add_all([teacher, other])
+    session.commit()
+    assert teacher_subjects(session, teacher) == set()
+
+    maths = Subject(name="Mathematics", code="MATH")
+    session.add(maths)
+    session.commit()
+    assert teacher_subjects(session, teacher) == {maths.id}
+
+    physics = Subject(name="Physics", code="PHY")
+    session.add(physics)
+    session.commit()
+    assert teacher_subjects(session, teacher) == {maths.id, physics.id}
+    assert teacher_subjects(session, other) == set()
+
+
+def test_renaming_a_subject_moves_its_links(session):
+    science = Subject(name="Science", code="SCI")
+    session.add(science)
+    session.commit()
+    teacher = Teacher(name="T", email="t@example.com", subjects="Chemistry")
+    old = Teacher(name="U", email="u@example.com", subjects="SCI")
+    session.add_all([teacher, old])
+    session.commit()
+    assert teacher_subjects(session, old) == {science.id}
+
+    science.name, science.code = "Chemistry", "CHEM"
+    session.commit()
+    assert teacher_subjects(session, teacher) == {science.id}
+    assert teacher_subjects(session, old) == set()
+
+
+def test_announcement_written_before_its_class_and_grade(session):
+    user = User(name="A", email="a@example.com", password="x", role="school_admin")
+    session.add(user)
+    session.commit()
+    announcement = Announcement(title="Trip", content="...", created_by=user.id, target_audience="8B, Grade 9")
+    session.add(announcement)
+    session.commit()
+    assert audience(session, announcement) == {("tag", "8B", None), ("tag", "Grade 9", None)}
+
+    class_ = Class(name="8B", segment="secondary", grade="8")
+    session.add_all([class_, Grade(name="9", segment="secondary")])
+    session.commit()
+    assert audience(session, announcement) == {("class", None, class_.id), ("grade", "9", None)}
+    feed = set(session.scalars(select(AnnouncementFeed.audience).where(AnnouncementFeed.announcement_id == announcement.id)))
+    assert {f"class:{class_.id}", "grade:9"} <= feed
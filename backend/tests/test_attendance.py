@@ -0,0 +1,92 @@
+"""Attendance refuses ambiguous roll numbers and reads each day against the roster it was marked with.
+
+Run from the backend directory: python -m pytest tests
+"""
+
+from datetime import date
+import pytest
+from sqlalchemy import create_engine
+from sqlalchemy.orm import Session
+from config.database import AttendanceRoster, Base, Class, Student
+from services import attendance
+
+MONDAY, TUESDAY, WEDNESDAY = date(2026, 9, 7), date(2026, 9, 8), date(2026, 9, 9)
+
+
+@pytest.fixture
+def session():
+    engine = create_engine("sqlite://")
+    Base.metadata.create_all(engine)
+    with Session(engine) as session:
+        session.add_all([Class(id=1, name="7A", segment="secondary", grade="7"),
+                         Class(id=2, name="7B", segment="secondary", grade="7")])
+        session.add_all([
+            Student(id=10 + roll, admission_number=f"A{roll}", name=f"Student {roll}", class_id=1, roll_number=roll)
+            for roll in (1, 2, 3)
+        ])
+        session.commit()
+        yield session
+    engine.dispose()
+
+
+def statuses(register):
+    return {row["student_id"]: (row["roll_number"], row["status"]) for row in register["students"]}
+
+
+def test_duplicate_roll_numbers_are_refused(session):
+    session.add(Student(id=20, admission_number="A20", name="Late joiner", class_id=1, roll_number=2))
+    session.commit()
+    with pytest.raises(ValueError, match="more than one student.*: 2;"):
+        attendance.mark(session, 1, MONDAY, absent=[3])
+    session.rollback()
+    assert attendance.register(session, 1, MONDAY)["taken"] is False
+
+
+def test_unknown_and_contradictory_roll_numbers_are_refused(session):
+    with pytest.raises(ValueError, match="not in class 1: 9"):
+        attendance.mark(session, 1, MONDAY, absent=[9])
+    with pytest.raises(ValueError, match="both present and absent"):
+        attendance.mark(session, 1, MONDAY, absent=[1], present=[1])
+
+
+def test_register_reads_each_day_against_that_days_roster(session):
+    attendance.mark(session, 1, MONDAY, absent=[2])
+    session.commit()
+    # Student 12 leaves and student 13 takes over roll number 2
+    session.get(Student, 12).class_id = 2
+    session.get(Student, 13).roll_number = 2
+    session.commit()
+    attendance.mark(session, 1, TUESDAY, absent=[1])
+    attendance.mark(session, 1, WEDNESDAY, absent=[2])
+    session.commit()
+
+    assert statuses(attendance.register(session, 1, MONDAY)) == {
+        11: (1, "present"), 12: (2, "absent"), 13: (3, "present")
+    }
+    assert statuses(attendance.register(session, 1, TUESDAY)) == {11: (1, "absent"), 13: (2, "present")}
+    # The unchanged roster is stored once and shared by later days
+    assert session.query(AttendanceRoster).count() == 2
+
+    summary = attendance.class_summary(session, 1, MONDAY, WEDNESDAY)
+    by_student = {row["student_id"]: (row["present"], row["marked"], row["in_class"]) for row in summary["students"]}
+    assert by_student == {11: (2, 3, True), 13: (2, 3, True), 12: (0, 1, False)}
+
+    moved = attendance.student_summary(session, 13, MONDAY, WEDNESDAY)
+    assert [(day["date"], day["status"]) for day in moved["days"]] == [
+        (MONDAY, "present"), (TUESDAY, "present"), (WEDNESDAY, "absent")
+    ]
+
+
+def test_merge_keeps_marks_only_for_the_same_student(session):
+    attendance.mark(session, 1, MONDAY, absent=[1, 3], merge=True)
+    session.commit()
+    session.get(Student, 13).roll_number = 4
+    session.add(Student(id=30, admission_number="A30", name="New", class_id=1, roll_number=3))
+    session.commit()
+
+    result = attendance.mark(session, 1, MONDAY, present=[2], merge=True)
+    session.commit()
+    assert result["absent"] == [1]
+    assert statuses(attendance.register(session, 1, MONDAY)) == {
+        11: (1, "absent"), 12: (2, "present"), 30: (3, None), 13: (4, None)
+    }
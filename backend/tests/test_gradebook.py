@@ -0,0 +1,90 @@
+"""Incrementally maintained results agree with publish's full rebuild"""
+
+import random
+import pytest
+from sqlalchemy import create_engine, insert
+from sqlalchemy.orm import Session
+from config.database import Base, Class, Exam, ExamSubject, Student, Subject
+from services import gradebook
+
+CLASSES, CLASS_SIZE, PAPERS = 3, 8, 3
+
+
+@pytest.fixture
+def session():
+    engine = create_engine("sqlite://")
+    Base.metadata.create_all(engine)
+    with Session(engine) as session:
+        session.execute(insert(Subject), [{"id": n, "name": f"Paper {n}", "code": f"P{n}"} for n in range(1, PAPERS + 1)])
+        session.execute(insert(Class), [
+            {"id": n, "name": f"10-{n}", "segment": "secondary", "grade": "10", "section": str(n), "max_students": 40}
+            for n in range(1, CLASSES + 1)
+        ])
+        session.execute(insert(Student), [
+            {"id": n, "admission_number": f"A{n}", "name": f"S{n}", "class_id": (n - 1) // CLASS_SIZE + 1,
+             "roll_number": (n - 1) % CLASS_SIZE + 1, "status": "active"}
+            for n in range(1, CLASSES * CLASS_SIZE + 1)
+        ])
+        session.execute(insert(Exam), [{"id": 1, "name": "Final", "grade": "10", "academic_year": "2026-2027"}])
+        session.execute(insert(ExamSubject), [{"exam_id": 1, "subject_id": n, "max_marks": 100} for n in range(1, PAPERS + 1)])
+        session.commit()
+        yield session
+    engine.dispose()
+
+
+def standings(session):
+    return {
+        row["student_id"]: (row["class_id"], float(row["total"]), row["grade"], row["passed"], row["rank"],
+                            row["class_rank"], float(row["percentile"]))
+        for row in gradebook.results(session, 1)
+    }
+
+
+@pytest.mark.parametrize("seed", range(5))
+def test_incremental_results_match_a_full_rebuild(session, seed):
+    rng = random.Random(seed)
+    exam = session.get(Exam, 1)
+    uploads = [(class_id, subject_id) for class_id in range(1, CLASSES + 1) for subject_id in range(1, PAPERS + 1)]
+    rng.shuffle(uploads)
+    # Ties are likely with a narrow range of marks, and some students are absent
+    for class_id, subject_id in uploads:
+        entries = [{"roll_number": roll, "absent": True} if rng.random() < 0.1
+                   else {"roll_number": roll, "marks": rng.choice([30, 45, 60, 75])}
+                   for roll in range(1, CLASS_SIZE + 1)]
+        gradebook.save_marks(session, exam, class_id, subject_id, entries)
+        session.commit()
+    for _ in range(20):
+        student_id = rng.randint(1, CLASSES * CLASS_SIZE)
+        gradebook.save_marks(session, exam, (student_id - 1) // CLASS_SIZE + 1, rng.randint(1, PAPERS),
+                             [{"student_id": student_id, "marks": rng.choice([0, 45, 100])}])
+        session.commit()
+
+    incremental = standings(session)
+    assert gradebook.publish(session, exam)["published"]
+    session.commit()
+    assert incremental == standings(session)
+
+
+def test_ranks_and_percentiles_follow_each_incremental_update(session):
+    exam = session.get(Exam, 1)
+
+    def ranked(*student_ids):
+        table = standings(session)
+        return [table[student_id][4:] for student_id in student_ids]
+
+    marks = [90, 80, 80, 70, 0, 0, 0, 0]
+    gradebook.save_marks(session, exam, 1, 1, [{"roll_number": roll, "marks": m} for roll, m in enumerate(marks, 1)])
+    session.commit()
+    # 24 in the grade: ties share the higher rank, and the 20 on zero share 5th
+    assert ranked(1, 2, 3, 4, 5, 9) == [(1, 1, 100.0), (2, 2, 91.3), (2, 2, 91.3), (4, 4, 86.96), (5, 5, 0.0), (5, 1, 0.0)]
+
+    gradebook.save_marks(session, exam, 1, 1, [{"student_id": 3, "marks": 95}])
+    session.commit()
+    assert ranked(3, 1, 2, 4) == [(1, 1, 100.0), (2, 2, 95.65), (3, 3, 91.3), (4, 4, 86.96)]
+
+    # A mark in another class moves grade ranks and percentiles but not class 1's class ranks
+    gradebook.save_marks(session, exam, 2, 2, [{"roll_number": 1, "marks": 85}])
+    session.commit()
+    assert ranked(3, 1, 9, 2, 4, 5, 10) == [
+        (1, 1, 100.0), (2, 2, 95.65), (3, 1, 91.3), (4, 3, 86.96), (5, 4, 82.61), (6, 5, 0.0), (6, 2, 0.0)
+    ]
@@ -0,0 +1,33 @@
+"""Bulk hashing through a queue smaller than the batch"""
+
+import asyncio
+import pytest
+from services.password_hasher import HashingBusyError, PasswordHasher, pwd_context
+
+
+@pytest.fixture
+def hasher():
+    hasher = PasswordHasher(workers=2, max_pending=4, queue_timeout=0.5)
+    yield hasher
+    hasher.shutdown()
+
+
+def test_batch_larger_than_the_queue_is_hashed_in_order(hasher):
+    passwords = [f"secret{n}" for n in range(8)]
+    hashed = asyncio.run(hasher.hash_many_async(passwords))
+    assert len(hashed) == len(passwords)
+    assert all(pwd_context.verify(password, value) for password, value in zip(passwords, hashed))
+    assert hasher.pending == 0
+
+
+def test_busy_queue_cancels_the_batch_and_frees_its_slots(hasher):
+    # Another caller holds every slot, so the batch cannot get one in time
+    for _ in range(4):
+        assert hasher.slots.acquire(blocking=False)
+    with pytest.raises(HashingBusyError):
+        asyncio.run(hasher.hash_many_async(["secret1"] * 8))
+    for _ in range(4):
+        hasher.slots.release()
+    # Every slot is free again: nothing the failed batch queued still holds one
+    assert all(hasher.slots.acquire(blocking=False) for _ in range(4))
+    assert not hasher.slots.acquire(blocking=False)
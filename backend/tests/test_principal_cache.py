@@ -0,0 +1,90 @@
+"""Cached principals expire after their TTL and as soon as a worker sees the users epoch move.
+
+Run from the backend directory: python -m pytest tests
+"""
+
+import asyncio
+import os
+import tempfile
+import pytest
+from sqlalchemy import create_engine
+from sqlalchemy.ext.asyncio import create_async_engine, async_sessionmaker
+from sqlalchemy.orm import Session
+from config.database import Base, User
+import middleware.auth as auth
+from middleware.auth import PrincipalCache, UserPrincipal, refresh_principal_epoch
+
+ALICE = UserPrincipal(id=1, name="Alice", email="alice@example.com", role="school_admin")
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    now = [1000.0]
+    monkeypatch.setattr(auth.time, "monotonic", lambda: now[0])
+    return now
+
+
+def test_entries_expire_after_the_ttl(clock):
+    cache = PrincipalCache(ttl=60, epoch_interval=2)
+    cache.set(1, "token", ALICE)
+    clock[0] += 59
+    assert cache.get(1, "token") == ALICE
+    clock[0] += 2
+    assert cache.get(1, "token") is None
+    assert not cache.entries
+
+
+def test_a_new_epoch_misses_entries_filled_under_the_old_one(clock):
+    cache = PrincipalCache(ttl=60, epoch_interval=2)
+    cache.observe_epoch(None, 4)
+    cache.set(1, "token", ALICE)
+    assert not cache.epoch_due(None)
+    clock[0] += 1
+    cache.observe_epoch(None, 4)
+    assert cache.get(1, "token") == ALICE
+
+    clock[0] += 3
+    assert cache.epoch_due(None)
+    cache.observe_epoch(None, 5)
+    assert cache.get(1, "token") is None
+    cache.set(1, "token", ALICE)
+    assert cache.get(1, "token") == ALICE
+
+
+def test_the_lru_drops_the_least_recently_used(clock):
+    cache = PrincipalCache(maxsize=2, ttl=60)
+    for user_id in (1, 2):
+        cache.set(user_id, "token", ALICE._replace(id=user_id))
+    cache.get(1, "token")
+    cache.set(3, "token", ALICE._replace(id=3))
+    assert [key[0] for key in cache.entries] == [1, 3]
+
+
+def test_another_workers_user_write_reaches_the_cache_within_the_epoch_interval(clock, monkeypatch):
+    path = os.path.join(tempfile.mkdtemp(), "principals.db")
+    engine = create_engine(f"sqlite:///{path}")
+    async_engine = create_async_engine(f"sqlite+aiosqlite:///{path}")
+    Base.metadata.create_all(engine)
+    sessions = async_sessionmaker(async_engine, expire_on_commit=False)
+    cache = PrincipalCache(ttl=300, epoch_interval=2)
+    monkeypatch.setattr(auth, "principal_cache", cache)
+
+    async def refresh():
+        async with sessions() as db:
+            await refresh_principal_epoch(db)
+
+    try:
+        asyncio.run(refresh())
+        cache.set(1, "token", ALICE)
+        with Session(engine) as session:  # the write another worker makes
+            session.add(User(name="Bob", email="bob@example.com", password="x", role="moderator"))
+            session.commit()
+
+        asyncio.run(refresh())  # not due yet: the stale entry may still serve
+        assert cache.get(1, "token") == ALICE
+        clock[0] += 3
+        asyncio.run(refresh())
+        assert cache.get(1, "token") is None
+    finally:
+        asyncio.run(async_engine.dispose())
+        engine.dispose()
@@ -0,0 +1,44 @@
+"""Applying a promotion is one transaction, temporary map included"""
+
+import pytest
+from sqlalchemy import create_engine, select, text
+from sqlalchemy.orm import Session
+from config.database import Base, Class, Student
+from services.promotion import apply_plan, build_plan
+
+
+@pytest.fixture
+def session(tmp_path):
+    engine = create_engine(f"sqlite:///{tmp_path / 'promotion.db'}")
+    Base.metadata.create_all(engine)
+    with Session(engine) as session:
+        for grade in ("1", "2"):
+            class_ = Class(name=f"{grade}-A", segment="primary", grade=grade, section="A", max_students=40)
+            session.add(class_)
+            session.flush()
+            session.add_all([Student(admission_number=f"{grade}-{n}", name=f"S{n}", class_id=class_.id) for n in range(3)])
+        session.commit()
+        yield session
+    engine.dispose()
+
+
+def placements(session):
+    return sorted(session.execute(select(Student.admission_number, Student.class_id, Student.status)).tuples())
+
+
+def test_rollback_undoes_the_whole_promotion(session):
+    before = placements(session)
+    plan = build_plan(session, "2026-2027", "2027-2028")
+    assert apply_plan(session, plan)["students_moved"] == 6
+    assert placements(session) != before
+    session.rollback()
+    assert placements(session) == before
+
+
+def test_a_real_promotion_map_table_is_left_alone(session):
+    session.execute(text("CREATE TABLE promotion_map (note VARCHAR(20))"))
+    session.execute(text("INSERT INTO promotion_map VALUES ('keep')"))
+    session.commit()
+    apply_plan(session, build_plan(session, "2026-2027", "2027-2028"))
+    session.commit()
+    assert session.execute(text("SELECT note FROM main.promotion_map")).scalars().all() == ["keep"]
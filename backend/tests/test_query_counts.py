@@ -0,0 +1,27 @@
+"""Endpoints stay within their SQL statement budgets (bench/query_counts.py prints the same numbers).
+
+Run from the backend directory: python -m pytest tests
+"""
+
+import pytest
+from bench.query_counts import QUERY_BUDGETS, measure
+
+
+@pytest.fixture(scope="module")
+def counts():
+    return measure()
+
+
+@pytest.mark.parametrize("path", QUERY_BUDGETS)
+def test_endpoint_stays_within_budget(counts, path):
+    count, status = counts[0][path]
+    assert status == 200
+    assert count <= QUERY_BUDGETS[path]
+
+
+def test_cached_repeats_cost_only_the_version_lookup(counts):
+    cached = counts[1]
+    assert cached
+    for path, (count, hit) in cached.items():
+        assert hit == "HIT", path
+        assert count <= 1, path
@@ -0,0 +1,90 @@
+"""Recurring event expansion: BYDAY, month-end skips, COUNT/UNTIL and windows deep into a series.
+
+Run from the backend directory: python -m pytest tests
+"""
+
+from datetime import date
+from itertools import islice
+from types import SimpleNamespace
+import pytest
+from services.event_calendar import Recurrence, derive_range, normalize_rule, occurrences
+
+
+def expand(rule, start, window_start, window_end, end=None):
+    span, last = derive_range(start, end or start, rule)
+    row = SimpleNamespace(start_date=start, span_days=span, last_date=last, recurrence_rule=normalize_rule(rule))
+    return list(occurrences(row, window_start, window_end))
+
+
+def starts(rule, start, window_start, window_end):
+    return [day for day, _ in expand(rule, start, window_start, window_end)]
+
+
+def test_weekly_byday_skips_days_before_the_first_occurrence():
+    # Wednesday 2026-09-02; the Monday of that week is not part of the series
+    assert starts("FREQ=WEEKLY;BYDAY=MO,WE,FR", date(2026, 9, 2), date(2026, 8, 31), date(2026, 9, 9)) == [
+        date(2026, 9, 2), date(2026, 9, 4), date(2026, 9, 7), date(2026, 9, 9)
+    ]
+
+
+def test_biweekly_byday_keeps_the_series_phase():
+    assert starts("FREQ=WEEKLY;INTERVAL=2;BYDAY=TU,TH", date(2026, 9, 1), date(2026, 9, 7), date(2026, 9, 30)) == [
+        date(2026, 9, 15), date(2026, 9, 17), date(2026, 9, 29)
+    ]
+
+
+def test_monthly_on_the_31st_skips_shorter_months():
+    assert starts("FREQ=MONTHLY", date(2026, 1, 31), date(2026, 1, 1), date(2026, 8, 31)) == [
+        date(2026, 1, 31), date(2026, 3, 31), date(2026, 5, 31), date(2026, 7, 31), date(2026, 8, 31)
+    ]
+
+
+def test_yearly_on_leap_day_only_in_leap_years():
+    assert starts("FREQ=YEARLY", date(2024, 2, 29), date(2024, 1, 1), date(2033, 1, 1)) == [
+        date(2024, 2, 29), date(2028, 2, 29), date(2032, 2, 29)
+    ]
+
+
+def test_count_counts_only_occurrences_that_exist():
+    # Jan 31, Mar 31, May 31: February and April have no 31st
+    assert derive_range(date(2026, 1, 31), None, "FREQ=MONTHLY;COUNT=3") == (0, date(2026, 5, 31))
+    assert starts("FREQ=WEEKLY;BYDAY=MO,TH;COUNT=5", date(2026, 9, 3), date(2026, 1, 1), date(2027, 1, 1)) == [
+        date(2026, 9, 3), date(2026, 9, 7), date(2026, 9, 10), date(2026, 9, 14), date(2026, 9, 17)
+    ]
+
+
+def test_until_is_inclusive():
+    assert starts("FREQ=DAILY;INTERVAL=3;UNTIL=20260910", date(2026, 9, 1), date(2026, 1, 1), date(2027, 1, 1)) == [
+        date(2026, 9, 1), date(2026, 9, 4), date(2026, 9, 7), date(2026, 9, 10)
+    ]
+
+
+def test_multi_day_occurrence_starting_before_the_window_overlaps_it():
+    # Friday to Sunday every week
+    found = expand("FREQ=WEEKLY", date(2026, 9, 4), date(2026, 9, 13), date(2026, 9, 18), end=date(2026, 9, 6))
+    assert found == [(date(2026, 9, 11), date(2026, 9, 13)), (date(2026, 9, 18), date(2026, 9, 20))]
+    assert expand("FREQ=WEEKLY", date(2026, 9, 4), date(2026, 9, 14), date(2026, 9, 17), end=date(2026, 9, 6)) == []
+
+
+@pytest.mark.parametrize("rule, first", [
+    ("FREQ=DAILY;INTERVAL=7", date(2026, 9, 1)),
+    ("FREQ=WEEKLY;INTERVAL=3;BYDAY=SU,WE", date(2026, 9, 6)),
+    ("FREQ=MONTHLY;INTERVAL=5", date(2026, 1, 30)),
+    ("FREQ=YEARLY", date(2024, 2, 29)),
+])
+def test_a_window_deep_into_a_series_matches_walking_it_from_the_start(rule, first):
+    recurrence = Recurrence.parse(rule)
+    walked = list(islice(recurrence.starts(first, first), 400))
+    for since in (date(2031, 3, 1), date(2040, 12, 31), date(2095, 2, 28)):
+        expected = [day for day in walked if day >= since][:5]
+        if expected:
+            assert list(islice(recurrence.starts(first, since), len(expected))) == expected
+
+
+@pytest.mark.parametrize("rule", [
+    "FREQ=HOURLY", "FREQ=MONTHLY;BYDAY=MO", "FREQ=WEEKLY;BYDAY=XX", "FREQ=DAILY;COUNT=2;UNTIL=20270101",
+    "FREQ=DAILY;INTERVAL=0", "FREQ=DAILY;BYMONTH=1",
+])
+def test_unsupported_rules_are_rejected(rule):
+    with pytest.raises(ValueError):
+        normalize_rule(rule)
@@ -0,0 +1,99 @@
+"""Report rollups maintained by the flush hook match a rebuild from the source tables.
+
+Run from the backend directory: python -m pytest tests
+"""
+
+import random
+from datetime import time
+import pytest
+from sqlalchemy import create_engine, insert, select
+from sqlalchemy.orm import Session
+from config.database import Base, Class, EnrollmentRollup, StaffRollup, Student, Teacher, TeacherLoadRollup, Timetable
+from services import rollups
+import services.enrollment  # noqa: F401  registers the capacity check
+
+DAYS = ["monday", "tuesday", "wednesday", "thursday", "friday"]
+
+
+@pytest.fixture
+def session():
+    engine = create_engine("sqlite://")
+    Base.metadata.create_all(engine)
+    with Session(engine) as session:
+        session.add_all([Class(id=n, name=f"9-{n}", segment="secondary", grade="9", max_students=500) for n in (1, 2, 3)])
+        session.commit()
+        yield session
+    engine.dispose()
+
+
+def counts(session):
+    """Every rollup as {group: count}, leaving out groups that dropped to zero"""
+    tables = {
+        EnrollmentRollup: ("class_id", "gender", "status", "student_count"),
+        TeacherLoadRollup: ("teacher_id", "academic_year", "period_count"),
+        StaffRollup: ("status", "teacher_count"),
+    }
+    result = {}
+    for model, columns in tables.items():
+        rows = session.execute(select(*(getattr(model, column) for column in columns))).tuples()
+        result[model.__tablename__] = {row[:-1]: row[-1] for row in rows if row[-1]}
+    return result
+
+
+@pytest.mark.parametrize("seed", range(4))
+def test_incremental_rollups_equal_a_rebuild(session, seed):
+    rng = random.Random(seed)
+    students, teachers, periods, cells = [], [], [], set()
+
+    for step in range(300):
+        action = rng.random()
+        if action < 0.25 or not students:
+            student = Student(admission_number=f"A{step}", name=f"S{step}", class_id=rng.choice([None, 1, 2, 3]),
+                              gender=rng.choice([None, "male", "female"]),
+                              status=rng.choice([None, "active", "inactive"]))
+            session.add(student)
+            students.append(student)
+        elif action < 0.4:
+            student = rng.choice(students)
+            student.class_id = rng.choice([None, 1, 2, 3])
+            if rng.random() < 0.5:
+                student.gender = rng.choice(["male", "female", "other"])
+        elif action < 0.45:
+            session.flush()
+            session.delete(students.pop(rng.randrange(len(students))))
+        elif action < 0.55 or not teachers:
+            teacher = Teacher(name=f"T{step}", email=f"t{step}@example.com", status=rng.choice([None, "inactive"]))
+            session.add(teacher)
+            teachers.append(teacher)
+        elif action < 0.6:
+            rng.choice(teachers).status = rng.choice(["active", "inactive"])
+        elif action < 0.85:
+            cell = (rng.randint(1, 3), rng.choice(DAYS), rng.randint(1, 8))
+            if cell in cells:
+                continue
+            cells.add(cell)
+            session.flush()  # teacher ids
+            period = Timetable(class_id=cell[0], day_of_week=cell[1], period_number=cell[2], subject_id=1,
+                               teacher_id=rng.choice(teachers).id, start_time=time(9), end_time=time(10),
+                               academic_year=rng.choice([None, "2026-27"]))
+            session.add(period)
+            periods.append(period)
+        elif periods:
+            period = rng.choice(periods)
+            session.flush()
+            period.teacher_id = rng.choice(teachers).id
+        if rng.random() < 0.2:
+            session.commit()
+    session.commit()
+
+    # Core bulk writes are counted by hand
+    rows = [{"admission_number": f"B{n}", "name": f"B{n}", "class_id": 2, "gender": "female", "status": "active"}
+            for n in range(5)]
+    session.execute(insert(Student), rows)
+    rollups.record_rows(session, Student, rows)
+    session.commit()
+
+    incremental = counts(session)
+    assert incremental["enrollment_rollup"]
+    rollups.rebuild(session)
+    assert counts(session) == incremental
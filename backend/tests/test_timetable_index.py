@@ -0,0 +1,75 @@
+"""The timetable index finds clashes and follows writes made by other workers.
+
+Run from the backend directory: python -m pytest tests
+"""
+
+from datetime import time
+import pytest
+from sqlalchemy import create_engine
+from sqlalchemy.orm import Session
+from config.database import Base, Timetable
+from services.timetable_index import get_timetable_index, invalidate_timetable_index
+
+YEAR = "2026-27"
+
+
+@pytest.fixture
+def session():
+    engine = create_engine("sqlite://")
+    Base.metadata.create_all(engine)
+    invalidate_timetable_index()
+    with Session(engine) as session:
+        yield session
+    invalidate_timetable_index()
+    engine.dispose()
+
+
+def entry(class_id, teacher_id, day, period, room=None):
+    return Timetable(class_id=class_id, teacher_id=teacher_id, subject_id=1, day_of_week=day, period_number=period,
+                     room=room, start_time=time(9), end_time=time(10), academic_year=YEAR)
+
+
+def test_conflicts_by_class_teacher_and_room(session):
+    first = entry(1, 10, "monday", 1, room="Lab 1")
+    session.add(first)
+    session.commit()
+    index = get_timetable_index(session, YEAR)
+
+    assert index.conflicts(2, 11, "lab 1 ", "monday", 1) == [{"type": "room", "key": "lab 1", "timetable_id": first.id}]
+    assert {c["type"] for c in index.conflicts(1, 10, None, "monday", 1)} == {"class", "teacher"}
+    assert index.conflicts(1, 10, None, "monday", 1, ignore_id=first.id) == []
+    assert index.conflicts(1, 10, "Lab 1", "monday", 2) == []
+
+
+def test_validate_catches_clashes_inside_the_batch(session):
+    results = get_timetable_index(session, YEAR).validate([
+        {"class_id": 1, "teacher_id": 10, "day_of_week": "friday", "period_number": 3},
+        {"class_id": 2, "teacher_id": 10, "day_of_week": "friday", "period_number": 3},
+        {"class_id": 2, "teacher_id": 10, "day_of_week": "sunday", "period_number": 3},
+    ])
+    assert [r["valid"] for r in results] == [True, False, False]
+    assert results[1]["conflicts"] == [{"type": "teacher", "key": 10, "timetable_id": None}]
+    assert "day_of_week" in results[2]["error"]
+
+
+def test_index_reloads_after_a_write_by_another_worker(session):
+    index = get_timetable_index(session, YEAR)
+    assert get_timetable_index(session, YEAR) is index
+
+    # Another worker's write moves the shared version without touching this worker's index
+    session.add(entry(3, 12, "tuesday", 4))
+    session.commit()
+    reloaded = get_timetable_index(session, YEAR)
+    assert reloaded is not index
+    assert reloaded.conflicts(4, 12, None, "tuesday", 4)[0]["type"] == "teacher"
+    assert {"day_of_week": "tuesday", "period_number": 4} not in reloaded.free_slots(teacher_id=12, periods_per_day=8)
+
+
+def test_own_committed_write_keeps_the_index(session):
+    index = get_timetable_index(session, YEAR)
+    added = entry(5, 13, "wednesday", 2)
+    session.add(added)
+    session.commit()
+    index.committed(added.id, added)
+    assert get_timetable_index(session, YEAR) is index
+    assert index.conflicts(5, 99, None, "wednesday", 2)[0]["timetable_id"] == added.id